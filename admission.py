@@ -0,0 +1,282 @@
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from config import (
+    get_admission_enabled,
+    get_client_id_header,
+    get_rate_limit,
+    get_rate_limit_burst,
+    get_max_batch_size,
+    get_client_backend_concurrency,
+    get_backend_concurrency,
+    get_backend_queue_size,
+    get_backend_queue_timeout,
+    get_shed_retry_after,
+)
+from metrics import admission_rejected, backend_request_queued
+
+class AdmissionRejected(Exception):
+    """Raised when a /tool-calls request is refused before any of its tool calls run"""
+
+    def __init__(self, status_code: int, reason: str, message: str, retry_after: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def headers(self) -> Optional[Dict[str, str]]:
+        return None if self.retry_after is None else {"Retry-After": str(self.retry_after)}
+
+class BackendOverloadedError(Exception):
+    """Raised instead of calling the Books API when no concurrency slot freed up in time"""
+
+class TokenBucket:
+    """Refills rate tokens per second up to capacity"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self, amount: float) -> float:
+        """
+        Take amount tokens if they are available
+
+        More than capacity can be taken from a full bucket; the bucket then
+        goes into debt, which is paid back before anything more is taken.
+
+        Returns:
+            0 if the tokens were taken, otherwise the seconds until they will be available
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        needed = min(amount, self.capacity)
+        if self.tokens >= needed:
+            self.tokens -= amount
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+class Slots:
+    """
+    A limit on concurrent Books API requests with a FIFO queue of waiters
+
+    Used from the event loop only. A released slot is handed directly to the
+    oldest waiter, so a steady stream of new requests cannot starve it.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Wait up to timeout seconds for a slot; returns whether one was acquired"""
+        if self.in_flight < self.limit and not self.waiters:
+            self.in_flight += 1
+            return True
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        backend_request_queued(True)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        except BaseException:
+            # Pass on a slot that was handed over just as this waiter was cancelled
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            backend_request_queued(False)
+            try:
+                self.waiters.remove(waiter)
+            except ValueError:
+                pass
+
+    def release(self):
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+class ClientState:
+    """Rate limit and Books API concurrency of one client"""
+
+    __slots__ = ("bucket", "slots")
+
+    def __init__(self, bucket: Optional[TokenBucket], slots: Slots):
+        self.bucket = bucket
+        self.slots = slots
+
+# The client whose tool calls are running; tasks started for a request inherit it
+_current_client: ContextVar[Optional[ClientState]] = ContextVar("admission_client", default=None)
+
+class AdmissionController:
+    """
+    Admission control for /tool-calls
+
+    A request is refused up front if it has more than max_batch_size tool
+    calls (413), if its client has used up its token bucket of tool calls
+    (429; a batch larger than the burst is charged in full and leaves the
+    bucket in debt), or if the Books API requests already waiting for a slot fill the
+    queue (429, load shedding). Both 429s carry Retry-After.
+
+    Admitted requests bind their client to the running context. Every Books
+    API request made for it then needs one of the client's slots and one of
+    the global slots; a request that cannot get a global slot within
+    queue_timeout fails with BackendOverloadedError. Requests made outside a
+    /tool-calls request (e.g. replica refreshes) only take a global slot.
+    """
+
+    # Idle clients whose state is kept
+    MAX_CLIENTS = 10000
+
+    def __init__(self, enabled: bool, rate: float, burst: int, max_batch_size: int,
+                 client_concurrency: int, backend_concurrency: int, queue_size: int,
+                 queue_timeout: float, shed_retry_after: int):
+        self.enabled = enabled
+        self.rate = rate
+        self.burst = burst
+        self.max_batch_size = max_batch_size
+        self.client_concurrency = client_concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.shed_retry_after = shed_retry_after
+        self.backend = Slots(backend_concurrency)
+        self._clients: "OrderedDict[str, ClientState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.rejections: Dict[str, int] = {}
+
+    def _client(self, client_id: str) -> ClientState:
+        with self._lock:
+            state = self._clients.get(client_id)
+            if state is None:
+                bucket = TokenBucket(self.rate, self.burst) if self.rate > 0 else None
+                state = self._clients[client_id] = ClientState(bucket, Slots(self.client_concurrency))
+                self._evict()
+            else:
+                self._clients.move_to_end(client_id)
+            return state
+
+    def _evict(self):
+        """Forget the least recently seen clients that have nothing in flight"""
+        excess = len(self._clients) - self.MAX_CLIENTS
+        for client_id in list(self._clients):
+            if excess <= 0:
+                break
+            if self._clients[client_id].slots.in_flight == 0:
+                del self._clients[client_id]
+                excess -= 1
+
+    def _reject(self, status_code: int, reason: str, message: str, retry_after: Optional[int] = None):
+        with self._lock:
+            self.rejections[reason] = self.rejections.get(reason, 0) + 1
+        admission_rejected(reason)
+        raise AdmissionRejected(status_code, reason, message, retry_after)
+
+    def admit(self, client_id: str, tool_calls: int):
+        """
+        Admit a /tool-calls request and bind its client to the running context
+
+        Raises:
+            AdmissionRejected: If the request is refused
+        """
+        if not self.enabled:
+            return
+        if tool_calls > self.max_batch_size:
+            self._reject(413, "batch_too_large",
+                         f"Too many tool calls in one request: {tool_calls} (maximum {self.max_batch_size})")
+        state = self._client(client_id)
+        if state.bucket is not None:
+            with self._lock:
+                wait = state.bucket.take(tool_calls)
+            if wait > 0:
+                self._reject(429, "rate_limited", "Rate limit exceeded", math.ceil(wait))
+        if len(self.backend.waiters) >= self.queue_size:
+            self._reject(429, "overloaded", "Server is overloaded", self.shed_retry_after)
+        _current_client.set(state)
+
+    async def acquire_backend(self) -> Optional[Tuple[Optional[Slots], Slots]]:
+        """
+        Wait for the slots needed to send one Books API request
+
+        Returns:
+            A token to pass to release_backend, or None if admission control is disabled
+
+        Raises:
+            BackendOverloadedError: If no global slot freed up within queue_timeout
+        """
+        if not self.enabled:
+            return None
+        state = _current_client.get()
+        client_slots = state.slots if state is not None else None
+        if client_slots is not None:
+            await client_slots.acquire()
+        try:
+            acquired = await self.backend.acquire(self.queue_timeout)
+        except BaseException:
+            if client_slots is not None:
+                client_slots.release()
+            raise
+        if not acquired:
+            if client_slots is not None:
+                client_slots.release()
+            with self._lock:
+                self.rejections["queue_timeout"] = self.rejections.get("queue_timeout", 0) + 1
+            admission_rejected("queue_timeout")
+            raise BackendOverloadedError(f"no Books API slot freed up within {self.queue_timeout}s")
+        return client_slots, self.backend
+
+    def release_backend(self, token: Optional[Tuple[Optional[Slots], Slots]]):
+        if token is None:
+            return
+        client_slots, backend = token
+        backend.release()
+        if client_slots is not None:
+            client_slots.release()
+
+    def reset(self):
+        """Forget all clients and clear the counters"""
+        with self._lock:
+            self._clients.clear()
+            self.rejections = {}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "clients": len(self._clients),
+            "backend_in_flight": self.backend.in_flight,
+            "backend_queued": len(self.backend.waiters),
+            "rejections": dict(self.rejections)
+        }
+
+def client_id(headers, client_host: Optional[str]) -> str:
+    """Identify a client by its client id header, falling back to its IP address"""
+    key = headers.get(CLIENT_ID_HEADER)
+    return f"key:{key}" if key else f"ip:{client_host}"
+
+CLIENT_ID_HEADER = get_client_id_header()
+
+# Process-wide admission control for /tool-calls and the Books API requests they make
+admission = AdmissionController(
+    enabled=get_admission_enabled(),
+    rate=get_rate_limit(),
+    burst=get_rate_limit_burst(),
+    max_batch_size=get_max_batch_size(),
+    client_concurrency=get_client_backend_concurrency(),
+    backend_concurrency=get_backend_concurrency(),
+    queue_size=get_backend_queue_size(),
+    queue_timeout=get_backend_queue_timeout(),
+    shed_retry_after=get_shed_retry_after()
+)
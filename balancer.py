@@ -0,0 +1,238 @@
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from config import (
+    get_backend_eject_failures,
+    get_backend_eject_seconds,
+    get_hedge_enabled,
+    get_hedge_min_delay,
+    get_hedge_budget_ratio,
+)
+from metrics import backend_ejected, backend_hedged
+
+class Backend:
+    """
+    One Books API replica and what is known about its load and health
+
+    latency is a "peak EWMA": it jumps straight up to a slower observation
+    and decays towards faster ones, so a replica that slows down is avoided
+    at once and only trusted again gradually.
+    """
+
+    # Weight of a new observation when latency is decaying
+    DECAY = 0.2
+    # Seconds added to latency, so outstanding requests count before any latency is known
+    BASE_COST = 0.001
+
+    __slots__ = ("url", "outstanding", "latency", "consecutive_failures", "ejected_until",
+                 "requests", "failures", "ejections", "hedges_won")
+
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0
+        self.latency = 0.0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.ejections = 0
+        self.hedges_won = 0
+
+    def cost(self) -> float:
+        """Expected wait for a new request: latency scaled by the requests already queued on it"""
+        return (self.latency + self.BASE_COST) * (self.outstanding + 1)
+
+    def stats(self, now: float) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.ejected_until <= now,
+            "outstanding": self.outstanding,
+            "latency_ms": round(self.latency * 1000, 3),
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejections": self.ejections,
+            "hedges_won": self.hedges_won
+        }
+
+class LatencyWindow:
+    """The 95th percentile of the most recent successful read latencies"""
+
+    SIZE = 512
+    RECOMPUTE_EVERY = 32
+    MIN_SAMPLES = 20
+
+    def __init__(self):
+        self.samples: Deque[float] = deque(maxlen=self.SIZE)
+        self.p95: Optional[float] = None
+        self._since_recompute = 0
+
+    def observe(self, elapsed: float):
+        self.samples.append(elapsed)
+        self._since_recompute += 1
+        if self._since_recompute >= self.RECOMPUTE_EVERY and len(self.samples) >= self.MIN_SAMPLES:
+            ordered = sorted(self.samples)
+            self.p95 = ordered[int(0.95 * (len(ordered) - 1))]
+            self._since_recompute = 0
+
+class BackendPool:
+    """
+    Latency-aware load balancing over the Books API replicas
+
+    BOOKS_API_URL may list several replicas separated by commas. Each
+    request goes to the healthy replica with the lowest cost, its peak-EWMA
+    latency times its outstanding requests plus one, with ties broken at
+    random. A failed request counts as a slow response. A replica that fails
+    eject_failures times in a row (connection errors, timeouts or 5xx) is
+    left out for eject_seconds, after which one more failure ejects it again.
+    If every replica is ejected, the one due back soonest is used anyway.
+
+    With hedging on, a read that has not been answered after the p95 latency
+    of recent reads is also sent to a second replica and the first answer
+    wins. Hedges are limited to budget_ratio of reads.
+    """
+
+    # Latency in seconds a failed request is counted as, at least
+    FAILURE_LATENCY = 1.0
+
+    def __init__(self, eject_failures: int, eject_seconds: float, hedge_enabled: bool,
+                 hedge_min_delay: float, hedge_budget_ratio: float):
+        self.eject_failures = eject_failures
+        self.eject_seconds = eject_seconds
+        self.hedge_enabled = hedge_enabled
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_budget_ratio = hedge_budget_ratio
+        self.hedge_tokens = 0.0
+        self.hedges = 0
+        self._backends: Dict[str, Backend] = {}
+        self._lists: Dict[str, List[Backend]] = {}
+        self._latency: Dict[str, LatencyWindow] = {}
+        self._lock = threading.Lock()
+
+    def backends(self, urls: str) -> List[Backend]:
+        """The replicas named by a comma-separated BOOKS_API_URL value"""
+        backends = self._lists.get(urls)
+        if backends is None:
+            with self._lock:
+                backends = [self._backends.setdefault(url, Backend(url))
+                            for url in (part.strip().rstrip("/") for part in urls.split(",")) if url]
+                self._lists[urls] = backends
+        return backends
+
+    def choose(self, urls: str, avoid: Optional[Backend] = None) -> Backend:
+        """Pick a replica for one request and count it as outstanding until done() is called"""
+        backends = self.backends(urls)
+        with self._lock:
+            if len(backends) == 1:
+                backend = backends[0]
+            else:
+                now = time.monotonic()
+                candidates = [b for b in backends if b.ejected_until <= now and b is not avoid]
+                if not candidates:
+                    candidates = [min((b for b in backends if b is not avoid), key=lambda b: b.ejected_until,
+                                      default=backends[0])]
+                random.shuffle(candidates)
+                backend = min(candidates, key=Backend.cost)
+            backend.outstanding += 1
+            backend.requests += 1
+        return backend
+
+    def done(self, backend: Backend, elapsed: float, failed: Optional[bool]):
+        """
+        Record the end of a request sent to backend
+
+        Args:
+            backend: The replica returned by choose()
+            elapsed: Seconds the request took
+            failed: True for a failure that counts against the replica, False for
+                a response, None for an outcome that says nothing about it (e.g. cancelled)
+        """
+        with self._lock:
+            backend.outstanding -= 1
+            if failed is None:
+                return
+            if failed:
+                backend.failures += 1
+                backend.consecutive_failures += 1
+                # Count a failure as a slow response, so a replica failing fast does not look cheap
+                backend.latency = max(backend.latency, elapsed, self.FAILURE_LATENCY)
+                if backend.consecutive_failures >= self.eject_failures:
+                    backend.ejected_until = time.monotonic() + self.eject_seconds
+                    backend.ejections += 1
+                    # Probation: the next failure after it returns ejects it again
+                    backend.consecutive_failures = self.eject_failures - 1
+                    ejected = True
+                else:
+                    ejected = False
+            else:
+                backend.consecutive_failures = 0
+                if elapsed > backend.latency:
+                    backend.latency = elapsed
+                else:
+                    backend.latency += Backend.DECAY * (elapsed - backend.latency)
+                ejected = False
+        if failed and ejected:
+            backend_ejected(backend.url)
+
+    def observe_read(self, endpoint: str, elapsed: float):
+        """Record a successful read's latency for the hedge delay and earn hedge budget"""
+        with self._lock:
+            window = self._latency.get(endpoint)
+            if window is None:
+                window = self._latency[endpoint] = LatencyWindow()
+            window.observe(elapsed)
+            self.hedge_tokens = min(10.0, self.hedge_tokens + self.hedge_budget_ratio)
+
+    def hedge_delay(self, urls: str, endpoint: str) -> Optional[float]:
+        """Seconds after which a read of endpoint should be hedged, or None if it should not be"""
+        if not self.hedge_enabled or len(self.backends(urls)) < 2:
+            return None
+        window = self._latency.get(endpoint)
+        if window is None or window.p95 is None:
+            return None
+        return max(window.p95, self.hedge_min_delay)
+
+    def take_hedge(self, endpoint: str) -> bool:
+        """Spend hedge budget on one hedged read"""
+        with self._lock:
+            if self.hedge_tokens < 1:
+                return False
+            self.hedge_tokens -= 1
+            self.hedges += 1
+        backend_hedged(endpoint, "sent")
+        return True
+
+    def hedge_won(self, backend: Backend, endpoint: str):
+        with self._lock:
+            backend.hedges_won += 1
+        backend_hedged(endpoint, "won")
+
+    def reset(self):
+        """Forget all replicas and latency history"""
+        with self._lock:
+            self._backends = {}
+            self._lists = {}
+            self._latency = {}
+            self.hedge_tokens = 0.0
+            self.hedges = 0
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "hedging": self.hedge_enabled,
+            "hedges": self.hedges,
+            "hedge_delay_ms": {endpoint: None if window.p95 is None else round(window.p95 * 1000, 3)
+                               for endpoint, window in self._latency.items()},
+            "replicas": [backend.stats(now) for backend in self._backends.values()]
+        }
+
+# Process-wide replica state used by BookService and AsyncBookService
+backend_pool = BackendPool(
+    eject_failures=get_backend_eject_failures(),
+    eject_seconds=get_backend_eject_seconds(),
+    hedge_enabled=get_hedge_enabled(),
+    hedge_min_delay=get_hedge_min_delay(),
+    hedge_budget_ratio=get_hedge_budget_ratio()
+)
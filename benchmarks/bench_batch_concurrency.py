@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Benchmark /tool-calls batch latency with sequential vs concurrent execution
+
+With concurrent execution a batch should cost roughly max() of its call
+latencies instead of their sum().
+
+Run from the project root:
+    python -m benchmarks.bench_batch_concurrency --batch 20 --latency 0.02
+"""
+
+import argparse
+import asyncio
+import time
+
+import services
+from cache import book_cache
+from dispatcher import execute_tool_calls
+from http_client import close_http_client
+from models import ToolCallRequest
+from benchmarks.stub_books_api import StubBooksAPI
+
+async def time_batch(tool_calls, concurrency: int, rounds: int) -> float:
+    """Return the mean wall time of executing the batch"""
+    await execute_tool_calls(tool_calls, concurrency=concurrency)  # warm up the pool
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await execute_tool_calls(tool_calls, concurrency=concurrency)
+    return (time.perf_counter() - start) / rounds
+
+async def run(batch: int, latency: float, rounds: int):
+    tool_calls = [
+        ToolCallRequest(name="get_book", parameters={"book_id": i % 100 + 1})
+        for i in range(batch)
+    ]
+    print(f"batch={batch} backend latency={latency * 1000:.1f}ms "
+          f"sum={batch * latency * 1000:.1f}ms max={latency * 1000:.1f}ms")
+    for concurrency in (1, 5, batch):
+        elapsed = await time_batch(tool_calls, concurrency, rounds)
+        print(f"  concurrency={concurrency:<4} batch latency={elapsed * 1000:8.2f}ms")
+    await close_http_client()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.02, help="Stub backend latency in seconds")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    with StubBooksAPI(latency=args.latency) as stub:
+        services.BOOKS_API_URL = stub.url
+        # Measure backend round trips, not cache hits
+        book_cache.enabled = False
+        asyncio.run(run(args.batch, args.latency, args.rounds))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
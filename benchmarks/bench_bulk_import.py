@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark importing a catalog with create_books vs one create_book call per book
+
+The baseline sends one /tool-calls request per book, as agents did before the
+bulk tools existed, for a sample of books and reports its rate. The bulk run
+imports the full catalog with a single create_books call.
+
+Run from the project root:
+    python -m benchmarks.bench_bulk_import --books 10000 --latency 0.002
+"""
+
+import argparse
+import time
+
+from fastapi.testclient import TestClient
+
+import services
+from main import app
+from benchmarks.stub_books_api import StubBooksAPI
+
+def make_books(count: int, start: int):
+    return [
+        {
+            "title": f"Imported Book {i}",
+            "author": f"Importer {i % 100}",
+            "isbn": f"979-{i:010d}",
+            "publishedDate": "2020-01-01T00:00:00Z"
+        }
+        for i in range(start, start + count)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=10000)
+    parser.add_argument("--baseline-sample", type=int, default=500, help="Books imported one call at a time")
+    parser.add_argument("--latency", type=float, default=0.002, help="Stub backend latency in seconds")
+    args = parser.parse_args()
+
+    with StubBooksAPI(latency=args.latency, catalog_size=0) as stub, TestClient(app) as client:
+        services.BOOKS_API_URL = stub.url
+
+        start = time.perf_counter()
+        for book in make_books(args.baseline_sample, 0):
+            client.post("/tool-calls", json={"tool_calls": [{"name": "create_book", "parameters": {"book_data": book}}]})
+        baseline = time.perf_counter() - start
+        rate = args.baseline_sample / baseline
+        print(f"create_book x{args.baseline_sample:<6} {baseline:8.2f}s {rate:9.1f} books/s "
+              f"(~{args.books / rate:.1f}s for {args.books})")
+
+        books = make_books(args.books, args.baseline_sample)
+        start = time.perf_counter()
+        response = client.post("/tool-calls", json={"tool_calls": [{"name": "create_books", "parameters": {"books": books}}]})
+        bulk = time.perf_counter() - start
+        result = response.json()["tool_call_results"][0]["result"]
+        print(f"create_books x{args.books:<5} {bulk:8.2f}s {args.books / bulk:9.1f} books/s "
+              f"succeeded={result['succeeded']} failed={result['failed']}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Benchmark the memory and scan speed of the compact catalog against plain dicts
+
+Memory: each representation of a list_books body is built in a fresh
+subprocess from the same JSON document and the growth of its resident set
+size is reported, scaled to one million books:
+
+    dicts    the decoded list of dicts (what BookCache held before JSONList)
+    jsonlist the decoded list plus the raw body (serialization.JSONList)
+    compact  catalog.CompactCatalog, via catalog.loads_catalog
+    replica  the search replica with its indexes (replica.BookReplica)
+    shared   the snapshot as another worker reads it from the shared cache
+             backend (shared_cache.SharedBookCache), as a JSONList
+    shared-compact  the same with compact=True, as a CatalogView
+
+Scan speed: in one process, a column scan by author and by publication
+year, full iteration, a 100-book page, and JSON encoding of the whole list,
+each for the list of dicts and for the compact catalog.
+
+Run from the project root:
+    python -m benchmarks.bench_catalog --size 1000000
+"""
+
+import argparse
+import ctypes
+import gc
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from benchmarks.bench_workers import ROOT
+from benchmarks.stub_books_api import make_book
+from catalog import CatalogView, loads_catalog, pack_timestamp
+from replica import BookReplica
+from serialization import dumps, encode_value, loads, loads_list
+from shared_cache import SharedBookCache
+
+REPRESENTATIONS = ("dicts", "jsonlist", "compact", "replica", "shared", "shared-compact")
+
+def catalog_body(size: int) -> bytes:
+    return dumps([make_book(book_id) for book_id in range(1, size + 1)])
+
+def rss_bytes() -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+def release_free_memory():
+    """Collect garbage and hand freed heap pages back to the OS, so RSS shows what is retained"""
+    gc.collect()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+def build(representation: str, body: bytes):
+    if representation == "dicts":
+        return loads(body)
+    if representation == "jsonlist":
+        return loads_list(body)
+    if representation == "compact":
+        return loads_catalog(body)
+    if representation.startswith("shared"):
+        # One handle writes the snapshot as a worker would; a second reads it back
+        compact = representation == "shared-compact"
+        path = os.path.join(tempfile.mkdtemp(), "shared-cache.sqlite3")
+        writer = SharedBookCache(True, 1, 60, 60, path, compact=compact)
+        writer.put_books(loads_catalog(body) if compact else loads_list(body), writer.generation)
+        del writer
+        release_free_memory()
+        return SharedBookCache(True, 1, 60, 60, path, compact=compact).get_books()
+    replica = BookReplica(enabled=True, refresh_interval=60)
+    replica.load(loads(body), replica.generation)
+    return replica
+
+def measure(representation: str, size: int):
+    """Subprocess entry point: print the RSS growth of one representation"""
+    body = catalog_body(size)
+    release_free_memory()
+    before = rss_bytes()
+    start = time.perf_counter()
+    value = build(representation, body)
+    elapsed = time.perf_counter() - start
+    release_free_memory()
+    print(rss_bytes() - before, elapsed)
+    del value
+
+def timed(function: Callable[[], object], rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        function()
+    return (time.perf_counter() - start) / rounds
+
+def scans(size: int, rounds: int) -> List[Dict[str, float]]:
+    body = catalog_body(size)
+    books = loads(body)
+    raw = loads_list(body)
+    view: CatalogView = loads_catalog(body)
+    catalog, rows = view.catalog, view.rows
+    author = "Author 7"
+    low, high = pack_timestamp("1960-01-01T00:00:00Z"), pack_timestamp("1960-12-31T23:59:59Z")
+
+    def author_column():
+        code, codes = catalog.author_table[author], catalog.author_codes
+        return [row for row in rows if codes[row] == code]
+
+    def year_column():
+        published = catalog.published
+        return [row for row in rows if low <= published[row] <= high]
+
+    middle = size // 2
+    return [
+        {"scan": "filter by author", "dicts": timed(lambda: [b for b in books if b["author"] == author], rounds),
+         "compact": timed(author_column, rounds)},
+        {"scan": "filter by year", "dicts": timed(lambda: [b for b in books if b["publishedDate"].startswith("1960")],
+                                                  rounds),
+         "compact": timed(year_column, rounds)},
+        {"scan": "iterate all books", "dicts": timed(lambda: sum(1 for _ in books), rounds),
+         "compact": timed(lambda: sum(1 for _ in view), rounds)},
+        {"scan": "page of 100 as JSON", "dicts": timed(lambda: dumps(books[middle:middle + 100]), rounds),
+         "compact": timed(lambda: dumps(list(view[middle:middle + 100])), rounds)},
+        {"scan": "whole list as JSON", "dicts": timed(lambda: encode_value(books), rounds),
+         "jsonlist": timed(lambda: encode_value(raw), rounds),
+         "compact": timed(lambda: encode_value(view), rounds)},
+    ]
+
+def _ms(value) -> str:
+    return f"{'-':>10}" if value is None else f"{value * 1000:10.2f}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1000000, help="Books in the catalog")
+    parser.add_argument("--rounds", type=int, default=3, help="Repetitions of each scan")
+    parser.add_argument("--measure", choices=REPRESENTATIONS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.measure, args.size)
+        return
+
+    print(f"catalog={args.size} books")
+    print(f"  {'representation':<16} {'RSS MiB':>10} {'per 1M books':>14} {'build ms':>10}")
+    for representation in REPRESENTATIONS:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_catalog", "--measure", representation, "--size", str(args.size)],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.split()
+        growth, elapsed = int(output[0]), float(output[1])
+        print(f"  {representation:<16} {growth / 2 ** 20:10.1f} {growth / args.size * 1e6 / 2 ** 20:10.1f} MiB "
+              f"{elapsed * 1000:10.1f}")
+
+    print(f"  {'scan (ms)':<22} {'dicts':>10} {'jsonlist':>10} {'compact':>10}")
+    for result in scans(args.size, args.rounds):
+        print(f"  {result['scan']:<22} {_ms(result['dicts'])} {_ms(result.get('jsonlist'))} {_ms(result['compact'])}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark bytes on the wire and end-to-end latency of compressed /tool-calls responses
+
+Calls POST /tool-calls in-process with one list_books call for catalogs of
+1k, 10k and 100k books, once per response encoding: plain JSON, JSON with
+each available content coding, and MessagePack with and without zstd.
+Each variant reports the body size sent, the mean time until the client
+has the decoded result (server work, compression, decompression and
+parsing), and that time plus the transfer over a WAN link of the given
+bandwidth and round-trip time.
+
+The list snapshot is cached after the first call, so the Books API is not
+part of the measurement.
+
+Run from the project root:
+    python -m benchmarks.bench_compression --sizes 1000 10000 100000 --bandwidth-mbps 50 --rtt-ms 40
+"""
+
+import argparse
+import time
+
+from fastapi.testclient import TestClient
+
+import services
+from cache import book_cache
+from compression import response_compression
+from main import app
+from serialization import msgpack
+from benchmarks.stub_books_api import StubBooksAPI
+
+def variants():
+    yield "json", {"Accept-Encoding": "identity"}
+    for codec in response_compression.codecs:
+        yield f"json + {codec.name}", {"Accept-Encoding": codec.name}
+    if msgpack is not None:
+        yield "msgpack", {"Accept": "application/msgpack", "Accept-Encoding": "identity"}
+        if any(codec.name == "zstd" for codec in response_compression.codecs):
+            yield "msgpack + zstd", {"Accept": "application/msgpack", "Accept-Encoding": "zstd"}
+
+def measure(client: TestClient, headers: dict, rounds: int):
+    body = {"tool_calls": [{"name": "list_books", "parameters": {}}]}
+    decode = msgpack.unpackb if "msgpack" in headers.get("Accept", "") else None
+    client.post("/tool-calls", json=body, headers=headers)  # warm up
+    start = time.perf_counter()
+    for _ in range(rounds):
+        response = client.post("/tool-calls", json=body, headers=headers)
+        decode(response.content) if decode else response.json()
+    elapsed = (time.perf_counter() - start) / rounds
+    return int(response.headers["content-length"]), elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--bandwidth-mbps", type=float, default=50.0, help="WAN link bandwidth in Mbit/s")
+    parser.add_argument("--rtt-ms", type=float, default=40.0, help="WAN round-trip time in milliseconds")
+    args = parser.parse_args()
+
+    bytes_per_second = args.bandwidth_mbps * 1e6 / 8
+    for size in args.sizes:
+        with StubBooksAPI(catalog_size=size) as stub, TestClient(app) as client:
+            services.BOOKS_API_URL = stub.url
+            book_cache.clear()
+            print(f"catalog={size} books wan={args.bandwidth_mbps:g} Mbit/s rtt={args.rtt_ms:g}ms")
+            baseline = None
+            for name, headers in variants():
+                size_bytes, elapsed = measure(client, headers, args.rounds)
+                baseline = baseline or size_bytes
+                wan = elapsed + size_bytes / bytes_per_second + args.rtt_ms / 1000
+                print(f"  {name:<16} wire={size_bytes / 1024:10.1f} KiB ({size_bytes / baseline:6.1%}) "
+                      f"local={elapsed * 1000:9.2f}ms wan={wan * 1000:9.2f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark pooled vs unpooled Books API calls
+
+Run from the project root:
+    python -m benchmarks.bench_connection_pool --calls 2000 --threads 8
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+import requests
+
+import services
+from cache import book_cache
+from http_client import close_http_client, get_timeout
+from services import BookService
+from benchmarks.stub_books_api import StubBooksAPI
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Return the pct-th percentile of samples (nearest rank)"""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def unpooled_get_book(book_id: int):
+    """The pre-pool behaviour: a fresh connection for every call"""
+    return requests.get(f"{services.BOOKS_API_URL}/books/{book_id}", timeout=get_timeout())
+
+def pooled_get_book(book_id: int):
+    return BookService.get_book(book_id)
+
+def run(name: str, call: Callable[[int], object], calls: int, threads: int):
+    def timed(i: int) -> float:
+        start = time.perf_counter()
+        call(i % 100 + 1)
+        return time.perf_counter() - start
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = list(pool.map(timed, range(calls)))
+    elapsed = time.perf_counter() - started
+
+    print(f"{name:<10} calls={calls:<6} threads={threads:<3} "
+          f"p50={percentile(latencies, 50) * 1000:7.3f}ms "
+          f"p99={percentile(latencies, 99) * 1000:7.3f}ms "
+          f"mean={statistics.mean(latencies) * 1000:7.3f}ms "
+          f"throughput={calls / elapsed:9.1f}/s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub backend latency in seconds")
+    args = parser.parse_args()
+
+    with StubBooksAPI(latency=args.latency) as stub:
+        services.BOOKS_API_URL = stub.url
+        # Measure backend round trips, not cache hits
+        book_cache.enabled = False
+        # Warm up both paths so interpreter and stub start-up costs are excluded
+        run("warmup", pooled_get_book, 100, args.threads)
+        run("unpooled", unpooled_get_book, args.calls, args.threads)
+        run("pooled", pooled_get_book, args.calls, args.threads)
+        asyncio.run(close_http_client())
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark list_books response size and latency with pagination and field projection
+
+Calls POST /tool-calls in-process for catalogs of 10k and 100k books and
+reports the response body size and mean latency of each variant.
+
+Run from the project root:
+    python -m benchmarks.bench_list_books --sizes 10000 100000 --rounds 5
+"""
+
+import argparse
+import time
+
+from fastapi.testclient import TestClient
+
+import services
+from cache import book_cache
+from main import app
+from benchmarks.stub_books_api import StubBooksAPI
+
+VARIANTS = [
+    ("full catalog", {}),
+    ("fields=id,title", {"fields": ["id", "title"]}),
+    ("limit=100", {"limit": 100}),
+    ("limit=100 fields=id,title", {"limit": 100, "fields": ["id", "title"]}),
+]
+
+def measure(client: TestClient, parameters: dict, rounds: int):
+    body = {"tool_calls": [{"name": "list_books", "parameters": parameters}]}
+    client.post("/tool-calls", json=body)  # warm up
+    start = time.perf_counter()
+    for _ in range(rounds):
+        response = client.post("/tool-calls", json=body)
+    elapsed = (time.perf_counter() - start) / rounds
+    return len(response.content), elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--no-cache", action="store_true", help="Fetch the catalog from the stub on every call")
+    args = parser.parse_args()
+
+    book_cache.enabled = not args.no_cache
+    for size in args.sizes:
+        with StubBooksAPI(catalog_size=size) as stub, TestClient(app) as client:
+            services.BOOKS_API_URL = stub.url
+            book_cache.clear()
+            print(f"catalog={size} books cache={'off' if args.no_cache else 'on'}")
+            for name, parameters in VARIANTS:
+                size_bytes, elapsed = measure(client, parameters, args.rounds)
+                print(f"  {name:<28} response={size_bytes / 1024:10.1f} KiB latency={elapsed * 1000:9.2f}ms")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Load test /tool-calls against a stub Books API and report throughput, latency, CPU and memory
+
+Each scenario starts a fresh stub Books API and a fresh server
+(`run.py --production`) as subprocesses, warms them up, and then drives
+/tool-calls over keep-alive connections for a fixed duration. The report
+gives requests and tool calls per second, p50/p90/p99/max latency, HTTP
+errors and tool call errors, the server's CPU time per request, and its peak
+resident memory. CPU and memory are read from /proc, so they are only
+reported on Linux.
+
+Use --json to save the results and --compare with a saved file to check for
+regressions: the exit status is 1 if any scenario's throughput fell or its
+p99 latency rose by more than --tolerance.
+
+Run from the project root:
+    python -m benchmarks.bench_load --duration 10 --json baseline.json
+    python -m benchmarks.bench_load --duration 10 --compare baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import signal
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import aiohttp
+
+from benchmarks.bench_workers import ROOT, free_port, wait_until_ready
+from config import APP_VERSION
+
+def single_call(rng: random.Random, catalog_size: int) -> List[Dict[str, Any]]:
+    return [{"name": "get_book", "parameters": {"book_id": rng.randint(1, catalog_size)}}]
+
+def big_batch(rng: random.Random, catalog_size: int) -> List[Dict[str, Any]]:
+    return [{"name": "get_book", "parameters": {"book_id": rng.randint(1, catalog_size)}} for _ in range(100)]
+
+def read_heavy(rng: random.Random, catalog_size: int) -> List[Dict[str, Any]]:
+    calls = [{"name": "get_book", "parameters": {"book_id": rng.randint(1, catalog_size)}} for _ in range(8)]
+    calls.append({"name": "search_books", "parameters": {"author": f"Author {rng.randrange(500)}", "limit": 10}})
+    book_id = rng.randint(1, catalog_size)
+    calls.append({"name": "update_book", "parameters": {"book_id": book_id,
+                                                        "book_data": {"id": book_id, "title": f"Title {rng.random()}"}}})
+    return calls
+
+def write_heavy(rng: random.Random, catalog_size: int) -> List[Dict[str, Any]]:
+    calls = [{"name": "create_book", "parameters": {"book_data": {"title": f"Load Book {rng.random()}",
+                                                                  "author": "Load Author"}}}
+             for _ in range(5)]
+    for _ in range(5):
+        book_id = rng.randint(1, catalog_size)
+        calls.append({"name": "update_book", "parameters": {"book_id": book_id,
+                                                            "book_data": {"id": book_id, "title": f"Title {rng.random()}"}}})
+    return calls
+
+def large_list(rng: random.Random, catalog_size: int) -> List[Dict[str, Any]]:
+    return [{"name": "list_books", "parameters": {}}]
+
+# name -> builds the tool calls of one request
+SCENARIOS: Dict[str, Callable[[random.Random, int], List[Dict[str, Any]]]] = {
+    "single": single_call,
+    "big_batch": big_batch,
+    "read_heavy": read_heavy,
+    "write_heavy": write_heavy,
+    "large_list_books": large_list,
+}
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+def process_cpu_seconds(pid: int) -> Optional[float]:
+    """User plus system CPU time of a process, from /proc"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+    except (OSError, IndexError, ValueError):
+        return None
+
+def process_peak_rss_mb(pid: int) -> Optional[float]:
+    """Peak resident set size of a process in MiB, from /proc"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+async def drive(url: str, build: Callable[[random.Random, int], List[Dict[str, Any]]], catalog_size: int,
+                connections: int, duration: float, seed: int) -> Dict[str, Any]:
+    """Send requests over keep-alive connections until duration has passed"""
+    rng = random.Random(seed)
+    latencies: List[float] = []
+    tool_calls = http_errors = tool_errors = 0
+    deadline = time.monotonic() + duration
+
+    async def client(session: aiohttp.ClientSession):
+        nonlocal tool_calls, http_errors, tool_errors
+        while time.monotonic() < deadline:
+            calls = build(rng, catalog_size)
+            start = time.perf_counter()
+            async with session.post(f"{url}/tool-calls", json={"tool_calls": calls}) as response:
+                body = await response.read()
+            latencies.append(time.perf_counter() - start)
+            tool_calls += len(calls)
+            if response.status != 200:
+                http_errors += 1
+                continue
+            tool_errors += sum(result.get("error") is not None for result in json.loads(body)["tool_call_results"])
+
+    connector = aiohttp.TCPConnector(limit=connections)
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        await asyncio.gather(*(client(session) for _ in range(connections)))
+    return {"latencies": latencies, "tool_calls": tool_calls, "http_errors": http_errors, "tool_errors": tool_errors}
+
+def start_stub(port: int, catalog_size: int, latency: float, error_rate: float) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.stub_books_api", "--port", str(port), "--catalog-size", str(catalog_size),
+         "--latency", str(latency), "--error-rate", str(error_rate)],
+        cwd=ROOT, stdout=subprocess.DEVNULL
+    )
+
+def run_scenario(name: str, args) -> Dict[str, Any]:
+    """Start a stub and a server, run one scenario and return its results"""
+    stub_port, port = free_port(), free_port()
+    url = f"http://127.0.0.1:{port}"
+    stub = start_stub(stub_port, args.catalog_size, args.latency, args.error_rate)
+    env = dict(os.environ, BOOKS_API_URL=f"http://127.0.0.1:{stub_port}",
+               MCP_SERVER_HOST="127.0.0.1", MCP_SERVER_PORT=str(port))
+    server = subprocess.Popen(
+        [sys.executable, "run.py", "--production", "--workers", str(args.workers)],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_ready(url)
+        build = SCENARIOS[name]
+        asyncio.run(drive(url, build, args.catalog_size, args.connections, args.warmup, args.seed))
+        cpu_before = process_cpu_seconds(server.pid)
+        measured = asyncio.run(drive(url, build, args.catalog_size, args.connections, args.duration, args.seed))
+        cpu_after = process_cpu_seconds(server.pid)
+        peak_rss = process_peak_rss_mb(server.pid)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+        stub.terminate()
+        stub.wait(timeout=10)
+
+    latencies = sorted(measured["latencies"])
+    requests = len(latencies)
+    # With several workers server.pid is the supervisor, so CPU and memory cover one worker at most
+    cpu = cpu_after - cpu_before if cpu_before is not None and cpu_after is not None and args.workers == 1 else None
+    return {
+        "scenario": name,
+        "requests": requests,
+        "tool_calls": measured["tool_calls"],
+        "requests_per_second": requests / args.duration,
+        "tool_calls_per_second": measured["tool_calls"] / args.duration,
+        "latency_ms": {
+            label: None if value is None else value * 1000
+            for label, value in (("p50", percentile(latencies, 0.50)), ("p90", percentile(latencies, 0.90)),
+                                 ("p99", percentile(latencies, 0.99)), ("max", latencies[-1] if latencies else None))
+        },
+        "http_errors": measured["http_errors"],
+        "tool_errors": measured["tool_errors"],
+        "cpu_seconds": cpu,
+        "cpu_ms_per_request": None if cpu is None or not requests else cpu / requests * 1000,
+        "peak_rss_mb": peak_rss if args.workers == 1 else None
+    }
+
+def _format(value: Optional[float], width: int, precision: int = 1) -> str:
+    return f"{'-':>{width}}" if value is None else f"{value:{width}.{precision}f}"
+
+def print_result(result: Dict[str, Any]):
+    latency = result["latency_ms"]
+    print(f"  {result['scenario']:<17} {result['requests_per_second']:9.1f} req/s "
+          f"{result['tool_calls_per_second']:10.1f} calls/s  "
+          f"p50={_format(latency['p50'], 7, 2)}ms p99={_format(latency['p99'], 7, 2)}ms  "
+          f"cpu/req={_format(result['cpu_ms_per_request'], 6, 3)}ms  rss={_format(result['peak_rss_mb'], 6)}MiB  "
+          f"errors={result['http_errors']}/{result['tool_errors']}")
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, tolerance: float) -> List[str]:
+    """Describe every scenario that regressed against the baseline file"""
+    with open(baseline_path) as f:
+        baseline = {result["scenario"]: result for result in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        before = baseline.get(result["scenario"])
+        if before is None:
+            continue
+        if result["requests_per_second"] < before["requests_per_second"] * (1 - tolerance):
+            regressions.append(f"{result['scenario']}: throughput {before['requests_per_second']:.1f} -> "
+                               f"{result['requests_per_second']:.1f} req/s")
+        p99_before, p99 = before["latency_ms"]["p99"], result["latency_ms"]["p99"]
+        if p99_before is not None and p99 is not None and p99 > p99_before * (1 + tolerance):
+            regressions.append(f"{result['scenario']}: p99 {p99_before:.2f} -> {p99:.2f} ms")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds measured per scenario")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds of load before measuring")
+    parser.add_argument("--connections", type=int, default=16, help="Concurrent client connections")
+    parser.add_argument("--workers", type=int, default=1, help="Server worker processes")
+    parser.add_argument("--catalog-size", type=int, default=10000)
+    parser.add_argument("--latency", type=float, default=0.002, help="Stub Books API latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of Books API requests failing with 500")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--compare", help="Results file from an earlier run to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative regression (default 0.1)")
+    args = parser.parse_args()
+
+    print(f"catalog={args.catalog_size} latency={args.latency * 1000:.1f}ms error_rate={args.error_rate} "
+          f"connections={args.connections} workers={args.workers} duration={args.duration}s")
+    results = []
+    for name in args.scenarios:
+        results.append(run_scenario(name, args))
+        print_result(results[-1])
+
+    if args.json:
+        report = {
+            "version": APP_VERSION,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": {key: value for key, value in vars(args).items() if key not in ("json", "compare")},
+            "results": results
+        }
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.json}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark /tool-calls CPU per request with and without fast-path serialization
+
+The "before" mode returns MCPResponse through FastAPI's response_model
+validation and default JSON encoder; the "after" mode encodes the body
+directly (orjson when installed, reusing the Books API's list_books bytes).
+The stub Books API runs in a separate process so only the MCP server's CPU
+is measured.
+
+Run from the project root:
+    python -m benchmarks.bench_serialization --catalog-size 10000 --rounds 20
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import requests
+from fastapi.testclient import TestClient
+
+import services
+from cache import book_cache
+from main import app
+
+SCENARIOS = [
+    ("list_books (cached)", [{"name": "list_books", "parameters": {}}], True),
+    ("list_books (uncached)", [{"name": "list_books", "parameters": {}}], False),
+    ("list_books limit=100", [{"name": "list_books", "parameters": {"limit": 100}}], True),
+    ("20 x get_book (cached)", [{"name": "get_book", "parameters": {"book_id": i}} for i in range(1, 21)], True),
+]
+
+def start_stub(port: int, catalog_size: int) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.stub_books_api", "--port", str(port), "--catalog-size", str(catalog_size)],
+        stdout=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.get(f"{url}/books/1", timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("stub Books API did not start")
+
+def measure(client: TestClient, tool_calls: list, cached: bool, rounds: int):
+    book_cache.enabled = cached
+    body = {"tool_calls": tool_calls}
+    client.post("/tool-calls", json=body)  # warm up
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for _ in range(rounds):
+        response = client.post("/tool-calls", json=body)
+    cpu = (time.process_time() - cpu_start) / rounds
+    wall = (time.perf_counter() - wall_start) / rounds
+    return cpu, wall, len(response.content)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--catalog-size", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--port", type=int, default=5299)
+    args = parser.parse_args()
+
+    stub = start_stub(args.port, args.catalog_size)
+    try:
+        with TestClient(app) as client:
+            services.BOOKS_API_URL = f"http://127.0.0.1:{args.port}"
+            print(f"catalog={args.catalog_size} books, CPU and latency per /tool-calls request")
+            for name, tool_calls, cached in SCENARIOS:
+                for mode, fast in (("before", "false"), ("after", "true")):
+                    os.environ["MCP_FAST_SERIALIZATION"] = fast
+                    book_cache.clear()
+                    cpu, wall, size = measure(client, tool_calls, cached, args.rounds)
+                    print(f"  {name:<24} {mode:<6} cpu={cpu * 1000:8.2f}ms latency={wall * 1000:8.2f}ms "
+                          f"response={size / 1024:8.1f} KiB")
+    finally:
+        stub.terminate()
+        stub.wait()
+
+if __name__ == "__main__":
+    main()
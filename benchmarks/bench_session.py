@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Benchmark the per-call overhead of small get_book calls over HTTP and persistent MCP sessions
+
+Starts `run.py --production --workers 1` and `run.py --stdio` against an
+in-process stub Books API, warms their book caches, and sends --calls cached
+get_book calls through each transport:
+
+    http       one POST /tool-calls per call over keep-alive connections
+    websocket  JSON-RPC tools/call messages on one /mcp WebSocket
+    stdio      JSON-RPC tools/call lines on the stdio transport's pipes
+
+first with one call in flight (latency), then with --in-flight calls in
+flight (throughput; HTTP uses that many connections, the sessions pipeline
+over one). Reports wall time and server CPU time per call. The WebSocket
+transport needs uvicorn's WebSocket support (the websockets package).
+
+Run from the project root:
+    python -m benchmarks.bench_session --calls 5000 --in-flight 32
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List
+
+import aiohttp
+
+from benchmarks.bench_load import process_cpu_seconds
+from benchmarks.bench_workers import ROOT, free_port, wait_until_ready
+from benchmarks.stub_books_api import StubBooksAPI
+
+CATALOG_SIZE = 100
+
+def call_message(request_id: int) -> str:
+    return json.dumps({"jsonrpc": "2.0", "id": request_id, "method": "tools/call",
+                       "params": {"name": "get_book", "arguments": {"book_id": request_id % CATALOG_SIZE + 1}}})
+
+async def pipelined(send: Callable[[str], Awaitable[None]], receive: Callable[[], Awaitable[object]],
+                    calls: int, in_flight: int):
+    """Send calls over one session, keeping up to in_flight unanswered"""
+    window = asyncio.Semaphore(in_flight)
+
+    async def reader():
+        for _ in range(calls):
+            await receive()
+            window.release()
+
+    reading = asyncio.ensure_future(reader())
+    for request_id in range(calls):
+        await window.acquire()
+        await send(call_message(request_id))
+    await reading
+
+async def http_calls(url: str, calls: int, in_flight: int):
+    async def client(session: aiohttp.ClientSession, count: int):
+        for request_id in range(count):
+            body = {"tool_calls": [{"name": "get_book", "parameters": {"book_id": request_id % CATALOG_SIZE + 1}}]}
+            async with session.post(f"{url}/tool-calls", json=body) as response:
+                await response.read()
+
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=in_flight)) as session:
+        await asyncio.gather(*(client(session, calls // in_flight) for _ in range(in_flight)))
+
+async def websocket_calls(url: str, calls: int, in_flight: int):
+    async with aiohttp.ClientSession() as session:
+        async with session.ws_connect(f"{url.replace('http', 'ws', 1)}/mcp") as ws:
+            await pipelined(ws.send_str, ws.receive_str, calls, in_flight)
+
+class StdioServer:
+    """run.py --stdio as a subprocess with pipes for its session"""
+
+    def __init__(self, stub_url: str):
+        self.stub_url = stub_url
+
+    async def __aenter__(self):
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, "run.py", "--stdio", cwd=ROOT, env=dict(os.environ, BOOKS_API_URL=self.stub_url),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, limit=2 ** 20
+        )
+        return self
+
+    async def send(self, message: str):
+        self.process.stdin.write(message.encode() + b"\n")
+        await self.process.stdin.drain()
+
+    async def receive(self) -> bytes:
+        return await self.process.stdout.readline()
+
+    async def calls(self, calls: int, in_flight: int):
+        await pipelined(self.send, self.receive, calls, in_flight)
+
+    async def __aexit__(self, *exc_info):
+        self.process.stdin.close()
+        await self.process.wait()
+
+async def timed(run: Callable[[], Awaitable[None]], pid: int, calls: int) -> Dict[str, float]:
+    cpu = process_cpu_seconds(pid)
+    start = time.perf_counter()
+    await run()
+    elapsed = time.perf_counter() - start
+    cpu_used = process_cpu_seconds(pid) - cpu if cpu is not None else float("nan")
+    return {"wall_us": elapsed / calls * 1e6, "calls_per_second": calls / elapsed, "cpu_us": cpu_used / calls * 1e6}
+
+async def measure(url: str, server_pid: int, stub_url: str, calls: int, in_flight: int) -> List[tuple]:
+    results = []
+    for window in (1, in_flight):
+        count = calls // window * window
+        await http_calls(url, CATALOG_SIZE, 1)  # warm up the cache
+        results.append(("http", window, await timed(lambda: http_calls(url, count, window), server_pid, count)))
+        await websocket_calls(url, CATALOG_SIZE, 1)
+        results.append(("websocket", window,
+                        await timed(lambda: websocket_calls(url, count, window), server_pid, count)))
+        async with StdioServer(stub_url) as stdio:
+            await stdio.calls(CATALOG_SIZE, 1)
+            results.append(("stdio", window,
+                            await timed(lambda: stdio.calls(count, window), stdio.process.pid, count)))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=5000, help="get_book calls per transport and window")
+    parser.add_argument("--in-flight", type=int, default=32, help="Calls in flight for the throughput run")
+    args = parser.parse_args()
+
+    with StubBooksAPI(catalog_size=CATALOG_SIZE) as stub:
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        env = dict(os.environ, BOOKS_API_URL=stub.url, MCP_SERVER_HOST="127.0.0.1", MCP_SERVER_PORT=str(port))
+        server = subprocess.Popen(
+            [sys.executable, "run.py", "--production", "--workers", "1"],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_until_ready(url)
+            results = asyncio.run(measure(url, server.pid, stub.url, args.calls, args.in_flight))
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+
+    print(f"calls={args.calls} (cached get_book)")
+    print(f"  {'transport':<10} {'in flight':>9} {'wall us/call':>13} {'calls/s':>10} {'server CPU us/call':>19}")
+    for transport, window, result in results:
+        print(f"  {transport:<10} {window:>9} {result['wall_us']:13.1f} {result['calls_per_second']:10.0f} "
+              f"{result['cpu_us']:19.1f}")
+
+if __name__ == "__main__":
+    main()
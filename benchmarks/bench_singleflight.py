@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Thundering-herd load test for request coalescing (single-flight)
+
+Fires waves of identical concurrent get_book/list_books reads with the book
+cache disabled and reports how many requests reached the backend with
+coalescing off and on, for both the threaded and the async service.
+
+Run from the project root:
+    python -m benchmarks.bench_singleflight --clients 200 --waves 10
+"""
+
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import services
+from cache import book_cache
+from http_client import close_http_client
+from services import AsyncBookService, BookService
+from singleflight import async_flight, sync_flight
+from benchmarks.stub_books_api import StubBooksAPI
+
+def threaded_herd(clients: int, waves: int):
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        for wave in range(waves):
+            calls = [pool.submit(BookService.get_book, 1) for _ in range(clients // 2)]
+            calls += [pool.submit(BookService.list_books) for _ in range(clients // 2)]
+            for call in calls:
+                call.result()
+
+async def async_herd(clients: int, waves: int):
+    for wave in range(waves):
+        await asyncio.gather(
+            *[AsyncBookService.get_book(1) for _ in range(clients // 2)],
+            *[AsyncBookService.list_books() for _ in range(clients // 2)]
+        )
+    await close_http_client()
+
+def measure(stub: StubBooksAPI, name: str, run):
+    before = stub.request_count
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    backend_requests = stub.request_count - before
+    print(f"  {name:<28} backend requests={backend_requests:<6} "
+          f"backend QPS={backend_requests / elapsed:8.1f} wall={elapsed:6.2f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200, help="Concurrent identical reads per wave")
+    parser.add_argument("--waves", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub backend latency in seconds")
+    args = parser.parse_args()
+
+    with StubBooksAPI(latency=args.latency, catalog_size=1000) as stub:
+        services.BOOKS_API_URL = stub.url
+        book_cache.enabled = False
+        print(f"{args.waves} waves of {args.clients} identical reads, "
+              f"backend latency {args.latency * 1000:.0f}ms")
+        for enabled in (False, True):
+            sync_flight.enabled = async_flight.enabled = enabled
+            label = "coalesced" if enabled else "uncoalesced"
+            measure(stub, f"threaded {label}", lambda: threaded_herd(args.clients, args.waves))
+            measure(stub, f"async {label}", lambda: asyncio.run(async_herd(args.clients, args.waves)))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark how quickly a new worker is ready to serve, and profile its imports
+
+Prints the modules imported by `import main` grouped by top-level package
+(from `python -X importtime`, cumulative microseconds), then starts
+`run.py --production --workers 1` --runs times against an in-process stub
+Books API and reports the median time from launching the process until
+/health answers and until the first get_book call returns.
+
+With --budget-ms the benchmark exits with status 1 when the median time to
+the first get_book call is over budget, so it can guard cold start in CI.
+
+Run from the project root:
+    python -m benchmarks.bench_startup --runs 5 --budget-ms 2000
+"""
+
+import argparse
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Dict, List, Tuple
+
+from benchmarks.bench_workers import ROOT, free_port
+from benchmarks.stub_books_api import StubBooksAPI
+
+def import_profile() -> Tuple[float, Dict[str, float]]:
+    """Total import time of main and the self time of each top-level package, in milliseconds"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    packages: Dict[str, float] = {}
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0.0) + int(self_us) / 1000
+        if name == "main":
+            total = int(cumulative_us) / 1000
+    return total, packages
+
+def poll(url: str, data: bytes = None, timeout: float = 30.0) -> float:
+    """Retry a request until it succeeds and return the time it did"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+            with urllib.request.urlopen(request, timeout=1.0) as response:
+                response.read()
+                return time.perf_counter()
+        except OSError:
+            time.sleep(0.005)
+    raise RuntimeError(f"{url} did not answer within {timeout}s")
+
+def cold_start(stub_url: str) -> Tuple[float, float]:
+    """Seconds from launching one worker until /health answers and until get_book returns"""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, BOOKS_API_URL=stub_url, MCP_SERVER_HOST="127.0.0.1", MCP_SERVER_PORT=str(port))
+    call = json.dumps({"tool_calls": [{"name": "get_book", "parameters": {"book_id": 1}}]}).encode()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "run.py", "--production", "--workers", "1"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        healthy = poll(f"{url}/health")
+        served = poll(f"{url}/tool-calls", data=call)
+        return healthy - start, served - start
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Cold starts to take the median of")
+    parser.add_argument("--top", type=int, default=10, help="Packages to list in the import profile")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="Fail when the median time to the first get_book call exceeds this")
+    args = parser.parse_args()
+
+    total, packages = import_profile()
+    print(f"import main: {total:.0f}ms")
+    for package, ms in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {package:<24} {ms:8.1f}ms")
+
+    health: List[float] = []
+    first_call: List[float] = []
+    with StubBooksAPI(catalog_size=100) as stub:
+        for _ in range(args.runs):
+            healthy, served = cold_start(stub.url)
+            health.append(healthy)
+            first_call.append(served)
+    median = statistics.median(first_call) * 1000
+    print(f"cold start over {args.runs} runs (median): /health {statistics.median(health) * 1000:.0f}ms, "
+          f"first get_book {median:.0f}ms")
+
+    if args.budget_ms is not None and median > args.budget_ms:
+        print(f"over budget: {median:.0f}ms > {args.budget_ms:.0f}ms")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark tool argument validation
+
+Reports the cost of the compiled input_schema validators per tool call, and
+compares an invalid get_book call that is rejected locally with the same call
+sent to a stub Books API with simulated network latency (validation off).
+
+Run from the project root:
+    python -m benchmarks.bench_validation --iterations 100000 --latency 0.005
+"""
+
+import argparse
+import asyncio
+import time
+
+import dispatcher
+import services
+from benchmarks.stub_books_api import StubBooksAPI
+from cache import book_cache
+from models import ToolCallRequest
+from tools import get_tool_validators
+
+SCENARIOS = [
+    ("get_book", {"book_id": 42}),
+    ("list_books", {"limit": 100, "offset": 0, "fields": ["title", "author", "isbn"]}),
+    ("create_book", {"book_data": {"title": "Dune", "author": "Frank Herbert",
+                                   "isbn": "978-0441013593", "publishedDate": "1965-08-01T00:00:00Z"}}),
+    ("search_books", {"query": "dune", "author": "herbert", "published_after": "1960-01-01", "limit": 10}),
+    ("get_books", {"book_ids": list(range(1, 101))}),
+    ("get_book (invalid)", {"book_id": "42"}),
+]
+
+def measure_validator(name: str, parameters: dict, iterations: int) -> float:
+    """Return microseconds per validation"""
+    validate = get_tool_validators()[name.split()[0]]
+    start = time.perf_counter()
+    for _ in range(iterations):
+        validate(parameters)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+async def measure_call(tool_call: ToolCallRequest, rounds: int) -> float:
+    """Return milliseconds per tool call"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await dispatcher.execute_tool_call(tool_call)
+    return (time.perf_counter() - start) / rounds * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100000, help="Validations timed per scenario")
+    parser.add_argument("--rounds", type=int, default=200, help="Tool calls timed per mode")
+    parser.add_argument("--latency", type=float, default=0.005, help="Stub Books API latency in seconds")
+    args = parser.parse_args()
+
+    print(f"Validator cost ({args.iterations} iterations)")
+    for name, parameters in SCENARIOS:
+        print(f"  {name:<20} {measure_validator(name, parameters, args.iterations):8.2f} us/call")
+
+    # Bypass the book cache so an unvalidated call really reaches the backend
+    book_cache.enabled = False
+    invalid = ToolCallRequest(name="get_book", parameters={"book_id": "42"})
+    with StubBooksAPI(catalog_size=100, latency=args.latency) as stub:
+        services.BOOKS_API_URL = stub.url
+        print(f"Invalid get_book, Books API latency {args.latency * 1000:.1f}ms ({args.rounds} calls)")
+        for mode, validate in (("backend", False), ("local", True)):
+            dispatcher.VALIDATE_TOOL_ARGUMENTS = validate
+            before = stub.request_count
+            ms = asyncio.run(measure_call(invalid, args.rounds))
+            print(f"  {mode:<8} {ms:8.3f} ms/call  backend requests={stub.request_count - before}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark /tool-calls throughput of the production launcher from 1 to N workers
+
+Each run starts `run.py --production --workers N` as a subprocess against an
+in-process stub Books API, drives it with cached get_book batches from
+several client processes, and stops it with SIGTERM. The load generators run
+on the same machine, so leave some cores free for them to see clean scaling.
+
+Run from the project root:
+    python -m benchmarks.bench_workers --max-workers 8 --duration 10
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import List
+
+import aiohttp
+
+from benchmarks.stub_books_api import StubBooksAPI
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_until_ready(url: str, timeout: float = 30.0):
+    """Poll /health until the server answers"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{url}/health", timeout=1.0):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server at {url} did not start within {timeout}s")
+
+async def drive(url: str, connections: int, duration: float, batch: int) -> int:
+    """Send /tool-calls batches over keep-alive connections and count successful responses"""
+    payload = {
+        "tool_calls": [{"name": "get_book", "parameters": {"book_id": i % 100 + 1}} for i in range(batch)]
+    }
+    completed = 0
+    deadline = time.monotonic() + duration
+
+    async def client(session: aiohttp.ClientSession):
+        nonlocal completed
+        while time.monotonic() < deadline:
+            async with session.post(f"{url}/tool-calls", json=payload) as response:
+                await response.read()
+                if response.status == 200:
+                    completed += 1
+
+    connector = aiohttp.TCPConnector(limit=connections)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(*(client(session) for _ in range(connections)))
+    return completed
+
+def run_client(args) -> int:
+    return asyncio.run(drive(*args))
+
+def measure(workers: int, stub_url: str, clients: int, connections: int, duration: float, batch: int) -> float:
+    """Start the server with the given number of workers and return requests per second"""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, BOOKS_API_URL=stub_url, MCP_SERVER_HOST="127.0.0.1", MCP_SERVER_PORT=str(port))
+    server = subprocess.Popen(
+        [sys.executable, "run.py", "--production", "--workers", str(workers)],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_ready(url)
+        # Warm every worker's cache and connection pool before timing
+        run_client((url, connections, 1.0, batch))
+        with multiprocessing.Pool(clients) as pool:
+            counts: List[int] = pool.map(run_client, [(url, connections, duration, batch)] * clients)
+        return sum(counts) / duration
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--clients", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Load generator processes")
+    parser.add_argument("--connections", type=int, default=32, help="Connections per load generator")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to measure each worker count")
+    parser.add_argument("--batch", type=int, default=10, help="get_book calls per /tool-calls request")
+    args = parser.parse_args()
+
+    worker_counts = sorted({1, args.max_workers} | {n for n in (2, 4, 8, 16, 32, 64) if n < args.max_workers})
+    with StubBooksAPI(catalog_size=100) as stub:
+        print(f"clients={args.clients} connections/client={args.connections} batch={args.batch} "
+              f"duration={args.duration}s")
+        baseline = None
+        for workers in worker_counts:
+            rps = measure(workers, stub.url, args.clients, args.connections, args.duration, args.batch)
+            baseline = baseline or rps
+            print(f"  workers={workers:<3} {rps:10.1f} req/s  {rps * args.batch:10.1f} tool calls/s  "
+                  f"speedup={rps / baseline:5.2f}x")
+
+if __name__ == "__main__":
+    main()
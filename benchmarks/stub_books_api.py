@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""Local in-process stub of the .NET Books API used for benchmarks and tests"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+BOOK_PATH = re.compile(r"^/books/(-?\d+)$")
+
+def make_book(book_id: int) -> Dict[str, Any]:
+    """Build a deterministic sample book in the Books API wire format"""
+    return {
+        "id": book_id,
+        "title": f"Sample Book {book_id}",
+        "author": f"Author {book_id % 500}",
+        "isbn": f"978-{book_id:010d}",
+        "publishedDate": f"{1950 + book_id % 70}-01-01T00:00:00Z",
+        "createdAt": "2024-01-01T00:00:00Z"
+    }
+
+class _StubServer(ThreadingHTTPServer):
+    # The default backlog of 5 drops connection bursts from concurrent clients
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # Clients that time out and hang up are expected during fault injection
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+class StubBooksAPI:
+    """
+    In-memory Books API served over HTTP/1.1 keep-alive on a background thread
+
+    Usage:
+        with StubBooksAPI(latency=0.005, catalog_size=1000) as stub:
+            services.BOOKS_API_URL = stub.url
+
+    latency and fail_status can be changed while the stub is running to
+    inject slowness or an outage (every request answered with fail_status).
+    error_rate answers that fraction of requests with a 500 instead.
+    Setting drop_responses to n makes the next n requests take effect but
+    close the connection instead of answering, like a reset after the write.
+    Creates sent with an Idempotency-Key header are only applied once per key.
+    GET responses carry an ETag and honour If-None-Match unless etags=False.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 catalog_size: int = 100, fail_status: Optional[int] = None, etags: bool = True,
+                 error_rate: float = 0.0):
+        self.latency = latency
+        self.fail_status = fail_status
+        self.error_rate = error_rate
+        self.drop_responses = 0
+        self.etags = etags
+        self.idempotent_creates: Dict[str, Dict[str, Any]] = {}
+        self.books: Dict[int, Dict[str, Any]] = {i: make_book(i) for i in range(1, catalog_size + 1)}
+        self.next_id = catalog_size + 1
+        self.request_count = 0
+        self.lock = threading.Lock()
+        self._server = _StubServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubBooksAPI":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubBooksAPI":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _begin(self) -> bool:
+                """Count the request and apply injected latency; False if an injected failure was sent"""
+                with stub.lock:
+                    stub.request_count += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                status = stub.fail_status
+                if not status and stub.error_rate and random.random() < stub.error_rate:
+                    status = 500
+                if status:
+                    self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                    self._send(status, {"title": "Injected failure"})
+                    return False
+                return True
+
+            def _send(self, status: int, payload: Any = None):
+                with stub.lock:
+                    drop = stub.drop_responses > 0
+                    if drop:
+                        stub.drop_responses -= 1
+                if drop:
+                    self.close_connection = True
+                    return
+                body = b"" if payload is None else json.dumps(payload).encode()
+                etag = None
+                if stub.etags and status == 200 and self.command == "GET":
+                    etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+                    if self.headers.get("If-None-Match") == etag:
+                        status, body = 304, b""
+                self.send_response(status)
+                if etag is not None:
+                    self.send_header("ETag", etag)
+                if body:
+                    self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+            def _read_json(self) -> Any:
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def do_GET(self):
+                if not self._begin():
+                    return
+                if self.path == "/books":
+                    with stub.lock:
+                        books = list(stub.books.values())
+                    return self._send(200, books)
+                match = BOOK_PATH.match(self.path)
+                book = stub.books.get(int(match.group(1))) if match else None
+                if book is None:
+                    return self._send(404, {"title": "Not Found"})
+                self._send(200, book)
+
+            def do_POST(self):
+                if not self._begin():
+                    return
+                if self.path != "/books":
+                    return self._send(404)
+                data = self._read_json()
+                if not data.get("title") or not data.get("author"):
+                    return self._send(400, {"title": "Title and author are required"})
+                idempotency_key = self.headers.get("Idempotency-Key")
+                with stub.lock:
+                    book = stub.idempotent_creates.get(idempotency_key)
+                    if book is None:
+                        book_id = data.get("id") or stub.next_id
+                        stub.next_id = max(stub.next_id, book_id) + 1
+                        book = {**make_book(book_id), **data, "id": book_id,
+                                "createdAt": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")}
+                        stub.books[book_id] = book
+                        if idempotency_key is not None:
+                            stub.idempotent_creates[idempotency_key] = book
+                self._send(201, book)
+
+            def do_PUT(self):
+                if not self._begin():
+                    return
+                match = BOOK_PATH.match(self.path)
+                data = self._read_json()
+                with stub.lock:
+                    book_id = int(match.group(1)) if match else None
+                    if book_id not in stub.books:
+                        return self._send(404)
+                    if data.get("id") != book_id:
+                        return self._send(400, {"title": "ID mismatch"})
+                    stub.books[book_id] = {**stub.books[book_id], **data}
+                self._send(204)
+
+            def do_DELETE(self):
+                if not self._begin():
+                    return
+                match = BOOK_PATH.match(self.path)
+                with stub.lock:
+                    book = stub.books.pop(int(match.group(1)), None) if match else None
+                self._send(404 if book is None else 204)
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a stub Books API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5288)
+    parser.add_argument("--latency", type=float, default=0.0, help="Per-request latency in seconds")
+    parser.add_argument("--catalog-size", type=int, default=100)
+    parser.add_argument("--fail-status", type=int, help="Answer every request with this status code")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 500")
+    args = parser.parse_args()
+
+    stub = StubBooksAPI(args.host, args.port, args.latency, args.catalog_size, args.fail_status,
+                        error_rate=args.error_rate)
+    print(f"Stub Books API listening on {stub.url} with {len(stub.books)} books")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
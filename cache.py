@@ -0,0 +1,272 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, ContextManager, Dict, Hashable, List, Optional
+
+from config import (
+    get_book_cache_enabled,
+    get_book_cache_size,
+    get_book_cache_ttl,
+    get_book_list_cache_ttl,
+    get_book_cache_backend,
+    get_shared_cache_path,
+    get_idempotency_key_ttl,
+    get_idempotency_key_cache_size,
+    get_compact_catalog,
+)
+from shared_cache import SharedBookCache, SharedTTLCache
+from catalog import CatalogView
+
+class TTLCache:
+    """Thread-safe bounded LRU cache whose entries expire after a fixed TTL"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_hits = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                # Expired entries stay until replaced or evicted so get_stale() can serve them
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_stale(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key even if it has expired, or None if missing"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self.stale_hits += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any):
+        """Store value under key, evicting the least recently used entry when full"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def replace(self, key: Hashable, update: Callable[[Any], Any]):
+        """Replace an entry with update(value), keeping its original expiry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (update(entry[0]), entry[1])
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "stale_hits": self.stale_hits
+        }
+
+class BookCache:
+    """
+    Read-through cache for Books API reads
+
+    Books are cached by id in an LRU with TTL and the full list_books result
+    is kept as a single snapshot. Writes made through BookService update or
+    invalidate both. Each write bumps a generation counter, and reads only
+    populate the cache if no write happened while they were in flight, so a
+    slow read can never overwrite a fresher invalidation.
+    """
+
+    LIST_KEY = "books"
+
+    def __init__(self, enabled: bool, max_size: int, ttl: float, list_ttl: float):
+        self.enabled = enabled
+        self.books = TTLCache(max_size, ttl)
+        self.lists = TTLCache(1, list_ttl)
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    def get_book(self, book_id: int) -> Optional[Dict[str, Any]]:
+        return self.books.get(book_id) if self.enabled else None
+
+    def get_books(self) -> Optional[List[Dict[str, Any]]]:
+        return self.lists.get(self.LIST_KEY) if self.enabled else None
+
+    def get_stale_book(self, book_id: int) -> Optional[Dict[str, Any]]:
+        """A cached book even if it has expired, for use while the Books API is unavailable"""
+        return self.books.get_stale(book_id) if self.enabled else None
+
+    def get_stale_books(self) -> Optional[List[Dict[str, Any]]]:
+        """The list_books snapshot even if it has expired, for use while the Books API is unavailable"""
+        return self.lists.get_stale(self.LIST_KEY) if self.enabled else None
+
+    def put_book(self, book_id: int, book: Dict[str, Any], generation: int):
+        """Cache a book read that started at the given generation"""
+        with self._lock:
+            if self.enabled and generation == self.generation:
+                self.books.set(book_id, book)
+
+    def put_books(self, books: List[Dict[str, Any]], generation: int):
+        """Cache a list_books read that started at the given generation"""
+        with self._lock:
+            if self.enabled and generation == self.generation:
+                self.lists.set(self.LIST_KEY, books)
+
+    def book_created(self, book: Dict[str, Any]):
+        """Record a successful create: cache the new book and append it to the list snapshot"""
+        with self._lock:
+            self.generation += 1
+            book_id = book.get("id") if isinstance(book, dict) else None
+            if book_id is None:
+                self.lists.clear()
+                return
+            self.books.set(book_id, book)
+            # Copy on write: callers may still be serializing the old snapshot. A
+            # CatalogView gets a new view that appends to its catalog in place
+            self.lists.replace(
+                self.LIST_KEY,
+                lambda books: books.extended(book) if isinstance(books, CatalogView) else books + [book]
+            )
+
+    def book_updated(self, book_id: int):
+        """Record a successful update: the backend returns no body, so drop the stale copies"""
+        with self._lock:
+            self.generation += 1
+            self.books.delete(book_id)
+            self.lists.clear()
+
+    def book_deleted(self, book_id: int):
+        """Record a successful delete: drop the book and remove it from the list snapshot"""
+        with self._lock:
+            self.generation += 1
+            self.books.delete(book_id)
+            self.lists.replace(
+                self.LIST_KEY,
+                lambda books: books.without(book_id) if isinstance(books, CatalogView)
+                else [book for book in books if book.get("id") != book_id]
+            )
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self.books.clear()
+            self.lists.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "backend": "memory",
+            "books": self.books.stats(),
+            "list_books": self.lists.stats()
+        }
+
+def create_book_cache():
+    """Create the book cache for the configured backend (see config.get_book_cache_backend)"""
+    settings = dict(
+        enabled=get_book_cache_enabled(),
+        max_size=get_book_cache_size(),
+        ttl=get_book_cache_ttl(),
+        list_ttl=get_book_list_cache_ttl()
+    )
+    if get_book_cache_backend() == "shared":
+        return SharedBookCache(path=get_shared_cache_path(), compact=get_compact_catalog(), **settings)
+    return BookCache(**settings)
+
+# Process-wide cache shared by BookService and AsyncBookService, and by all
+# worker processes when the shared backend is used
+book_cache = create_book_cache()
+
+class IdempotencyKeys:
+    """
+    create_book idempotency keys and what became of the create each was used for
+
+    A call claims its key before sending the create, so concurrent or
+    repeated calls with the same key wait for it instead of posting again.
+    Each entry holds the book data and a state:
+
+        pending  a call is sending the create, until lease_until (wall clock;
+                 after that the call is presumed lost and the outcome unknown)
+        created  the create succeeded; book is the created book
+        unknown  the request may have reached the Books API but no answer came back
+
+    Keys whose create definitely failed are released so the call can be
+    repeated. Entries live in a TTLCache, or with the shared book cache in a
+    table of its SharedStore so that every worker process sees them; atomic()
+    guards each claim against concurrent claims in the same scope.
+    """
+
+    def __init__(self, entries, atomic: Callable[[], ContextManager]):
+        self.entries = entries
+        self.atomic = atomic
+
+    def claim(self, key: str, book_data: dict, lease: float, reclaim_unknown: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Take key for a create of book_data that may run for up to lease seconds
+
+        Returns:
+            None if the caller now holds the key, otherwise the existing entry.
+            An unknown outcome (or an expired lease) is taken over instead when
+            reclaim_unknown is set, i.e. when sending the create again is safe.
+        """
+        with self.atomic():
+            entry = self.entries.get(key)
+            if entry is not None and entry["state"] == "pending" and entry["lease_until"] <= time.time():
+                entry = dict(entry, state="unknown")
+            if entry is not None and not (entry["state"] == "unknown" and reclaim_unknown):
+                return entry
+            self.entries.set(key, {"state": "pending", "book_data": dict(book_data), "book": None,
+                                   "lease_until": time.time() + lease})
+            return None
+
+    def created(self, key: str, book_data: dict, book: Dict[str, Any]):
+        self.entries.set(key, {"state": "created", "book_data": dict(book_data), "book": book, "lease_until": 0})
+
+    def outcome_unknown(self, key: str, book_data: dict):
+        self.entries.set(key, {"state": "unknown", "book_data": dict(book_data), "book": None, "lease_until": 0})
+
+    def release(self, key: str):
+        self.entries.delete(key)
+
+    def clear(self):
+        self.entries.clear()
+
+def create_idempotency_keys() -> IdempotencyKeys:
+    """Keep idempotency keys with the book cache: per process, or in the shared store"""
+    max_size, ttl = get_idempotency_key_cache_size(), get_idempotency_key_ttl()
+    if isinstance(book_cache, SharedBookCache):
+        store = book_cache.store
+        return IdempotencyKeys(SharedTTLCache(store, "idempotency_keys", max_size, ttl), store.transaction)
+    lock = threading.Lock()
+    return IdempotencyKeys(TTLCache(max_size, ttl), lambda: lock)
+
+# create_book idempotency keys, so a create that is repeated after its response
+# was lost returns the original book instead of posting again
+idempotent_creates = create_idempotency_keys()
@@ -0,0 +1,553 @@
+from array import array
+from bisect import bisect_left
+from collections.abc import Sequence
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+from serialization import dumps, loads, loads_list, register_sequence
+
+# Book fields of the Books API wire format with a packed column, in the order they are materialized
+FIELDS = ("id", "title", "author", "isbn", "publishedDate", "createdAt")
+
+# Row flags: a set field bit means the field is absent or irregular and kept in the row's extras
+FIELD_FLAGS = {field: 1 << bit for bit, field in enumerate(FIELDS)}
+EXTRA_FIELDS = 1 << 6  # The row's extras hold fields beyond FIELDS
+DELETED = 1 << 7
+UNADDRESSABLE = DELETED | FIELD_FLAGS["id"]  # Rows that cannot be looked up by id
+
+# Rows materialized at a time when iterating or encoding a view
+ENCODE_CHUNK = 4096
+
+def pack_isbn(isbn: Any) -> Optional[int]:
+    """
+    Pack an ISBN of 1-13 ASCII digits, optionally split by single hyphens, into an int
+
+    Layout: digits << 16 | hyphen mask << 4 | digit count, where bit i of the
+    mask is a hyphen after digit i. Returns None for anything else.
+    """
+    if type(isbn) is not str:
+        return None
+    digits = isbn.replace("-", "")
+    count = len(digits)
+    if not 0 < count <= 13 or not digits.isdigit() or not digits.isascii():
+        return None
+    mask = 0
+    if count != len(isbn):
+        if isbn[0] == "-" or isbn[-1] == "-" or "--" in isbn:
+            return None
+        hyphens = 0
+        position = isbn.find("-")
+        while position != -1:
+            mask |= 1 << (position - hyphens - 1)
+            hyphens += 1
+            position = isbn.find("-", position + 1)
+    return int(digits) << 16 | mask << 4 | count
+
+def unpack_isbn(packed: int) -> str:
+    count = packed & 15
+    mask = packed >> 4 & 0xFFF
+    digits = str(packed >> 16).zfill(count)
+    if not mask:
+        return digits
+    if not mask & (mask - 1):
+        end = mask.bit_length()
+        return digits[:end] + "-" + digits[end:]
+    parts = []
+    start = 0
+    while mask:
+        end = (mask & -mask).bit_length()
+        parts.append(digits[start:end])
+        start = end
+        mask &= mask - 1
+    parts.append(digits[start:])
+    return "-".join(parts)
+
+# Timestamps repeat a lot (and their day and time of day even more), so they are converted through memo tables
+MEMO_SIZE = 1 << 16
+_timestamps: Dict[str, int] = {}
+_timestamp_texts: Dict[int, str] = {}
+_day_ordinals: Dict[str, int] = {}
+_day_texts: Dict[int, str] = {}
+_time_seconds: Dict[str, int] = {}
+_time_texts: Dict[int, str] = {}
+
+def _remember(memo: Dict, key: Any, value: Any):
+    if len(memo) >= MEMO_SIZE:
+        memo.clear()
+    memo[key] = value
+
+def _day_ordinal(text: str) -> Optional[int]:
+    """The proleptic Gregorian ordinal of an ASCII YYYY-MM-DD date, or None"""
+    days = _day_ordinals.get(text)
+    if days is None:
+        if text[4] != "-" or text[7] != "-" or not (text[:4] + text[5:7] + text[8:]).isdigit():
+            return None
+        try:
+            days = date(int(text[:4]), int(text[5:7]), int(text[8:])).toordinal()
+        except ValueError:
+            return None
+        _remember(_day_ordinals, text, days)
+    return days
+
+def _seconds_of_day(text: str) -> Optional[int]:
+    """The seconds since midnight of an ASCII HH:MM:SS time, or None"""
+    seconds = _time_seconds.get(text)
+    if seconds is None:
+        if text[2] != ":" or text[5] != ":" or not (text[:2] + text[3:5] + text[6:]).isdigit():
+            return None
+        hour, minute, second = int(text[:2]), int(text[3:5]), int(text[6:])
+        if hour > 23 or minute > 59 or second > 59:
+            return None
+        seconds = (hour * 60 + minute) * 60 + second
+        _remember(_time_seconds, text, seconds)
+    return seconds
+
+def pack_timestamp(value: Any) -> Optional[int]:
+    """
+    Pack a YYYY-MM-DDTHH:MM:SS timestamp, optionally followed by Z, into seconds since 0001-01-01 << 1 | Z
+
+    Returns None for any other value, so unpacking always gives back the original string.
+    """
+    packed = _timestamps.get(value) if type(value) is str else None
+    if packed is not None:
+        return packed
+    if type(value) is not str or len(value) not in (19, 20) or value[10] != "T" or not value.isascii():
+        return None
+    if len(value) == 20 and value[19] != "Z":
+        return None
+    days = _day_ordinal(value[:10])
+    seconds = _seconds_of_day(value[11:19])
+    if days is None or seconds is None:
+        return None
+    packed = (days * 86400 + seconds) << 1 | (len(value) == 20)
+    _remember(_timestamps, value, packed)
+    return packed
+
+def unpack_timestamp(packed: int) -> str:
+    text = _timestamp_texts.get(packed)
+    if text is not None:
+        return text
+    days, seconds = divmod(packed >> 1, 86400)
+    day = _day_texts.get(days)
+    if day is None:
+        day = date.fromordinal(days).isoformat()
+        _remember(_day_texts, days, day)
+    time_of_day = _time_texts.get(seconds)
+    if time_of_day is None:
+        minutes, second = divmod(seconds, 60)
+        time_of_day = "%02d:%02d:%02d" % (minutes // 60, minutes % 60, second)
+        _remember(_time_texts, seconds, time_of_day)
+    text = day + "T" + time_of_day + "Z" if packed & 1 else day + "T" + time_of_day
+    _remember(_timestamp_texts, packed, text)
+    return text
+
+class CompactCatalog:
+    """
+    Columnar in-memory store for a large set of books
+
+    Each book is a row across packed columns: the id, the title as UTF-8 in a
+    shared byte heap (offset and length), the author as a code into a table
+    of interned names, the ISBN, publishedDate and createdAt packed into
+    64-bit integers (see pack_isbn and pack_timestamp) and a flags byte. That
+    is about 49 bytes plus the title per book, against several hundred for a dict.
+    Values that do not fit their column (other types, unusual formats, absent
+    fields) and fields beyond FIELDS are kept in a per-row extras dict, so
+    every book is materialized exactly as it was stored.
+
+    Rows are looked up by id with a binary search while ids arrive in
+    increasing order (as the Books API lists them) and through a dict built
+    on first need otherwise. Deleting a row only flags it; updating one
+    writes its columns in place, leaving the old title bytes in the heap
+    until the catalog is rebuilt.
+    """
+
+    def __init__(self):
+        self.ids = array("q")
+        self.title_starts = array("q")
+        self.title_lengths = array("i")
+        self.title_heap = bytearray()
+        self.author_codes = array("i")
+        self.isbns = array("q")
+        self.published = array("q")
+        self.created = array("q")
+        self.flags = bytearray()
+        self.extras: Dict[int, Dict[str, Any]] = {}
+        self.authors: List[str] = []
+        self.author_table: Dict[str, int] = {}
+        self.deleted = 0
+        self._ids_sorted = True
+        self._rows_by_id: Optional[Dict[int, int]] = None
+
+    @classmethod
+    def from_books(cls, books: Iterable[Dict[str, Any]]) -> "CompactCatalog":
+        """Build a catalog from book dicts, or copy the rows of a CatalogView without materializing them"""
+        if isinstance(books, CatalogView):
+            return books.catalog.copy(books.rows)
+        catalog = cls()
+        for book in books:
+            catalog.append(book)
+        return catalog
+
+    def __len__(self) -> int:
+        """The number of live (not deleted) rows"""
+        return len(self.ids) - self.deleted
+
+    def append(self, book: Dict[str, Any]) -> int:
+        """Add a book as a new row and return the row number"""
+        row = len(self.ids)
+        if len(book) == len(FIELDS):
+            # Fast path for a book in the exact wire format, with nothing for extras
+            book_id, title, author = book.get("id"), book.get("title"), book.get("author")
+            isbn = pack_isbn(book.get("isbn"))
+            published = pack_timestamp(book.get("publishedDate"))
+            created = pack_timestamp(book.get("createdAt"))
+            if (type(book_id) is int and -2 ** 63 <= book_id < 2 ** 63 and type(title) is str
+                    and type(author) is str and isbn is not None and published is not None and created is not None):
+                encoded = title.encode("utf-8")
+                if len(encoded) < 2 ** 31:
+                    code = self.author_table.get(author)
+                    if code is None:
+                        code = self.author_table[author] = len(self.authors)
+                        self.authors.append(author)
+                    if self._ids_sorted and row and self.ids[row - 1] >= book_id:
+                        self._ids_sorted = False
+                    if self._rows_by_id is not None:
+                        self._rows_by_id[book_id] = row
+                    self.ids.append(book_id)
+                    self.title_starts.append(len(self.title_heap))
+                    self.title_lengths.append(len(encoded))
+                    self.title_heap += encoded
+                    self.author_codes.append(code)
+                    self.isbns.append(isbn)
+                    self.published.append(published)
+                    self.created.append(created)
+                    self.flags.append(0)
+                    return row
+        self.ids.append(0)
+        self.title_starts.append(0)
+        self.title_lengths.append(0)
+        self.author_codes.append(0)
+        self.isbns.append(0)
+        self.published.append(0)
+        self.created.append(0)
+        self.flags.append(0)
+        self._store(row, book)
+        return row
+
+    def _store(self, row: int, book: Dict[str, Any]):
+        """Write book into the columns of row"""
+        flags = 0
+        extras = {}
+        for field, value in book.items():
+            if field == "id":
+                if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+                    self._set_id(row, value)
+                    continue
+            elif field == "title":
+                if type(value) is str:
+                    encoded = value.encode("utf-8")
+                    if len(encoded) < 2 ** 31:
+                        self.title_starts[row] = len(self.title_heap)
+                        self.title_lengths[row] = len(encoded)
+                        self.title_heap += encoded
+                        continue
+            elif field == "author":
+                if type(value) is str:
+                    code = self.author_table.get(value)
+                    if code is None:
+                        code = self.author_table[value] = len(self.authors)
+                        self.authors.append(value)
+                    self.author_codes[row] = code
+                    continue
+            elif field == "isbn":
+                packed = pack_isbn(value)
+                if packed is not None:
+                    self.isbns[row] = packed
+                    continue
+            elif field == "publishedDate":
+                packed = pack_timestamp(value)
+                if packed is not None:
+                    self.published[row] = packed
+                    continue
+            elif field == "createdAt":
+                packed = pack_timestamp(value)
+                if packed is not None:
+                    self.created[row] = packed
+                    continue
+            else:
+                flags |= EXTRA_FIELDS
+            extras[field] = value
+        for field, flag in FIELD_FLAGS.items():
+            if field in extras or field not in book:
+                flags |= flag
+        if flags & FIELD_FLAGS["id"]:
+            # Rows without a usable id are never looked up by id
+            self._ids_sorted = False
+            if self._rows_by_id is not None and self._rows_by_id.get(self.ids[row]) == row:
+                del self._rows_by_id[self.ids[row]]
+        self.flags[row] = flags
+        if extras:
+            self.extras[row] = extras
+        else:
+            self.extras.pop(row, None)
+
+    def _set_id(self, row: int, book_id: int):
+        ids = self.ids
+        if self._ids_sorted and ((row and ids[row - 1] >= book_id) or (row + 1 < len(ids) and ids[row + 1] <= book_id)):
+            self._ids_sorted = False
+        ids[row] = book_id
+        if self._rows_by_id is not None:
+            self._rows_by_id[book_id] = row
+
+    def row_of(self, book_id: int) -> Optional[int]:
+        """The live row holding book_id, or None"""
+        if self._ids_sorted:
+            row = bisect_left(self.ids, book_id)
+            if row < len(self.ids) and self.ids[row] == book_id and not self.flags[row] & UNADDRESSABLE:
+                return row
+            return None
+        if self._rows_by_id is None:
+            self._rows_by_id = {
+                self.ids[row]: row for row in range(len(self.ids)) if not self.flags[row] & UNADDRESSABLE
+            }
+        return self._rows_by_id.get(book_id)
+
+    def get(self, book_id: int) -> Optional[Dict[str, Any]]:
+        row = self.row_of(book_id)
+        return None if row is None else self.row(row)
+
+    def update(self, book_id: int, book: Dict[str, Any]) -> bool:
+        """Replace the row of book_id with book (which must have the same id); returns whether it existed"""
+        row = self.row_of(book_id)
+        if row is None:
+            return False
+        self._store(row, book)
+        return True
+
+    def delete(self, book_id: int) -> bool:
+        """Flag the row of book_id as deleted; returns whether it existed"""
+        row = self.row_of(book_id)
+        if row is None:
+            return False
+        self.flags[row] |= DELETED
+        self.extras.pop(row, None)
+        self.deleted += 1
+        if self._rows_by_id is not None:
+            del self._rows_by_id[book_id]
+        return True
+
+    def row(self, row: int) -> Dict[str, Any]:
+        """Materialize one row as a new book dict"""
+        return self.rows([row])[0]
+
+    def rows(self, rows: Iterable[int]) -> List[Dict[str, Any]]:
+        """Materialize rows as new book dicts"""
+        ids, flags, heap = self.ids, self.flags, self.title_heap
+        title_starts, title_lengths = self.title_starts, self.title_lengths
+        authors, author_codes = self.authors, self.author_codes
+        isbns, published, created = self.isbns, self.published, self.created
+        books = []
+        append = books.append
+        for row in rows:
+            if flags[row]:
+                append(self._irregular_row(row))
+                continue
+            start = title_starts[row]
+            append({
+                "id": ids[row],
+                "title": heap[start:start + title_lengths[row]].decode("utf-8"),
+                "author": authors[author_codes[row]],
+                "isbn": unpack_isbn(isbns[row]),
+                "publishedDate": unpack_timestamp(published[row]),
+                "createdAt": unpack_timestamp(created[row])
+            })
+        return books
+
+    def _irregular_row(self, row: int) -> Dict[str, Any]:
+        flags = self.flags[row]
+        extras = self.extras.get(row, {})
+        book = {}
+        for field, flag in FIELD_FLAGS.items():
+            if not flags & flag:
+                book[field] = self._value(row, field)
+            elif field in extras:
+                book[field] = extras[field]
+        if flags & EXTRA_FIELDS:
+            for field, value in extras.items():
+                if field not in FIELD_FLAGS:
+                    book[field] = value
+        return book
+
+    def _value(self, row: int, field: str) -> Any:
+        if field == "id":
+            return self.ids[row]
+        if field == "title":
+            start = self.title_starts[row]
+            return self.title_heap[start:start + self.title_lengths[row]].decode("utf-8")
+        if field == "author":
+            return self.authors[self.author_codes[row]]
+        if field == "isbn":
+            return unpack_isbn(self.isbns[row])
+        if field == "publishedDate":
+            return unpack_timestamp(self.published[row])
+        return unpack_timestamp(self.created[row])
+
+    def live_rows(self) -> Union[range, array]:
+        """The row numbers of all live rows, in insertion order"""
+        if not self.deleted:
+            return range(len(self.ids))
+        return array("q", (row for row in range(len(self.ids)) if not self.flags[row] & DELETED))
+
+    def live_ids(self) -> Iterator[int]:
+        ids, flags = self.ids, self.flags
+        return (ids[row] for row in range(len(ids)) if not flags[row] & UNADDRESSABLE)
+
+    def copy(self, rows: Optional[Union[range, array]] = None) -> "CompactCatalog":
+        """A new catalog holding the given rows (all live rows by default), without materializing them"""
+        if rows is None:
+            rows = self.live_rows()
+        copied = CompactCatalog()
+        if rows == range(len(self.ids)) and not self.deleted:
+            copied.ids = array("q", self.ids)
+            copied.title_starts = array("q", self.title_starts)
+            copied.title_lengths = array("i", self.title_lengths)
+            copied.title_heap = bytearray(self.title_heap)
+            copied.author_codes = array("i", self.author_codes)
+            copied.isbns = array("q", self.isbns)
+            copied.published = array("q", self.published)
+            copied.created = array("q", self.created)
+            copied.flags = bytearray(self.flags)
+            copied.extras = {row: dict(extras) for row, extras in self.extras.items()}
+            copied.authors = list(self.authors)
+            copied.author_table = dict(self.author_table)
+            copied._ids_sorted = self._ids_sorted
+            return copied
+        copied.authors = list(self.authors)
+        copied.author_table = dict(self.author_table)
+        previous = None
+        for new_row, row in enumerate(rows):
+            book_id = self.ids[row]
+            copied.ids.append(book_id)
+            start, length = self.title_starts[row], self.title_lengths[row]
+            copied.title_starts.append(len(copied.title_heap))
+            copied.title_lengths.append(length)
+            copied.title_heap += self.title_heap[start:start + length]
+            copied.author_codes.append(self.author_codes[row])
+            copied.isbns.append(self.isbns[row])
+            copied.published.append(self.published[row])
+            copied.created.append(self.created[row])
+            copied.flags.append(self.flags[row])
+            if row in self.extras:
+                copied.extras[new_row] = dict(self.extras[row])
+            if previous is not None and previous >= book_id:
+                copied._ids_sorted = False
+            previous = book_id
+        return copied
+
+    def view(self) -> "CatalogView":
+        return CatalogView(self, self.live_rows())
+
+    def memory_bytes(self) -> int:
+        """Approximate bytes held by the columns and the author table (extras not included)"""
+        columns = (self.ids, self.title_starts, self.title_lengths, self.author_codes, self.isbns, self.published,
+                   self.created)
+        return (sum(column.itemsize * len(column) for column in columns) + len(self.title_heap) + len(self.flags)
+                + sum(len(author) + 49 for author in self.authors))
+
+class CatalogView(Sequence):
+    """
+    A read-only list of books backed by rows of a CompactCatalog
+
+    Indexing materializes a book dict; slicing returns another view over the
+    same catalog without copying, so pagination stays cheap. Views are
+    encoded to JSON chunk by chunk at the response boundary (see
+    serialization.register_sequence). The catalog behind a view must not be
+    modified except by appending rows; appended(), extended() and without()
+    return new views instead.
+    """
+
+    __slots__ = ("catalog", "rows")
+
+    def __init__(self, catalog: CompactCatalog, rows: Union[range, array]):
+        self.catalog = catalog
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return CatalogView(self.catalog, self.rows[index])
+        return self.catalog.row(self.rows[index])
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for start in range(0, len(self.rows), ENCODE_CHUNK):
+            yield from self.catalog.rows(self.rows[start:start + ENCODE_CHUNK])
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (CatalogView, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __add__(self, other: List[Dict[str, Any]]) -> "CatalogView":
+        return self.appended(*other)
+
+    def __repr__(self) -> str:
+        return f"CatalogView({len(self)} books)"
+
+    def appended(self, *books: Dict[str, Any]) -> "CatalogView":
+        """A view of a copy of this view's books with books added at the end"""
+        catalog = self.catalog.copy(self.rows)
+        for book in books:
+            catalog.append(book)
+        return catalog.view()
+
+    def extended(self, *books: Dict[str, Any]) -> "CatalogView":
+        """
+        A view over the same catalog with books appended to it as new rows
+
+        Existing views are unaffected, since appending never changes the rows
+        they cover; only the row numbers are copied when the view is not a
+        plain range. Calls for one catalog must not run concurrently.
+        """
+        catalog = self.catalog
+        start = len(catalog.ids)
+        for book in books:
+            catalog.append(book)
+        if isinstance(self.rows, range) and self.rows.step == 1 and self.rows.stop == start:
+            return CatalogView(catalog, range(self.rows.start, len(catalog.ids)))
+        rows = array("q", self.rows)
+        rows.extend(range(start, len(catalog.ids)))
+        return CatalogView(catalog, rows)
+
+    def without(self, book_id: int) -> "CatalogView":
+        """A view over the same catalog without the rows of book_id"""
+        ids, flags = self.catalog.ids, self.catalog.flags
+        return CatalogView(self.catalog, array("q", (
+            row for row in self.rows if ids[row] != book_id or flags[row] & FIELD_FLAGS["id"]
+        )))
+
+    def to_json(self) -> bytes:
+        """Encode the books as a JSON array, materializing ENCODE_CHUNK rows at a time"""
+        chunks = []
+        for start in range(0, len(self.rows), ENCODE_CHUNK):
+            chunks.append(dumps(self.catalog.rows(self.rows[start:start + ENCODE_CHUNK]))[1:-1])
+        return b"[" + b",".join(chunks) + b"]"
+
+register_sequence(CatalogView, CatalogView.to_json)
+
+def loads_catalog(data: bytes) -> Any:
+    """
+    Decode a JSON document, storing a top-level array of book objects in a CompactCatalog
+
+    The array is decoded to dicts first and packed row by row, so the dicts
+    only live until they are packed. Other documents are decoded like loads_list.
+    """
+    value = loads(data)
+    if not isinstance(value, list) or not all(type(book) is dict for book in value):
+        return loads_list(data) if isinstance(value, list) else value
+    catalog = CompactCatalog()
+    for index in range(len(value)):
+        catalog.append(value[index])
+        value[index] = None
+    return catalog.view()
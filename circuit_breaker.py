@@ -0,0 +1,172 @@
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from config import (
+    get_circuit_breaker_enabled,
+    get_circuit_failure_threshold,
+    get_circuit_reset_timeout,
+    get_adaptive_timeout_enabled,
+    get_adaptive_timeout_min,
+    get_http_read_timeout,
+)
+from metrics import error_category
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a Books API endpoint whose circuit is open"""
+
+class EndpointBreaker:
+    """
+    Circuit breaker and adaptive read timeout for one Books API endpoint
+
+    After failure_threshold consecutive failures (timeouts, connection errors
+    or 5xx responses) the circuit opens and requests fail fast with
+    CircuitOpenError. Once reset_timeout has passed a single probe request is
+    let through (half-open); its outcome closes or re-opens the circuit.
+
+    The read timeout follows the endpoint's latency like a TCP retransmission
+    timeout (RFC 6298): smoothed latency plus four times its mean deviation,
+    doubled after a timeout and kept between the configured bounds.
+    """
+
+    def __init__(self, method: str, endpoint: str, settings: "BackendHealth"):
+        self.method = method
+        self.endpoint = endpoint
+        self.settings = settings
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.times_opened = 0
+        self.rejections = 0
+        self.srtt: Optional[float] = None
+        self.rttvar = 0.0
+        self.rto: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """
+        Check whether a request may be sent
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with a probe already in flight
+        """
+        if not self.settings.enabled:
+            return
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self.opened_at + self.settings.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    self.rejections += 1
+                    raise CircuitOpenError(
+                        f"circuit open for {self.method} {self.endpoint}, retrying in {remaining:.1f}s")
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                if self.probe_in_flight:
+                    self.rejections += 1
+                    raise CircuitOpenError(f"circuit half-open for {self.method} {self.endpoint}, probe in flight")
+                self.probe_in_flight = True
+
+    def read_timeout(self) -> float:
+        """The read timeout in seconds for the next request"""
+        if not self.settings.adaptive_timeout or self.rto is None:
+            return self.settings.timeout_max
+        return self.rto
+
+    def record(self, elapsed: float, status: Optional[int] = None, error: Optional[BaseException] = None):
+        """
+        Record the outcome of a request let through by before_request()
+
+        Args:
+            elapsed: Seconds the request took
+            status: The response status code, if a response was received
+            error: The exception raised instead of a response
+        """
+        category = None if error is None else error_category(error)
+        with self._lock:
+            self.probe_in_flight = False
+            if error is None and status is not None and status < 500:
+                self._observe_latency(elapsed)
+                self.consecutive_failures = 0
+                self.state = CLOSED
+            elif category in ("cancelled", "other"):
+                # Not evidence about the backend; a half-open circuit probes again
+                return
+            else:
+                if category == "timeout" and self.rto is not None:
+                    # Back off from the timeout that expired, so a wave of concurrent
+                    # timeouts doubles the timeout once rather than once per request
+                    self.rto = min(max(self.rto, 2 * elapsed), self.settings.timeout_max)
+                self.consecutive_failures += 1
+                if self.state == HALF_OPEN or self.consecutive_failures >= self.settings.failure_threshold:
+                    if self.state != OPEN:
+                        self.times_opened += 1
+                    self.state = OPEN
+                    self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejections": self.rejections,
+            "read_timeout_ms": round(self.read_timeout() * 1000, 1),
+            "latency_ms": None if self.srtt is None else round(self.srtt * 1000, 3)
+        }
+
+    def _observe_latency(self, elapsed: float):
+        if self.srtt is None:
+            self.srtt = elapsed
+            self.rttvar = elapsed / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - elapsed)
+            self.srtt = 0.875 * self.srtt + 0.125 * elapsed
+        self.rto = min(max(self.srtt + 4 * self.rttvar, self.settings.timeout_min), self.settings.timeout_max)
+
+class BackendHealth:
+    """The circuit breakers of all Books API endpoints, created on first use"""
+
+    def __init__(self, enabled: bool, failure_threshold: int, reset_timeout: float,
+                 adaptive_timeout: bool, timeout_min: float, timeout_max: float):
+        self.enabled = enabled
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.adaptive_timeout = adaptive_timeout
+        self.timeout_min = timeout_min
+        self.timeout_max = timeout_max
+        self.breakers: Dict[tuple, EndpointBreaker] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, method: str, endpoint: str) -> EndpointBreaker:
+        key = (method, endpoint)
+        breaker = self.breakers.get(key)
+        if breaker is None:
+            with self._lock:
+                breaker = self.breakers.setdefault(key, EndpointBreaker(method, endpoint, self))
+        return breaker
+
+    def reset(self):
+        """Forget all endpoint state"""
+        with self._lock:
+            self.breakers = {}
+
+    def stats(self) -> Dict[str, Any]:
+        breakers = list(self.breakers.values())
+        return {
+            "status": "healthy" if all(breaker.state == CLOSED for breaker in breakers) else "degraded",
+            "endpoints": {f"{breaker.method} {breaker.endpoint}": breaker.stats() for breaker in breakers}
+        }
+
+# Process-wide Books API endpoint health used by BookService and AsyncBookService
+backend_health = BackendHealth(
+    enabled=get_circuit_breaker_enabled(),
+    failure_threshold=get_circuit_failure_threshold(),
+    reset_timeout=get_circuit_reset_timeout(),
+    adaptive_timeout=get_adaptive_timeout_enabled(),
+    timeout_min=get_adaptive_timeout_min(),
+    timeout_max=get_http_read_timeout()
+)
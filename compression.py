@@ -0,0 +1,486 @@
+import asyncio
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.datastructures import MutableHeaders
+
+from config import (
+    get_compression_enabled,
+    get_compression_min_size,
+    get_compression_encodings,
+    get_gzip_level,
+    get_zstd_level,
+    get_brotli_quality,
+    get_max_request_body_size,
+)
+from metrics import body_compressed
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional; zstd is offered only when it is installed
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; br is offered only when it is installed
+    brotli = None
+
+# Bodies at least this large are compressed on a worker thread instead of the event loop
+OFFLOAD_SIZE = 256 * 1024
+
+class RequestBodyError(Exception):
+    """Raised when a compressed request body cannot be decompressed"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+class Codec:
+    """One content coding: whole-body and streaming compression, and size-limited decompression"""
+
+    name = ""
+
+    def compress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    def stream(self) -> "CodecStream":
+        raise NotImplementedError
+
+    def decompress(self, data: bytes, limit: int) -> bytes:
+        """
+        Decompress a request body
+
+        Raises:
+            RequestBodyError: 413 if it expands beyond limit bytes, 400 if it is not valid
+        """
+        raise NotImplementedError
+
+class CodecStream:
+    """Compresses a streamed body chunk by chunk, flushing each chunk so the client can decode it at once"""
+
+    def write(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    def finish(self) -> bytes:
+        raise NotImplementedError
+
+def _too_large(limit: int) -> RequestBodyError:
+    return RequestBodyError(413, f"Request body expands to more than {limit} bytes")
+
+def etag_for_coding(etag: str, coding: str) -> str:
+    """
+    The ETag of a body compressed with coding
+
+    A strong ETag gets a -<coding> suffix, since each content coding of a
+    body needs its own strong validator (RFC 9110, section 8.8.3). Weak
+    ETags are kept as they are.
+    """
+    if etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{coding}"'
+
+class GzipCodec(Codec):
+    name = "gzip"
+
+    def __init__(self, level: int):
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+
+    def stream(self) -> CodecStream:
+        return GzipStream(self.level)
+
+    def decompress(self, data: bytes, limit: int) -> bytes:
+        chunks: List[bytes] = []
+        size = 0
+        try:
+            # A gzip body may hold several members; each one is decoded in turn
+            while True:
+                decompressor = zlib.decompressobj(47)  # gzip or zlib header
+                chunk = decompressor.decompress(data, limit + 1 - size)
+                size += len(chunk)
+                if size > limit:
+                    raise _too_large(limit)
+                chunks.append(chunk)
+                if not decompressor.eof:
+                    raise RequestBodyError(400, "Request body is truncated")
+                data = decompressor.unused_data
+                if not data:
+                    return b"".join(chunks)
+        except zlib.error as e:
+            raise RequestBodyError(400, f"Request body is not valid gzip: {e}")
+
+class GzipStream(CodecStream):
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def write(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+class ZstdCodec(Codec):
+    name = "zstd"
+
+    def __init__(self, level: int):
+        self.level = level
+        # A ZstdCompressor must not be used by two threads at once, and large
+        # bodies are compressed on worker threads, so each thread has its own
+        self._local = threading.local()
+
+    def compress(self, data: bytes) -> bytes:
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            compressor = self._local.compressor = zstandard.ZstdCompressor(level=self.level)
+        return compressor.compress(data)
+
+    def stream(self) -> CodecStream:
+        return ZstdStream(self.level)
+
+    def decompress(self, data: bytes, limit: int) -> bytes:
+        chunks: List[bytes] = []
+        size = 0
+        try:
+            with zstandard.ZstdDecompressor().stream_reader(data, read_across_frames=True) as reader:
+                while True:
+                    chunk = reader.read(limit + 1 - size)
+                    if not chunk:
+                        return b"".join(chunks)
+                    size += len(chunk)
+                    if size > limit:
+                        raise _too_large(limit)
+                    chunks.append(chunk)
+        except zstandard.ZstdError as e:
+            raise RequestBodyError(400, f"Request body is not valid zstd: {e}")
+
+class ZstdStream(CodecStream):
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def write(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+class BrotliCodec(Codec):
+    name = "br"
+
+    def __init__(self, quality: int):
+        self.quality = quality
+
+    def compress(self, data: bytes) -> bytes:
+        return brotli.compress(data, quality=self.quality)
+
+    def stream(self) -> CodecStream:
+        return BrotliStream(self.quality)
+
+    def decompress(self, data: bytes, limit: int) -> bytes:
+        decompressor = brotli.Decompressor()
+        try:
+            try:
+                body = decompressor.process(data, output_buffer_limit=limit + 1)
+            except TypeError:  # brotli before 1.2 cannot stop early
+                body = decompressor.process(data)
+        except brotli.error as e:
+            raise RequestBodyError(400, f"Request body is not valid brotli: {e}")
+        if len(body) > limit:
+            raise _too_large(limit)
+        if not decompressor.is_finished():
+            raise RequestBodyError(400, "Request body is truncated")
+        return body
+
+class BrotliStream(CodecStream):
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def write(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+class Compression:
+    """
+    Content negotiation and codecs for compressed HTTP bodies
+
+    Responses are compressed with the coding the client accepts (by
+    Accept-Encoding quality, then by the order of encodings) when the body
+    is at least min_size bytes. Streamed responses are always compressed,
+    with every chunk flushed so results still arrive as they complete.
+    Request bodies sent with a Content-Encoding this server knows are
+    decompressed before the route reads them, up to max_request_size bytes.
+    """
+
+    # Distinct Accept-Encoding values whose negotiation result is remembered
+    NEGOTIATION_CACHE_SIZE = 256
+    # Compressed bodies of responses with a strong ETag (such as /tools) that are kept for reuse
+    ETAG_CACHE_SIZE = 64
+
+    def __init__(self, enabled: bool, min_size: int, encodings: List[str], gzip_level: int,
+                 zstd_level: int, brotli_quality: int, max_request_size: int):
+        self.enabled = enabled
+        self.min_size = min_size
+        self.max_request_size = max_request_size
+        available: Dict[str, Codec] = {"gzip": GzipCodec(gzip_level)}
+        if zstandard is not None:
+            available["zstd"] = ZstdCodec(zstd_level)
+        if brotli is not None:
+            available["br"] = BrotliCodec(brotli_quality)
+        # Request bodies are accepted in every available coding, responses only use the configured ones
+        self.decoders = dict(available, **{"x-gzip": available["gzip"]})
+        self.codecs = [available[name] for name in encodings if name in available]
+        self._negotiated: Dict[str, Optional[Codec]] = {}
+        self._by_etag: Dict[Tuple[str, str], bytes] = {}
+        self.responses: Dict[str, int] = {}
+        self.requests: Dict[str, int] = {}
+        self.rejected_requests = 0
+
+    def negotiate(self, accept_encoding: Optional[str]) -> Optional[Codec]:
+        """The coding to compress a response with, or None to send it uncompressed"""
+        if not self.enabled or not accept_encoding:
+            return None
+        try:
+            return self._negotiated[accept_encoding]
+        except KeyError:
+            pass
+        weights: Dict[str, float] = {}
+        for part in accept_encoding.split(","):
+            name, _, parameters = part.partition(";")
+            weight = 1.0
+            for parameter in parameters.split(";"):
+                key, _, value = parameter.partition("=")
+                if key.strip().lower() == "q":
+                    try:
+                        weight = float(value)
+                    except ValueError:
+                        weight = 0.0
+            weights[name.strip().lower()] = weight
+        if "x-gzip" in weights:
+            weights.setdefault("gzip", weights["x-gzip"])
+        best, best_weight = None, 0.0
+        for codec in self.codecs:
+            weight = weights.get(codec.name, weights.get("*", 0.0))
+            if weight > best_weight:
+                best, best_weight = codec, weight
+        if len(self._negotiated) >= self.NEGOTIATION_CACHE_SIZE:
+            self._negotiated.clear()
+        self._negotiated[accept_encoding] = best
+        return best
+
+    async def compress(self, codec: Codec, data: bytes, etag: Optional[str] = None) -> bytes:
+        """
+        Compress a response body
+
+        A strong etag identifies the body, so its compressed form is kept
+        and reused for later responses with the same etag and coding.
+        """
+        key = (etag, codec.name) if etag and not etag.startswith("W/") else None
+        compressed = self._by_etag.get(key) if key is not None else None
+        if compressed is None:
+            if len(data) >= OFFLOAD_SIZE:
+                compressed = await asyncio.to_thread(codec.compress, data)
+            else:
+                compressed = codec.compress(data)
+            if key is not None:
+                if len(self._by_etag) >= self.ETAG_CACHE_SIZE:
+                    self._by_etag.clear()
+                self._by_etag[key] = compressed
+        self.compressed("response", codec.name, len(data), len(compressed))
+        return compressed
+
+    def compressed(self, direction: str, encoding: str, uncompressed: int, compressed: int):
+        counts = self.responses if direction == "response" else self.requests
+        counts[encoding] = counts.get(encoding, 0) + 1
+        body_compressed(direction, encoding, uncompressed, compressed)
+
+    async def decompress(self, encoding: str, data: bytes) -> bytes:
+        """
+        Decompress a request body sent with Content-Encoding: encoding
+
+        Raises:
+            RequestBodyError: 415 for an unknown coding, 413 or 400 if the body cannot be used
+        """
+        codec = self.decoders.get(encoding)
+        if codec is None:
+            raise RequestBodyError(415, f"Unsupported Content-Encoding: {encoding}")
+        if len(data) >= OFFLOAD_SIZE:
+            body = await asyncio.to_thread(codec.decompress, data, self.max_request_size)
+        else:
+            body = codec.decompress(data, self.max_request_size)
+        self.compressed("request", codec.name, len(body), len(data))
+        return body
+
+    def reset(self):
+        self._negotiated = {}
+        self._by_etag = {}
+        self.responses = {}
+        self.requests = {}
+        self.rejected_requests = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "encodings": [codec.name for codec in self.codecs],
+            "min_size": self.min_size,
+            "responses_compressed": dict(self.responses),
+            "requests_decompressed": dict(self.requests),
+            "requests_rejected": self.rejected_requests
+        }
+
+class CompressionMiddleware:
+    """ASGI middleware that decompresses request bodies and compresses responses"""
+
+    def __init__(self, app, compression: Optional[Compression] = None):
+        self.app = app
+        self.compression = compression or response_compression
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        content_encoding = accept_encoding = None
+        for key, value in scope["headers"]:
+            if key == b"content-encoding":
+                content_encoding = value.decode("latin-1").strip().lower()
+            elif key == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+
+        if content_encoding and content_encoding != "identity":
+            try:
+                body = await self.compression.decompress(content_encoding, await self._read_body(receive))
+            except RequestBodyError as e:
+                self.compression.rejected_requests += 1
+                await self._reject(send, e)
+                return
+            scope, receive = self._replace_body(scope, receive, body)
+
+        codec = self.compression.negotiate(accept_encoding)
+        if codec is None:
+            await self.app(scope, receive, send)
+        else:
+            await self.app(scope, receive, CompressingSend(send, self.compression, codec))
+
+    async def _read_body(self, receive) -> bytes:
+        chunks: List[bytes] = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                raise RequestBodyError(400, "Client disconnected while sending the request body")
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > self.compression.max_request_size:
+                raise _too_large(self.compression.max_request_size)
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                return b"".join(chunks)
+
+    @staticmethod
+    def _replace_body(scope, receive, body: bytes):
+        headers = [(key, value) for key, value in scope["headers"]
+                   if key not in (b"content-encoding", b"content-length")]
+        headers.append((b"content-length", str(len(body)).encode()))
+        pending = [{"type": "http.request", "body": body, "more_body": False}]
+
+        async def replay():
+            if pending:
+                return pending.pop()
+            return await receive()
+
+        return dict(scope, headers=headers), replay
+
+    @staticmethod
+    async def _reject(send, error: RequestBodyError):
+        content = b'{"detail":"' + str(error).replace('"', "'").encode() + b'"}'
+        await send({"type": "http.response.start", "status": error.status_code, "headers": [
+            (b"content-type", b"application/json"), (b"content-length", str(len(content)).encode())
+        ]})
+        await send({"type": "http.response.body", "body": content})
+
+class CompressingSend:
+    """Wraps an ASGI send callable, compressing the response body it is given"""
+
+    def __init__(self, send, compression: Compression, codec: Codec):
+        self.send = send
+        self.compression = compression
+        self.codec = codec
+        self.start: Optional[dict] = None
+        self.stream: Optional[CodecStream] = None
+        self.passthrough = False
+        self.uncompressed = 0
+        self.sent = 0
+
+    async def __call__(self, message):
+        if self.passthrough:
+            await self.send(message)
+            return
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.stream is not None:
+            data = self.stream.write(body) if body else b""
+            if not more_body:
+                data += self.stream.finish()
+                self.compression.compressed("response", self.codec.name, self.uncompressed + len(body),
+                                            self.sent + len(data))
+            self.uncompressed += len(body)
+            self.sent += len(data)
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+            return
+
+        start, self.start = self.start, None
+        headers = MutableHeaders(raw=list(start["headers"]))
+        etag = headers.get("etag")
+        if start["status"] == 304 and etag is not None and "content-encoding" not in headers:
+            # Revalidated with the validator of the compressed body this client was sent
+            headers["ETag"] = etag_for_coding(etag, self.codec.name)
+            start = dict(start, headers=headers.raw)
+        if ("content-encoding" in headers or start["status"] in (204, 304)
+                or (not more_body and len(body) < self.compression.min_size)):
+            self.passthrough = True
+            await self.send(start)
+            await self.send(message)
+            return
+
+        headers["Content-Encoding"] = self.codec.name
+        headers.add_vary_header("Accept-Encoding")
+        if etag is not None:
+            headers["ETag"] = etag_for_coding(etag, self.codec.name)
+        if not more_body:
+            body = await self.compression.compress(self.codec, body, etag)
+            headers["Content-Length"] = str(len(body))
+            await self.send(dict(start, headers=headers.raw))
+            await self.send({"type": "http.response.body", "body": body})
+            return
+
+        # A streamed body: its length is not known, and each chunk is flushed as it is written
+        if "content-length" in headers:
+            del headers["Content-Length"]
+        self.stream = self.codec.stream()
+        data = self.stream.write(body) if body else b""
+        self.uncompressed, self.sent = len(body), len(data)
+        await self.send(dict(start, headers=headers.raw))
+        await self.send({"type": "http.response.body", "body": data, "more_body": True})
+
+# Process-wide compression settings and counters used by CompressionMiddleware
+response_compression = Compression(
+    enabled=get_compression_enabled(),
+    min_size=get_compression_min_size(),
+    encodings=get_compression_encodings(),
+    gzip_level=get_gzip_level(),
+    zstd_level=get_zstd_level(),
+    brotli_quality=get_brotli_quality(),
+    max_request_size=get_max_request_body_size()
+)
@@ -1,22 +1,455 @@
 import os
+import tempfile
+from typing import List
 
 # Server configuration
 DEFAULT_HOST = "0.0.0.0"
 DEFAULT_PORT = 8080  # Default to port 8080
+DEFAULT_SERVER_MODE = "development"  # "development" (single process with auto-reload) or "production"
+DEFAULT_WORKERS = os.cpu_count() or 1  # Worker processes in production mode
+DEFAULT_GRACEFUL_SHUTDOWN_TIMEOUT = 30  # Seconds a worker may spend draining requests on SIGTERM
+DEFAULT_BACKLOG = 2048  # Pending connections on the shared listening socket
+DEFAULT_BOOKS_API_URL = "http://localhost:5288"
 
 # Application settings
 APP_TITLE = "MCP Server for Books API"
 APP_DESCRIPTION = "Model Context Protocol server that exposes a Books API for use by AI assistants"
 APP_VERSION = "1.0.0"
 
+# Books API HTTP client settings
+DEFAULT_HTTP_POOL_CONNECTIONS = 10  # Number of per-host connection pools to keep
+DEFAULT_HTTP_MAX_CONNECTIONS_PER_HOST = 100  # Connections kept open to a single Books API host
+DEFAULT_HTTP_POOL_BLOCK = True  # Wait for a free connection instead of opening extra ones
+DEFAULT_HTTP_KEEPALIVE = True
+DEFAULT_HTTP_CONNECT_TIMEOUT = 3.05  # Seconds
+DEFAULT_HTTP_READ_TIMEOUT = 30.0  # Seconds
+
+# Books API circuit breaker settings
+DEFAULT_CIRCUIT_BREAKER_ENABLED = True
+DEFAULT_CIRCUIT_FAILURE_THRESHOLD = 5  # Consecutive failures that open an endpoint's circuit
+DEFAULT_CIRCUIT_RESET_TIMEOUT = 5.0  # Seconds an open circuit fails fast before a probe is allowed
+DEFAULT_ADAPTIVE_TIMEOUT_ENABLED = True  # Derive read timeouts from observed endpoint latency
+DEFAULT_ADAPTIVE_TIMEOUT_MIN = 1.0  # Seconds; adaptive timeouts never go below this
+DEFAULT_SERVE_STALE = False  # Answer reads from expired cache entries while the Books API is unavailable
+
+# Books API replica settings (BOOKS_API_URL may list several replicas separated by commas)
+DEFAULT_BACKEND_EJECT_FAILURES = 3  # Consecutive failures that take a replica out of rotation
+DEFAULT_BACKEND_EJECT_SECONDS = 10.0  # Seconds an ejected replica is left out
+DEFAULT_HEDGE_ENABLED = False  # Send reads slower than the recent p95 to a second replica as well
+DEFAULT_HEDGE_MIN_DELAY = 0.005  # Seconds; reads are never hedged sooner than this
+DEFAULT_HEDGE_BUDGET_RATIO = 0.1  # Hedged reads allowed per read
+
+# Books API retry settings
+DEFAULT_RETRY_ENABLED = True
+DEFAULT_RETRY_MAX_ATTEMPTS = 3  # Attempts per request, including the first
+DEFAULT_RETRY_BASE_DELAY = 0.05  # Seconds; backoff before the first retry, doubled for each later one
+DEFAULT_RETRY_MAX_DELAY = 1.0  # Seconds; upper bound for a single backoff
+DEFAULT_RETRY_BUDGET_RATIO = 0.1  # Retries earned per first attempt
+DEFAULT_RETRY_BUDGET_CAPACITY = 20.0  # Retries that can be banked for a burst of failures
+DEFAULT_IDEMPOTENCY_KEY_TTL = 600.0  # Seconds a create_book idempotency key replays its result
+DEFAULT_IDEMPOTENCY_KEY_CACHE_SIZE = 10000  # Idempotency keys remembered
+DEFAULT_IDEMPOTENCY_KEY_LEASE = 120.0  # Seconds a create may hold its key before its outcome counts as unknown
+DEFAULT_BACKEND_HONORS_IDEMPOTENCY_KEY = False  # The Books API applies a create once per Idempotency-Key
+
+# Conditional request settings
+DEFAULT_CONDITIONAL_REQUESTS_ENABLED = True  # Revalidate Books API reads with ETag/Last-Modified
+DEFAULT_CONDITIONAL_CACHE_SIZE = 10000  # Resources whose validators and parsed body are kept
+
+# Admission control settings for /tool-calls
+DEFAULT_ADMISSION_ENABLED = True
+DEFAULT_CLIENT_ID_HEADER = "X-API-Key"  # Header identifying a client; the client's IP address is used without it
+DEFAULT_RATE_LIMIT = 0.0  # Tool calls per second allowed per client (0 disables rate limiting)
+DEFAULT_RATE_LIMIT_BURST = 200  # Tool calls a client may send at once before the rate applies
+DEFAULT_MAX_BATCH_SIZE = 1000  # Tool calls accepted in one /tool-calls request
+DEFAULT_CLIENT_BACKEND_CONCURRENCY = 64  # Books API requests in flight for one client
+DEFAULT_BACKEND_CONCURRENCY = 100  # Books API requests in flight for all clients together
+DEFAULT_BACKEND_QUEUE_SIZE = 1000  # Books API requests waiting for a slot before new requests are shed
+DEFAULT_BACKEND_QUEUE_TIMEOUT = 5.0  # Seconds a Books API request may wait for a slot
+DEFAULT_SHED_RETRY_AFTER = 1  # Seconds clients are asked to wait when a request is shed
+
+# Write-behind settings
+DEFAULT_WRITE_BEHIND_ENABLED = False  # Acknowledge writes once validated and send them to the Books API in batches
+DEFAULT_WRITE_BEHIND_FLUSH_INTERVAL = 0.05  # Seconds between sends of the queued writes
+DEFAULT_WRITE_BEHIND_BATCH_SIZE = 500  # Books whose writes are sent in one round
+DEFAULT_WRITE_BEHIND_CONCURRENCY = 16  # Books API requests in flight while sending queued writes
+DEFAULT_WRITE_BEHIND_MAX_PENDING = 10000  # Books with queued writes before new writes wait for a flush
+
+# Book cache settings
+DEFAULT_BOOK_CACHE_ENABLED = True
+DEFAULT_BOOK_CACHE_SIZE = 10000  # Books cached by id
+DEFAULT_BOOK_CACHE_TTL = 30.0  # Seconds a cached book stays fresh
+DEFAULT_BOOK_LIST_CACHE_TTL = 5.0  # Seconds a cached list_books snapshot stays fresh
+DEFAULT_COMPACT_CATALOG = False  # Hold list_books results in a columnar store instead of dicts and raw JSON
+DEFAULT_BOOK_CACHE_BACKEND = "auto"  # "memory", "shared" (one copy for all workers) or "auto"
+
+# Catalog replica settings
+DEFAULT_REPLICA_ENABLED = True
+DEFAULT_REPLICA_REFRESH_INTERVAL = 60.0  # Seconds between full reloads from GET /books
+
+# Request coalescing settings
+DEFAULT_SINGLEFLIGHT_ENABLED = True  # Share one backend request between identical concurrent reads
+
+# Bulk tool settings
+DEFAULT_BULK_CONCURRENCY = 32  # Backend calls in flight for one bulk tool call
+DEFAULT_BULK_MAX_ITEMS = 10000  # Items accepted by one bulk tool call
+
+# Response serialization settings
+DEFAULT_FAST_SERIALIZATION = True  # Encode /tool-calls responses directly instead of via response_model
+
+# HTTP compression settings
+DEFAULT_COMPRESSION_ENABLED = True  # Compress responses for clients that send Accept-Encoding
+DEFAULT_COMPRESSION_MIN_SIZE = 1024  # Bytes; smaller response bodies are sent as they are
+DEFAULT_COMPRESSION_ENCODINGS = "zstd,br,gzip"  # Preference order; zstd and br need the zstandard and brotli packages
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_ZSTD_LEVEL = 3
+DEFAULT_BROTLI_QUALITY = 4
+DEFAULT_MAX_REQUEST_BODY_SIZE = 64 * 1024 * 1024  # Bytes a compressed request body may expand to
+
+# Persistent MCP session settings (JSON-RPC over WebSocket and stdio)
+DEFAULT_SESSION_MAX_IN_FLIGHT = 256  # Tool calls one session may have running before it stops reading
+
+# Metrics settings
+DEFAULT_METRICS_ENABLED = True  # Record tool and Books API metrics for GET /metrics
+
+# Tool call execution settings
+DEFAULT_TOOL_CALL_CONCURRENCY = 10  # Tool calls from one request that may run at once
+DEFAULT_SERIALIZE_BOOK_WRITES = False  # Keep writes to the same book id in request order
+DEFAULT_VALIDATE_TOOL_ARGUMENTS = True  # Check tool call parameters against input_schema before running the tool
+
 def get_server_host() -> str:
     """Get the server host from environment variable or use default"""
     return os.getenv("MCP_SERVER_HOST", DEFAULT_HOST)
 
 def get_server_port() -> int:
     """Get the server port from environment variable or use default"""
-    port_str = os.getenv("MCP_SERVER_PORT", str(DEFAULT_PORT))
+    return _get_int_env("MCP_SERVER_PORT", DEFAULT_PORT)
+
+def get_server_mode() -> str:
+    """Get the server mode: "development" (auto-reload) or "production" (multiple workers)"""
+    mode = os.getenv("MCP_SERVER_MODE", DEFAULT_SERVER_MODE).strip().lower()
+    return "production" if mode in ("production", "prod") else "development"
+
+def get_workers() -> int:
+    """Get the number of worker processes used in production mode"""
+    return max(1, _get_int_env("MCP_WORKERS", DEFAULT_WORKERS))
+
+def get_graceful_shutdown_timeout() -> int:
+    """Get the time in seconds a worker waits for in-flight requests to finish on shutdown"""
+    return _get_int_env("MCP_GRACEFUL_SHUTDOWN_TIMEOUT", DEFAULT_GRACEFUL_SHUTDOWN_TIMEOUT)
+
+def get_backlog() -> int:
+    """Get the maximum number of pending connections on the listening socket"""
+    return _get_int_env("MCP_BACKLOG", DEFAULT_BACKLOG)
+
+def get_books_api_url() -> str:
+    """Get the base URL of the Books API, or several replicas' URLs separated by commas"""
+    return os.getenv("BOOKS_API_URL", DEFAULT_BOOKS_API_URL).rstrip("/")
+
+def get_http_pool_connections() -> int:
+    """Get the number of per-host connection pools to cache"""
+    return _get_int_env("MCP_HTTP_POOL_CONNECTIONS", DEFAULT_HTTP_POOL_CONNECTIONS)
+
+def get_http_max_connections_per_host() -> int:
+    """Get the maximum number of pooled connections to a single Books API host"""
+    return _get_int_env("MCP_HTTP_MAX_CONNECTIONS_PER_HOST", DEFAULT_HTTP_MAX_CONNECTIONS_PER_HOST)
+
+def get_http_pool_block() -> bool:
+    """Get whether callers wait for a pooled connection when the per-host limit is reached"""
+    return _get_bool_env("MCP_HTTP_POOL_BLOCK", DEFAULT_HTTP_POOL_BLOCK)
+
+def get_http_keepalive() -> bool:
+    """Get whether connections to the Books API are kept alive between calls"""
+    return _get_bool_env("MCP_HTTP_KEEPALIVE", DEFAULT_HTTP_KEEPALIVE)
+
+def get_http_connect_timeout() -> float:
+    """Get the connect timeout in seconds for Books API requests"""
+    return _get_float_env("MCP_HTTP_CONNECT_TIMEOUT", DEFAULT_HTTP_CONNECT_TIMEOUT)
+
+def get_http_read_timeout() -> float:
+    """Get the read timeout in seconds for Books API requests"""
+    return _get_float_env("MCP_HTTP_READ_TIMEOUT", DEFAULT_HTTP_READ_TIMEOUT)
+
+def get_circuit_breaker_enabled() -> bool:
+    """Get whether Books API endpoints fail fast after repeated failures"""
+    return _get_bool_env("MCP_CIRCUIT_BREAKER_ENABLED", DEFAULT_CIRCUIT_BREAKER_ENABLED)
+
+def get_circuit_failure_threshold() -> int:
+    """Get the number of consecutive failures that opens an endpoint's circuit"""
+    return max(1, _get_int_env("MCP_CIRCUIT_FAILURE_THRESHOLD", DEFAULT_CIRCUIT_FAILURE_THRESHOLD))
+
+def get_circuit_reset_timeout() -> float:
+    """Get the seconds an open circuit fails fast before letting a probe request through"""
+    return _get_float_env("MCP_CIRCUIT_RESET_TIMEOUT", DEFAULT_CIRCUIT_RESET_TIMEOUT)
+
+def get_adaptive_timeout_enabled() -> bool:
+    """Get whether read timeouts adapt to each endpoint's observed latency"""
+    return _get_bool_env("MCP_ADAPTIVE_TIMEOUT_ENABLED", DEFAULT_ADAPTIVE_TIMEOUT_ENABLED)
+
+def get_adaptive_timeout_min() -> float:
+    """Get the lower bound in seconds for adaptive read timeouts"""
+    return _get_float_env("MCP_ADAPTIVE_TIMEOUT_MIN", DEFAULT_ADAPTIVE_TIMEOUT_MIN)
+
+def get_serve_stale() -> bool:
+    """Get whether reads fall back to expired cache entries while the Books API is unavailable"""
+    return _get_bool_env("MCP_SERVE_STALE", DEFAULT_SERVE_STALE)
+
+def get_backend_eject_failures() -> int:
+    """Get the number of consecutive failures that takes a Books API replica out of rotation"""
+    return max(1, _get_int_env("MCP_BACKEND_EJECT_FAILURES", DEFAULT_BACKEND_EJECT_FAILURES))
+
+def get_backend_eject_seconds() -> float:
+    """Get the seconds an ejected Books API replica is left out of rotation"""
+    return _get_float_env("MCP_BACKEND_EJECT_SECONDS", DEFAULT_BACKEND_EJECT_SECONDS)
+
+def get_hedge_enabled() -> bool:
+    """Get whether slow reads are also sent to a second Books API replica"""
+    return _get_bool_env("MCP_HEDGE_ENABLED", DEFAULT_HEDGE_ENABLED)
+
+def get_hedge_min_delay() -> float:
+    """Get the minimum seconds a read waits before it is hedged"""
+    return _get_float_env("MCP_HEDGE_MIN_DELAY", DEFAULT_HEDGE_MIN_DELAY)
+
+def get_hedge_budget_ratio() -> float:
+    """Get the hedged reads allowed per read"""
+    return _get_float_env("MCP_HEDGE_BUDGET_RATIO", DEFAULT_HEDGE_BUDGET_RATIO)
+
+def get_retry_enabled() -> bool:
+    """Get whether failed idempotent Books API requests are retried"""
+    return _get_bool_env("MCP_RETRY_ENABLED", DEFAULT_RETRY_ENABLED)
+
+def get_retry_max_attempts() -> int:
+    """Get the maximum number of attempts per Books API request, including the first"""
+    return max(1, _get_int_env("MCP_RETRY_MAX_ATTEMPTS", DEFAULT_RETRY_MAX_ATTEMPTS))
+
+def get_retry_base_delay() -> float:
+    """Get the backoff in seconds before the first retry"""
+    return _get_float_env("MCP_RETRY_BASE_DELAY", DEFAULT_RETRY_BASE_DELAY)
+
+def get_retry_max_delay() -> float:
+    """Get the upper bound in seconds for a single retry backoff"""
+    return _get_float_env("MCP_RETRY_MAX_DELAY", DEFAULT_RETRY_MAX_DELAY)
+
+def get_retry_budget_ratio() -> float:
+    """Get the number of retries earned by each first attempt"""
+    return _get_float_env("MCP_RETRY_BUDGET_RATIO", DEFAULT_RETRY_BUDGET_RATIO)
+
+def get_retry_budget_capacity() -> float:
+    """Get the maximum number of retries that can be banked"""
+    return _get_float_env("MCP_RETRY_BUDGET_CAPACITY", DEFAULT_RETRY_BUDGET_CAPACITY)
+
+def get_idempotency_key_ttl() -> float:
+    """Get the time in seconds a create_book idempotency key replays its result"""
+    return _get_float_env("MCP_IDEMPOTENCY_KEY_TTL", DEFAULT_IDEMPOTENCY_KEY_TTL)
+
+def get_idempotency_key_cache_size() -> int:
+    """Get the maximum number of create_book idempotency keys remembered"""
+    return _get_int_env("MCP_IDEMPOTENCY_KEY_CACHE_SIZE", DEFAULT_IDEMPOTENCY_KEY_CACHE_SIZE)
+
+def get_idempotency_key_lease() -> float:
+    """Get the time in seconds a create_book call may hold its idempotency key before its outcome counts as unknown"""
+    return _get_float_env("MCP_IDEMPOTENCY_KEY_LEASE", DEFAULT_IDEMPOTENCY_KEY_LEASE)
+
+def get_backend_honors_idempotency_key() -> bool:
+    """Get whether the Books API applies a create only once per Idempotency-Key header"""
+    return _get_bool_env("BOOKS_API_HONORS_IDEMPOTENCY_KEY", DEFAULT_BACKEND_HONORS_IDEMPOTENCY_KEY)
+
+def get_conditional_requests_enabled() -> bool:
+    """Get whether Books API reads are sent as conditional GETs and identical bodies reuse their parse"""
+    return _get_bool_env("MCP_CONDITIONAL_REQUESTS_ENABLED", DEFAULT_CONDITIONAL_REQUESTS_ENABLED)
+
+def get_conditional_cache_size() -> int:
+    """Get the number of Books API resources whose validators and parsed body are kept"""
+    return _get_int_env("MCP_CONDITIONAL_CACHE_SIZE", DEFAULT_CONDITIONAL_CACHE_SIZE)
+
+def get_admission_enabled() -> bool:
+    """Get whether /tool-calls requests are subject to rate limits and backend concurrency limits"""
+    return _get_bool_env("MCP_ADMISSION_ENABLED", DEFAULT_ADMISSION_ENABLED)
+
+def get_client_id_header() -> str:
+    """Get the request header that identifies a client for rate limiting"""
+    return os.getenv("MCP_CLIENT_ID_HEADER", DEFAULT_CLIENT_ID_HEADER)
+
+def get_rate_limit() -> float:
+    """Get the tool calls per second allowed per client (0 disables rate limiting)"""
+    return max(0.0, _get_float_env("MCP_RATE_LIMIT", DEFAULT_RATE_LIMIT))
+
+def get_rate_limit_burst() -> int:
+    """Get the tool calls a client may send at once before its rate limit applies"""
+    return max(1, _get_int_env("MCP_RATE_LIMIT_BURST", DEFAULT_RATE_LIMIT_BURST))
+
+def get_max_batch_size() -> int:
+    """Get the maximum number of tool calls accepted in one /tool-calls request"""
+    return max(1, _get_int_env("MCP_MAX_BATCH_SIZE", DEFAULT_MAX_BATCH_SIZE))
+
+def get_client_backend_concurrency() -> int:
+    """Get the maximum number of Books API requests in flight for one client"""
+    return max(1, _get_int_env("MCP_CLIENT_BACKEND_CONCURRENCY", DEFAULT_CLIENT_BACKEND_CONCURRENCY))
+
+def get_backend_concurrency() -> int:
+    """Get the maximum number of Books API requests in flight for all clients together"""
+    return max(1, _get_int_env("MCP_BACKEND_CONCURRENCY", DEFAULT_BACKEND_CONCURRENCY))
+
+def get_backend_queue_size() -> int:
+    """Get the number of Books API requests that may wait for a slot before new /tool-calls requests are shed"""
+    return max(0, _get_int_env("MCP_BACKEND_QUEUE_SIZE", DEFAULT_BACKEND_QUEUE_SIZE))
+
+def get_backend_queue_timeout() -> float:
+    """Get the seconds a Books API request may wait for a concurrency slot"""
+    return _get_float_env("MCP_BACKEND_QUEUE_TIMEOUT", DEFAULT_BACKEND_QUEUE_TIMEOUT)
+
+def get_shed_retry_after() -> int:
+    """Get the Retry-After seconds sent with requests shed under load"""
+    return max(1, _get_int_env("MCP_SHED_RETRY_AFTER", DEFAULT_SHED_RETRY_AFTER))
+
+def get_write_behind_enabled() -> bool:
+    """Get whether create/update/delete are acknowledged after validation and sent to the Books API later"""
+    return _get_bool_env("MCP_WRITE_BEHIND_ENABLED", DEFAULT_WRITE_BEHIND_ENABLED)
+
+def get_write_behind_flush_interval() -> float:
+    """Get the seconds between sends of queued writes"""
+    return _get_float_env("MCP_WRITE_BEHIND_FLUSH_INTERVAL", DEFAULT_WRITE_BEHIND_FLUSH_INTERVAL)
+
+def get_write_behind_batch_size() -> int:
+    """Get the number of books whose queued writes are sent in one round"""
+    return max(1, _get_int_env("MCP_WRITE_BEHIND_BATCH_SIZE", DEFAULT_WRITE_BEHIND_BATCH_SIZE))
+
+def get_write_behind_concurrency() -> int:
+    """Get the number of Books API requests in flight while sending queued writes"""
+    return max(1, _get_int_env("MCP_WRITE_BEHIND_CONCURRENCY", DEFAULT_WRITE_BEHIND_CONCURRENCY))
+
+def get_write_behind_max_pending() -> int:
+    """Get the number of books with queued writes before new writes wait for a flush"""
+    return max(1, _get_int_env("MCP_WRITE_BEHIND_MAX_PENDING", DEFAULT_WRITE_BEHIND_MAX_PENDING))
+
+def get_book_cache_enabled() -> bool:
+    """Get whether get_book/list_books results are cached in-process"""
+    return _get_bool_env("MCP_BOOK_CACHE_ENABLED", DEFAULT_BOOK_CACHE_ENABLED)
+
+def get_book_cache_size() -> int:
+    """Get the maximum number of books cached by id"""
+    return _get_int_env("MCP_BOOK_CACHE_SIZE", DEFAULT_BOOK_CACHE_SIZE)
+
+def get_book_cache_ttl() -> float:
+    """Get the time in seconds a cached book stays fresh"""
+    return _get_float_env("MCP_BOOK_CACHE_TTL", DEFAULT_BOOK_CACHE_TTL)
+
+def get_book_list_cache_ttl() -> float:
+    """Get the time in seconds a cached list_books snapshot stays fresh"""
+    return _get_float_env("MCP_BOOK_LIST_CACHE_TTL", DEFAULT_BOOK_LIST_CACHE_TTL)
+
+def get_compact_catalog() -> bool:
+    """Get whether list_books results are held in memory as a compact columnar catalog"""
+    return _get_bool_env("MCP_COMPACT_CATALOG", DEFAULT_COMPACT_CATALOG)
+
+def get_book_cache_backend() -> str:
+    """
+    Get where the book cache is kept: "memory" (per process) or "shared" (across worker processes)
+
+    "auto" selects "shared" when the server runs more than one worker.
+    """
+    backend = os.getenv("MCP_BOOK_CACHE_BACKEND", DEFAULT_BOOK_CACHE_BACKEND).strip().lower()
+    if backend in ("memory", "shared"):
+        return backend
+    return "shared" if get_server_mode() == "production" and get_workers() > 1 else "memory"
+
+def get_shared_cache_path() -> str:
+    """Get the path of the shared book cache database, on tmpfs when available"""
+    default_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    default = os.path.join(default_dir, f"book-api-mcp-cache-{get_server_port()}.sqlite3")
+    return os.getenv("MCP_SHARED_CACHE_PATH", default)
+
+def get_replica_enabled() -> bool:
+    """Get whether the search tools are served from a local catalog replica"""
+    return _get_bool_env("MCP_REPLICA_ENABLED", DEFAULT_REPLICA_ENABLED)
+
+def get_replica_refresh_interval() -> float:
+    """Get the time in seconds between full reloads of the catalog replica"""
+    return _get_float_env("MCP_REPLICA_REFRESH_INTERVAL", DEFAULT_REPLICA_REFRESH_INTERVAL)
+
+def get_singleflight_enabled() -> bool:
+    """Get whether identical concurrent get_book/list_books reads share one backend request"""
+    return _get_bool_env("MCP_SINGLEFLIGHT_ENABLED", DEFAULT_SINGLEFLIGHT_ENABLED)
+
+def get_bulk_concurrency() -> int:
+    """Get the maximum number of backend calls in flight for one bulk tool call"""
+    return max(1, _get_int_env("MCP_BULK_CONCURRENCY", DEFAULT_BULK_CONCURRENCY))
+
+def get_bulk_max_items() -> int:
+    """Get the maximum number of items accepted by one bulk tool call"""
+    return _get_int_env("MCP_BULK_MAX_ITEMS", DEFAULT_BULK_MAX_ITEMS)
+
+def get_tool_call_concurrency() -> int:
+    """Get the maximum number of tool calls from a single request executed concurrently"""
+    return max(1, _get_int_env("MCP_TOOL_CALL_CONCURRENCY", DEFAULT_TOOL_CALL_CONCURRENCY))
+
+def get_serialize_book_writes() -> bool:
+    """Get whether writes touching the same book id within a request run in submission order"""
+    return _get_bool_env("MCP_SERIALIZE_BOOK_WRITES", DEFAULT_SERIALIZE_BOOK_WRITES)
+
+def get_validate_tool_arguments() -> bool:
+    """Get whether tool call parameters are checked against the tool's input_schema before it runs"""
+    return _get_bool_env("MCP_VALIDATE_TOOL_ARGUMENTS", DEFAULT_VALIDATE_TOOL_ARGUMENTS)
+
+def get_fast_serialization() -> bool:
+    """Get whether /tool-calls responses skip response_model validation and use the fast JSON encoder"""
+    return _get_bool_env("MCP_FAST_SERIALIZATION", DEFAULT_FAST_SERIALIZATION)
+
+def get_compression_enabled() -> bool:
+    """Get whether responses are compressed for clients that accept it"""
+    return _get_bool_env("MCP_COMPRESSION_ENABLED", DEFAULT_COMPRESSION_ENABLED)
+
+def get_compression_min_size() -> int:
+    """Get the smallest response body, in bytes, that is compressed"""
+    return max(0, _get_int_env("MCP_COMPRESSION_MIN_SIZE", DEFAULT_COMPRESSION_MIN_SIZE))
+
+def get_compression_encodings() -> List[str]:
+    """Get the content codings offered to clients, most preferred first"""
+    value = os.getenv("MCP_COMPRESSION_ENCODINGS", DEFAULT_COMPRESSION_ENCODINGS)
+    return [part.strip().lower() for part in value.split(",") if part.strip()]
+
+def get_gzip_level() -> int:
+    """Get the gzip compression level (1-9)"""
+    return min(9, max(1, _get_int_env("MCP_GZIP_LEVEL", DEFAULT_GZIP_LEVEL)))
+
+def get_zstd_level() -> int:
+    """Get the zstd compression level (1-22)"""
+    return min(22, max(1, _get_int_env("MCP_ZSTD_LEVEL", DEFAULT_ZSTD_LEVEL)))
+
+def get_brotli_quality() -> int:
+    """Get the brotli compression quality (0-11)"""
+    return min(11, max(0, _get_int_env("MCP_BROTLI_QUALITY", DEFAULT_BROTLI_QUALITY)))
+
+def get_max_request_body_size() -> int:
+    """Get the size, in bytes, a compressed request body may expand to"""
+    return max(1, _get_int_env("MCP_MAX_REQUEST_BODY_SIZE", DEFAULT_MAX_REQUEST_BODY_SIZE))
+
+def get_session_max_in_flight() -> int:
+    """Get the number of tool calls one MCP session may have running at once"""
+    return max(1, _get_int_env("MCP_SESSION_MAX_IN_FLIGHT", DEFAULT_SESSION_MAX_IN_FLIGHT))
+
+def get_metrics_enabled() -> bool:
+    """Get whether tool call and Books API metrics are recorded"""
+    return _get_bool_env("MCP_METRICS_ENABLED", DEFAULT_METRICS_ENABLED)
+
+def _get_int_env(name: str, default: int) -> int:
+    """Read an integer environment variable, falling back to the default if unset or invalid"""
+    value = os.getenv(name, str(default))
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+def _get_float_env(name: str, default: float) -> float:
+    """Read a float environment variable, falling back to the default if unset or invalid"""
+    value = os.getenv(name, str(default))
     try:
-        return int(port_str)
+        return float(value)
     except ValueError:
-        return DEFAULT_PORT
\ No newline at end of file
+        return default
+
+def _get_bool_env(name: str, default: bool) -> bool:
+    """Read a boolean environment variable ("1"/"true"/"yes"/"on" are true)"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
\ No newline at end of file
@@ -0,0 +1,194 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, Tuple, Union
+
+from config import get_tool_call_concurrency, get_serialize_book_writes, get_validate_tool_arguments
+from metrics import tool_call_started, tool_call_finished
+from models import ToolCallRequest, ToolCallResult
+from services import BookStream
+from tools import get_tool_implementations, get_streaming_tool_implementations, get_tool_validators
+
+# Read once: validation runs on every tool call
+VALIDATE_TOOL_ARGUMENTS = get_validate_tool_arguments()
+
+# Tools that modify a book and may need to stay ordered relative to each other
+WRITE_TOOLS = {"create_book", "update_book", "delete_book"}
+
+def get_write_key(tool_call: ToolCallRequest) -> Optional[Any]:
+    """
+    Get the book id a write tool call touches
+
+    Args:
+        tool_call: The tool call to inspect
+
+    Returns:
+        The book id for writes to a known book, otherwise None
+    """
+    if tool_call.name not in WRITE_TOOLS:
+        return None
+    parameters = tool_call.parameters
+    book_id = parameters.get("book_id")
+    if book_id is None and isinstance(parameters.get("book_data"), dict):
+        book_id = parameters["book_data"].get("id")
+    return None if book_id is None else str(book_id)
+
+def validate_tool_call(tool_call: ToolCallRequest) -> Optional[str]:
+    """
+    Check a tool call's parameters against the tool's compiled input_schema
+
+    Args:
+        tool_call: The tool call to check
+
+    Returns:
+        An error message for invalid parameters, otherwise None
+    """
+    validator = get_tool_validators().get(tool_call.name)
+    if validator is None:
+        return None
+    error = validator(tool_call.parameters)
+    return None if error is None else f"Invalid parameters for {tool_call.name}: {error}"
+
+async def _run_implementation(tool_call: ToolCallRequest, implementation: Callable[..., Awaitable[Any]]) -> Any:
+    """Run a tool implementation, recording its latency and outcome"""
+    start = tool_call_started(tool_call.name)
+    failed = True
+    try:
+        # Invalid calls are answered here without a Books API round trip
+        error = validate_tool_call(tool_call) if VALIDATE_TOOL_ARGUMENTS else None
+        if error is not None:
+            return ToolCallResult(result=None, error=error)
+        result = await implementation(**tool_call.parameters)
+        failed = isinstance(result, ToolCallResult) and result.error is not None
+        return result
+    finally:
+        tool_call_finished(tool_call.name, start, failed)
+
+async def execute_tool_call(tool_call: ToolCallRequest) -> ToolCallResult:
+    """
+    Execute a single tool call
+
+    Args:
+        tool_call: The tool call to execute
+
+    Returns:
+        ToolCallResult from the tool implementation or an error for unknown tools
+    """
+    tool_implementations = get_tool_implementations()
+    if tool_call.name not in tool_implementations:
+        return ToolCallResult(
+            result=None,
+            error=f"Unknown tool: {tool_call.name}"
+        )
+
+    return await _run_implementation(tool_call, tool_implementations[tool_call.name])
+
+async def execute_streaming_tool_call(tool_call: ToolCallRequest) -> Union[ToolCallResult, BookStream]:
+    """
+    Execute a single tool call, letting tools that support it stream their result
+
+    Args:
+        tool_call: The tool call to execute
+
+    Returns:
+        A ToolCallResult, or a BookStream whose JSON is read incrementally from the Books API
+    """
+    implementation = get_streaming_tool_implementations().get(tool_call.name)
+    if implementation is None:
+        return await execute_tool_call(tool_call)
+    return await _run_implementation(tool_call, implementation)
+
+def _schedule(
+    tool_calls: List[ToolCallRequest],
+    execute: Callable[[ToolCallRequest], Awaitable[Any]],
+    concurrency: Optional[int],
+    serialize_writes: Optional[bool]
+) -> List[asyncio.Task]:
+    """Start one task per tool call, bounded by the concurrency limit and write ordering"""
+    if concurrency is None:
+        concurrency = get_tool_call_concurrency()
+    if serialize_writes is None:
+        serialize_writes = get_serialize_book_writes()
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(tool_call: ToolCallRequest, after: Optional[asyncio.Future]) -> Any:
+        # Wait for the previous write to the same book without inheriting its outcome
+        if after is not None:
+            await asyncio.wait([after])
+        async with semaphore:
+            return await execute(tool_call)
+
+    tasks = []
+    last_write = {}
+    for tool_call in tool_calls:
+        key = get_write_key(tool_call) if serialize_writes else None
+        task = asyncio.ensure_future(run(tool_call, last_write.get(key)))
+        if key is not None:
+            last_write[key] = task
+        tasks.append(task)
+    return tasks
+
+async def execute_tool_calls(
+    tool_calls: List[ToolCallRequest],
+    concurrency: Optional[int] = None,
+    serialize_writes: Optional[bool] = None
+) -> List[ToolCallResult]:
+    """
+    Execute a batch of tool calls concurrently
+
+    Args:
+        tool_calls: Tool calls to execute
+        concurrency: Maximum number of calls in flight (defaults to config)
+        serialize_writes: Keep writes to the same book id in submission order (defaults to config)
+
+    Returns:
+        Results in the same order as tool_calls
+    """
+    if len(tool_calls) == 1:
+        return [await execute_tool_call(tool_calls[0])]
+
+    tasks = _schedule(tool_calls, execute_tool_call, concurrency, serialize_writes)
+    try:
+        return list(await asyncio.gather(*tasks))
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def stream_tool_calls(
+    tool_calls: List[ToolCallRequest],
+    concurrency: Optional[int] = None,
+    serialize_writes: Optional[bool] = None
+) -> AsyncIterator[Tuple[int, Union[ToolCallResult, BookStream]]]:
+    """
+    Execute a batch of tool calls concurrently, yielding each result as soon as it completes
+
+    Args:
+        tool_calls: Tool calls to execute
+        concurrency: Maximum number of calls in flight (defaults to config)
+        serialize_writes: Keep writes to the same book id in submission order (defaults to config)
+
+    Yields:
+        (index, result) pairs in completion order, where index is the position in tool_calls.
+        The consumer is responsible for closing any BookStream it receives.
+    """
+    tasks = _schedule(tool_calls, execute_streaming_tool_call, concurrency, serialize_writes)
+    index_of = {task: index for index, task in enumerate(tasks)}
+    pending = set(tasks)
+    delivered = set()
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=index_of.get):
+                delivered.add(task)
+                try:
+                    result = task.result()
+                except Exception as e:
+                    # Headers are already sent, so report the failure on this call only
+                    result = ToolCallResult(result=None, error=f"Error executing tool: {str(e)}")
+                yield index_of[task], result
+    finally:
+        for task in tasks:
+            task.cancel()
+            # Release backend connections held by streams that were never handed out
+            if task not in delivered and task.done() and not task.cancelled() \
+                    and task.exception() is None and isinstance(task.result(), BookStream):
+                await task.result().aclose()
@@ -0,0 +1,147 @@
+import asyncio
+import threading
+from typing import TYPE_CHECKING, Optional, Tuple
+
+import aiohttp
+
+if TYPE_CHECKING:
+    import requests
+
+from config import (
+    get_http_pool_connections,
+    get_http_max_connections_per_host,
+    get_http_pool_block,
+    get_http_keepalive,
+    get_http_connect_timeout,
+    get_http_read_timeout,
+)
+
+# Shared HTTP session used by BookService. The server only uses the async
+# client, so requests is imported when this session is first created.
+_session: Optional["requests.Session"] = None
+_session_lock = threading.Lock()
+
+# Shared async HTTP client used by AsyncBookService
+_async_client: Optional[aiohttp.ClientSession] = None
+_async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def create_session() -> "requests.Session":
+    """
+    Create a requests session backed by a bounded keep-alive connection pool
+
+    Returns:
+        A configured requests.Session
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=get_http_pool_connections(),
+        pool_maxsize=get_http_max_connections_per_host(),
+        pool_block=get_http_pool_block()
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    if not get_http_keepalive():
+        session.headers["Connection"] = "close"
+
+    return session
+
+def get_session() -> "requests.Session":
+    """
+    Get the shared Books API session
+
+    The session is normally created on application startup, but is created
+    lazily here as well so BookService can be used outside the FastAPI app.
+
+    Returns:
+        The shared requests.Session
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+def get_timeout() -> Tuple[float, float]:
+    """
+    Get the (connect, read) timeout used for Books API requests
+
+    Returns:
+        A tuple of connect and read timeouts in seconds
+    """
+    return (get_http_connect_timeout(), get_http_read_timeout())
+
+def create_async_client() -> aiohttp.ClientSession:
+    """
+    Create an aiohttp.ClientSession with the same pool limits and timeouts as the sync session
+
+    Requests wait for a free pooled connection rather than failing, so only
+    the socket connect and read phases are timed.
+
+    Returns:
+        A configured aiohttp.ClientSession
+    """
+    max_connections = get_http_max_connections_per_host()
+    connector = aiohttp.TCPConnector(
+        limit=max_connections * get_http_pool_connections(),
+        limit_per_host=max_connections,
+        force_close=not get_http_keepalive()
+    )
+    connect_timeout, read_timeout = get_timeout()
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=None, sock_connect=connect_timeout, sock_read=read_timeout)
+    )
+
+def get_async_client() -> aiohttp.ClientSession:
+    """
+    Get the shared async Books API client, creating it on first use
+
+    The client's connections belong to the event loop that created it, so a
+    new client is created if the running loop has changed (e.g. between
+    separate asyncio.run() calls in scripts and tests).
+
+    Returns:
+        The shared aiohttp.ClientSession
+    """
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client_loop is not loop:
+        if _async_client is not None:
+            _discard_async_client(_async_client, _async_client_loop)
+        _async_client = create_async_client()
+        _async_client_loop = loop
+    return _async_client
+
+def _discard_async_client(client: aiohttp.ClientSession, loop: asyncio.AbstractEventLoop):
+    """Close a client whose event loop is no longer the running one"""
+    if loop.is_running():
+        # Its loop runs in another thread, which can close it properly
+        asyncio.run_coroutine_threadsafe(client.close(), loop)
+        return
+    # Its loop cannot run client.close(), so close the pooled connections
+    # directly (a closed loop has already dropped its transports); this also
+    # marks the session closed
+    connector = client.connector
+    if connector is not None:
+        connector._close()
+
+async def init_http_client():
+    """Create the shared async HTTP client for the lifetime of the application"""
+    get_async_client()
+
+async def close_http_client():
+    """Close the shared HTTP clients and release their pooled connections"""
+    global _session, _async_client, _async_client_loop
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+        _async_client_loop = None
\ No newline at end of file
@@ -1,6 +1,14 @@
+import asyncio
 from fastapi import FastAPI
+from fastapi.responses import Response
 from routes import router
 from config import APP_TITLE, APP_DESCRIPTION, APP_VERSION
+from http_client import init_http_client, close_http_client
+from replica import book_replica
+from services import refresh_replica_periodically
+from write_behind import write_behind
+from compression import CompressionMiddleware
+from serialization import dumps
 
 # Create FastAPI app
 app = FastAPI(
@@ -9,30 +17,46 @@ app = FastAPI(
     version=APP_VERSION
 )
 
+# Compress responses and decompress request bodies (see compression.py)
+app.add_middleware(CompressionMiddleware)
+
 # Include API routes
 app.include_router(router)
 
+# Basic server information, encoded once
+ROOT_INFO = dumps({
+    "name": APP_TITLE,
+    "version": APP_VERSION,
+    "description": APP_DESCRIPTION,
+    "docs_url": "/docs"
+})
+
 # Add root endpoint
 @app.get("/")
-def root():
+async def root():
     """
     Root endpoint
     
     Returns basic information about the MCP server.
     """
-    return {
-        "name": APP_TITLE,
-        "version": APP_VERSION,
-        "description": APP_DESCRIPTION,
-        "docs_url": "/docs"
-    }
+    return Response(ROOT_INFO, media_type="application/json")
 
-# Startup event to log server start
+# Startup event to log server start, open the Books API connection pool
+# and start keeping the catalog replica warm
 @app.on_event("startup")
-def startup_event():
+async def startup_event():
     print("Starting MCP Server for Books API...")
+    await init_http_client()
+    if book_replica.enabled:
+        app.state.replica_refresher = asyncio.create_task(refresh_replica_periodically())
 
-# Shutdown event to log server stop
+# Shutdown event to log server stop, send any queued writes and close the
+# Books API connection pool
 @app.on_event("shutdown")
-def shutdown_event():
-    print("Shutting down MCP Server...")
\ No newline at end of file
+async def shutdown_event():
+    print("Shutting down MCP Server...")
+    replica_refresher = getattr(app.state, "replica_refresher", None)
+    if replica_refresher is not None:
+        replica_refresher.cancel()
+    await write_behind.flush()
+    await close_http_client()
\ No newline at end of file
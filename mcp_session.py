@@ -0,0 +1,321 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from admission import admission, client_id, AdmissionRejected
+from config import APP_TITLE, APP_VERSION
+from config import get_session_max_in_flight, get_serialize_book_writes, get_max_request_body_size
+from dispatcher import execute_tool_call, get_write_key
+from models import ToolCallRequest, ToolCallResult
+from serialization import dumps, loads, encode_value
+from tools import get_tools_list, get_tool_implementations
+
+# MCP protocol revision announced in the initialize handshake
+PROTOCOL_VERSION = "2024-11-05"
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+# Implementation-defined: the call was refused by admission control
+SERVER_BUSY = -32000
+
+_stats = {"opened": 0, "open": 0, "calls": 0, "cancelled": 0, "errors": 0}
+
+_tools_list: Optional[bytes] = None
+
+def _tools_list_result() -> bytes:
+    """The tools/list result, encoded once"""
+    global _tools_list
+    if _tools_list is None:
+        _tools_list = dumps({"tools": [
+            {"name": tool.name, "description": tool.description, "inputSchema": tool.input_schema}
+            for tool in get_tools_list()
+        ]})
+    return _tools_list
+
+def _initialize_result() -> bytes:
+    return dumps({
+        "protocolVersion": PROTOCOL_VERSION,
+        "capabilities": {"tools": {"listChanged": False}},
+        "serverInfo": {"name": APP_TITLE, "version": APP_VERSION}
+    })
+
+def _result(id_json: bytes, result: bytes) -> bytes:
+    return b'{"jsonrpc":"2.0","id":' + id_json + b',"result":' + result + b"}"
+
+def _error(id_json: bytes, code: int, message: str, data: Any = None) -> bytes:
+    _stats["errors"] += 1
+    error = {"code": code, "message": message}
+    if data is not None:
+        error["data"] = data
+    return b'{"jsonrpc":"2.0","id":' + id_json + b',"error":' + dumps(error) + b"}"
+
+def _tool_result(result: ToolCallResult) -> bytes:
+    """A ToolCallResult as an MCP tools/call result with a single text content item"""
+    if result.error is not None:
+        return b'{"content":[{"type":"text","text":' + dumps(result.error) + b'}],"isError":true}'
+    text = encode_value(result.result).decode()
+    return b'{"content":[{"type":"text","text":' + dumps(text) + b'}],"isError":false}'
+
+class Session:
+    """
+    One persistent MCP connection speaking JSON-RPC 2.0
+
+    Messages are read one at a time and tools/call requests are started
+    without waiting for earlier ones, so a client can pipeline many calls
+    over one connection and receive each answer, tagged with its request
+    id, as soon as it completes. Other methods are answered inline. Once
+    max_in_flight calls are running, the session stops reading until one
+    finishes. Tool calls go through the same dispatcher as POST /tool-calls,
+    including argument validation, metrics and admission control; with
+    serialize_writes, writes to the same book id run in the order they
+    were received.
+
+    A tools/call whose id is still in flight is refused, so each running
+    call can be cancelled and answered by its id. JSON-RPC batches are
+    refused: MCP no longer uses them, and pipelined requests give the same
+    concurrency.
+    """
+
+    def __init__(self, send: Callable[[bytes], Awaitable[None]], client: str,
+                 max_in_flight: Optional[int] = None, serialize_writes: Optional[bool] = None):
+        """
+        Args:
+            send: Writes one encoded JSON-RPC message to the connection
+            client: Client id used by admission control
+            max_in_flight: Tool calls running at once (defaults to config)
+            serialize_writes: Keep writes to the same book id in order (defaults to config)
+        """
+        self._send = send
+        self.client = client
+        self._slots = asyncio.Semaphore(max_in_flight or get_session_max_in_flight())
+        self.serialize_writes = get_serialize_book_writes() if serialize_writes is None else serialize_writes
+        self._send_lock = asyncio.Lock()
+        self._in_flight: Dict[Any, asyncio.Task] = {}
+        # Tool calls sent as notifications (without an id), so close() still waits for them
+        self._notifications: Set[asyncio.Task] = set()
+        self._last_write: Dict[str, asyncio.Task] = {}
+        _stats["opened"] += 1
+        _stats["open"] += 1
+
+    async def send(self, message: bytes):
+        async with self._send_lock:
+            await self._send(message)
+
+    async def receive(self, data) -> None:
+        """Handle one message read from the connection"""
+        try:
+            message = loads(data)
+        except ValueError:
+            await self.send(_error(b"null", PARSE_ERROR, "Parse error"))
+            return
+        if not isinstance(message, dict):
+            await self.send(_error(b"null", INVALID_REQUEST, "Expected a single JSON-RPC message object"))
+            return
+
+        method = message.get("method")
+        request_id = message.get("id")
+        is_request = "id" in message
+        if message.get("jsonrpc") != "2.0" or not isinstance(method, str) \
+                or not isinstance(request_id, (str, int, float, type(None))):
+            if "method" in message:
+                await self.send(_error(dumps(request_id) if isinstance(request_id, (str, int)) else b"null",
+                                       INVALID_REQUEST, "Invalid Request"))
+            return  # A response from the client; this server sends no requests
+        params = message.get("params")
+        if params is None:
+            params = {}
+        id_json = dumps(request_id) if is_request else None
+
+        if method == "tools/call":
+            await self._start_tool_call(request_id, id_json, params)
+            return
+        if method == "notifications/cancelled":
+            task = self._in_flight.get(params.get("requestId")) if isinstance(params, dict) else None
+            if task is not None:
+                task.cancel()
+            return
+        if not is_request:
+            return  # notifications/initialized and other notifications need no answer
+
+        if method == "ping":
+            await self.send(_result(id_json, b"{}"))
+        elif method == "tools/list":
+            await self.send(_result(id_json, _tools_list_result()))
+        elif method == "initialize":
+            await self.send(_result(id_json, _initialize_result()))
+        else:
+            await self.send(_error(id_json, METHOD_NOT_FOUND, f"Method not found: {method}"))
+
+    async def _start_tool_call(self, request_id: Any, id_json: Optional[bytes], params: Any):
+        name = params.get("name") if isinstance(params, dict) else None
+        arguments = params.get("arguments", {}) if isinstance(params, dict) else None
+        if not isinstance(name, str) or name not in get_tool_implementations() or not isinstance(arguments, dict):
+            if id_json is not None:
+                message = f"Unknown tool: {name}" if isinstance(arguments, dict) else "arguments must be an object"
+                await self.send(_error(id_json, INVALID_PARAMS, message))
+            return
+        if id_json is not None and request_id in self._in_flight:
+            await self.send(_error(id_json, INVALID_REQUEST, f"Request id {request_id!r} is already in use"))
+            return
+
+        # name and arguments were checked above, so the request model is not validated again
+        tool_call = ToolCallRequest.model_construct(name=name, parameters=arguments)
+        key = get_write_key(tool_call) if self.serialize_writes else None
+        await self._slots.acquire()
+        task = asyncio.ensure_future(self._call_tool(id_json, tool_call, self._last_write.get(key)))
+        if key is not None:
+            self._last_write[key] = task
+        if id_json is not None:
+            self._in_flight[request_id] = task
+        else:
+            self._notifications.add(task)
+        task.add_done_callback(lambda done: self._finished(done, request_id, key))
+        _stats["calls"] += 1
+
+    def _finished(self, task: asyncio.Task, request_id: Any, key: Optional[str]):
+        self._slots.release()
+        if self._in_flight.get(request_id) is task:
+            del self._in_flight[request_id]
+        self._notifications.discard(task)
+        if key is not None and self._last_write.get(key) is task:
+            del self._last_write[key]
+        if task.cancelled():
+            _stats["cancelled"] += 1
+
+    async def _call_tool(self, id_json: Optional[bytes], tool_call: ToolCallRequest,
+                         after: Optional[asyncio.Future]):
+        # Wait for the previous write to the same book without inheriting its outcome
+        if after is not None:
+            await asyncio.wait([after])
+        error = None
+        try:
+            admission.admit(self.client, 1)
+            result = await execute_tool_call(tool_call)
+        except AdmissionRejected as e:
+            error = (SERVER_BUSY, str(e), {"status": e.status_code, "retryAfter": e.retry_after})
+        except Exception as e:
+            error = (INTERNAL_ERROR, f"Error executing tool: {str(e)}", None)
+        if id_json is None:
+            return
+        await self.send(_result(id_json, _tool_result(result)) if error is None else _error(id_json, *error))
+
+    async def close(self, wait: bool = False):
+        """
+        End the session
+
+        Args:
+            wait: Let running tool calls finish and answer them (e.g. after
+                stdin is closed) instead of cancelling them (e.g. after a disconnect)
+        """
+        tasks = [*self._in_flight.values(), *self._notifications, *self._last_write.values()]
+        if not wait:
+            for task in tasks:
+                task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        _stats["open"] -= 1
+
+def session_stats() -> Dict[str, int]:
+    return dict(_stats)
+
+async def serve_websocket(websocket):
+    """
+    Run an MCP session over an accepted WebSocket until the client disconnects
+
+    Each JSON-RPC message is one text (or binary) frame; answers are sent as text frames.
+    """
+    async def send(message: bytes):
+        await websocket.send({"type": "websocket.send", "text": message.decode()})
+
+    client = websocket.client
+    session = Session(send, client_id(websocket.headers, client.host if client else None))
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            data = message.get("text")
+            await session.receive(data if data is not None else message.get("bytes", b""))
+    finally:
+        await session.close()
+
+async def _discard_line(reader: asyncio.StreamReader, consumed: int):
+    """
+    Drop an over-limit line, up to and including its newline
+
+    The reader keeps at most about the limit buffered, so the rest of the
+    line is skipped as it arrives rather than read as further messages.
+
+    Args:
+        reader: The reader whose readuntil() raised LimitOverrunError
+        consumed: Bytes known to belong to the line, from the error
+    """
+    while True:
+        await reader.readexactly(consumed)
+        try:
+            await reader.readuntil(b"\n")
+            return
+        except asyncio.LimitOverrunError as error:
+            consumed = error.consumed
+
+async def serve_stdio(stdin, stdout):
+    """
+    Run one MCP session over newline-delimited JSON-RPC on stdin and stdout
+
+    Used when an MCP client launches the server as a subprocess (run.py
+    --stdio). Both must be pipes or terminals. Opens the Books API
+    connection pool and keeps the catalog replica warm like the HTTP
+    server, and when stdin is closed answers the calls still running,
+    sends queued writes and returns.
+
+    Args:
+        stdin: Readable file the client writes requests to
+        stdout: Writable binary file that only JSON-RPC messages may be written to
+    """
+    from http_client import init_http_client, close_http_client
+    from replica import book_replica
+    from services import refresh_replica_periodically
+    from write_behind import write_behind
+
+    loop = asyncio.get_running_loop()
+    limit = get_max_request_body_size()
+    reader = asyncio.StreamReader(limit=limit)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), stdin)
+    transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, stdout)
+    writer = asyncio.StreamWriter(transport, protocol, None, loop)
+
+    async def send(message: bytes):
+        writer.write(message + b"\n")
+        await writer.drain()
+
+    await init_http_client()
+    refresher = asyncio.ensure_future(refresh_replica_periodically()) if book_replica.enabled else None
+    session = Session(send, "stdio")
+    try:
+        while True:
+            try:
+                line = await reader.readuntil(b"\n")
+            except asyncio.IncompleteReadError as error:  # stdin was closed, maybe after an unterminated line
+                line = error.partial
+                if not line:
+                    break
+            except asyncio.LimitOverrunError as error:
+                await session.send(_error(b"null", PARSE_ERROR, f"Message larger than {limit} bytes"))
+                try:
+                    await _discard_line(reader, error.consumed)
+                except asyncio.IncompleteReadError:
+                    break
+                continue
+            line = line.strip()
+            if line:
+                await session.receive(line)
+    finally:
+        await session.close(wait=True)
+        if refresher is not None:
+            refresher.cancel()
+        await write_behind.flush()
+        await close_http_client()
+        writer.close()
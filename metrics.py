@@ -0,0 +1,344 @@
+import asyncio
+import sys
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+
+from config import get_metrics_enabled
+
+# Latency buckets in seconds, fine-grained enough to estimate p50/p95/p99
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.0075, 0.01, 0.025, 0.05, 0.075,
+    0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0
+)
+
+Labels = Tuple[str, ...]
+
+def _format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Counter:
+    """A monotonically increasing value per label combination"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Labels = (), amount: float = 1.0):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self.values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+                for labels, value in values]
+
+class Gauge(Counter):
+    """A value per label combination that can go up and down"""
+
+    kind = "gauge"
+
+    def dec(self, labels: Labels = (), amount: float = 1.0):
+        self.inc(labels, -amount)
+
+    def set(self, labels: Labels = (), value: float = 0.0):
+        with self._lock:
+            self.values[labels] = value
+
+class Histogram:
+    """
+    Observations counted into cumulative buckets per label combination
+
+    Rendered in the Prometheus histogram format; quantile() estimates a
+    percentile by interpolating within the bucket that contains it.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per labels: [count per bucket (last is +Inf), sum]
+        self.values: Dict[Labels, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Labels, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self.values.get(labels)
+            if entry is None:
+                entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def quantile(self, labels: Labels, q: float) -> Optional[float]:
+        """
+        Estimate the q-quantile (0 < q < 1) of the observations for labels
+
+        Returns:
+            The estimate in the observed unit, or None if nothing was observed
+        """
+        with self._lock:
+            entry = self.values.get(labels)
+            counts = list(entry[0]) if entry else None
+        if not counts or not sum(counts):
+            return None
+        rank = q * sum(counts)
+        seen = 0
+        for index, count in enumerate(counts):
+            if count and seen + count >= rank:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((labels, list(entry[0]), entry[1]) for labels, entry in self.values.items())
+        lines = []
+        for labels, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """The process's metrics, rendered in the Prometheus text exposition format"""
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.metrics: list = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+# Process-wide metrics exposed on GET /metrics
+registry = MetricsRegistry(enabled=get_metrics_enabled())
+
+TOOL_CALLS = registry.counter(
+    "mcp_tool_calls_total", "Tool calls by tool and outcome (ok or error)", ("tool", "outcome"))
+TOOL_CALL_DURATION = registry.histogram(
+    "mcp_tool_call_duration_seconds", "Tool call latency, including Books API calls", ("tool",))
+TOOL_CALLS_IN_FLIGHT = registry.gauge(
+    "mcp_tool_calls_in_flight", "Tool calls currently executing", ("tool",))
+BACKEND_REQUESTS = registry.counter(
+    "mcp_backend_requests_total", "Books API responses by status code", ("method", "endpoint", "status"))
+BACKEND_REQUEST_DURATION = registry.histogram(
+    "mcp_backend_request_duration_seconds", "Books API request latency", ("method", "endpoint"))
+BACKEND_REQUESTS_IN_FLIGHT = registry.gauge(
+    "mcp_backend_requests_in_flight", "Books API requests currently waiting for a response")
+BACKEND_ERRORS = registry.counter(
+    "mcp_backend_errors_total", "Books API requests that got no response, by category",
+    ("method", "endpoint", "category"))
+BACKEND_CIRCUIT_REJECTIONS = registry.counter(
+    "mcp_backend_circuit_rejections_total", "Books API requests refused because the endpoint's circuit was open",
+    ("method", "endpoint"))
+BACKEND_RETRIES = registry.counter(
+    "mcp_backend_retries_total", "Books API requests retried, by the failure that caused the retry",
+    ("method", "endpoint", "reason"))
+BACKEND_RETRIES_EXHAUSTED = registry.counter(
+    "mcp_backend_retries_exhausted_total",
+    "Failed Books API requests not retried because attempts or the retry budget ran out",
+    ("method", "endpoint"))
+BACKEND_REVALIDATIONS = registry.counter(
+    "mcp_backend_revalidations_total",
+    "Books API reads by whether the body was not modified (304), unchanged (same hash) or changed",
+    ("endpoint", "outcome"))
+BACKEND_BYTES_SAVED = registry.counter(
+    "mcp_backend_bytes_saved_total", "Response body bytes not transferred thanks to 304 Not Modified",
+    ("endpoint",))
+BACKEND_PARSE_SECONDS_SAVED = registry.counter(
+    "mcp_backend_parse_seconds_saved_total", "Time not spent parsing Books API bodies that had not changed",
+    ("endpoint",))
+ADMISSION_REJECTIONS = registry.counter(
+    "mcp_admission_rejections_total",
+    "/tool-calls requests and Books API requests refused by admission control, by reason", ("reason",))
+BACKEND_QUEUED = registry.gauge(
+    "mcp_backend_requests_queued", "Books API requests waiting for a concurrency slot")
+WRITE_BEHIND_OPERATIONS = registry.counter(
+    "mcp_write_behind_operations_total",
+    "Write-behind queue activity: writes queued, coalesced or cancelled, and books flushed or failed", ("outcome",))
+WRITE_BEHIND_PENDING = registry.gauge(
+    "mcp_write_behind_pending", "Books with writes waiting to be sent to the Books API")
+BACKEND_EJECTIONS = registry.counter(
+    "mcp_backend_ejections_total", "Times a Books API replica was taken out of rotation after failures", ("backend",))
+BACKEND_HEDGES = registry.counter(
+    "mcp_backend_hedges_total", "Hedged Books API reads sent, and hedges that answered first", ("endpoint", "outcome"))
+HTTP_BODY_BYTES = registry.counter(
+    "mcp_http_body_bytes_total",
+    "Compressed request and response bodies, by direction, content coding and whether counted before or after "
+    "compression", ("direction", "encoding", "stage"))
+
+def error_category(e: BaseException) -> str:
+    """Classify a failed Books API request as timeout, connection, cancelled or other"""
+    # requests is only loaded by the sync client; without it no error can be one of its exceptions
+    requests = sys.modules.get("requests")
+    if isinstance(e, asyncio.TimeoutError) or (requests is not None and isinstance(e, requests.Timeout)):
+        return "timeout"
+    if isinstance(e, aiohttp.ClientConnectionError) or \
+            (requests is not None and isinstance(e, requests.ConnectionError)):
+        return "connection"
+    if isinstance(e, asyncio.CancelledError):
+        return "cancelled"
+    return "other"
+
+def tool_call_started(tool: str) -> float:
+    if registry.enabled:
+        TOOL_CALLS_IN_FLIGHT.inc((tool,))
+    return time.perf_counter()
+
+def tool_call_finished(tool: str, start: float, failed: bool):
+    if registry.enabled:
+        TOOL_CALLS_IN_FLIGHT.dec((tool,))
+        TOOL_CALL_DURATION.observe((tool,), time.perf_counter() - start)
+        TOOL_CALLS.inc((tool, "error" if failed else "ok"))
+
+def backend_request_started() -> float:
+    if registry.enabled:
+        BACKEND_REQUESTS_IN_FLIGHT.inc()
+    return time.perf_counter()
+
+def backend_request_finished(method: str, endpoint: str, start: float,
+                             status: Optional[int] = None, error: Optional[BaseException] = None) -> float:
+    """
+    Record the end of a Books API request
+
+    Args:
+        method: HTTP method
+        endpoint: Endpoint template, e.g. /books/{id}
+        start: The value returned by backend_request_started()
+        status: The response status code, if a response was received
+        error: The exception raised instead of a response
+
+    Returns:
+        The request's duration in seconds
+    """
+    elapsed = time.perf_counter() - start
+    if registry.enabled:
+        BACKEND_REQUESTS_IN_FLIGHT.dec()
+        BACKEND_REQUEST_DURATION.observe((method, endpoint), elapsed)
+        if error is None:
+            BACKEND_REQUESTS.inc((method, endpoint, str(status)))
+        else:
+            BACKEND_ERRORS.inc((method, endpoint, error_category(error)))
+    return elapsed
+
+def backend_request_rejected(method: str, endpoint: str):
+    if registry.enabled:
+        BACKEND_CIRCUIT_REJECTIONS.inc((method, endpoint))
+
+def backend_request_retried(method: str, endpoint: str, reason: str):
+    if registry.enabled:
+        BACKEND_RETRIES.inc((method, endpoint, reason))
+
+def backend_retries_exhausted(method: str, endpoint: str):
+    if registry.enabled:
+        BACKEND_RETRIES_EXHAUSTED.inc((method, endpoint))
+
+def backend_response_revalidated(endpoint: str, outcome: str, bytes_saved: int, parse_seconds_saved: float):
+    if registry.enabled:
+        BACKEND_REVALIDATIONS.inc((endpoint, outcome))
+        if bytes_saved:
+            BACKEND_BYTES_SAVED.inc((endpoint,), bytes_saved)
+        if parse_seconds_saved:
+            BACKEND_PARSE_SECONDS_SAVED.inc((endpoint,), parse_seconds_saved)
+
+def admission_rejected(reason: str):
+    if registry.enabled:
+        ADMISSION_REJECTIONS.inc((reason,))
+
+def backend_request_queued(waiting: bool):
+    if registry.enabled:
+        if waiting:
+            BACKEND_QUEUED.inc()
+        else:
+            BACKEND_QUEUED.dec()
+
+def write_behind_operation(outcome: str):
+    if registry.enabled:
+        WRITE_BEHIND_OPERATIONS.inc((outcome,))
+
+def write_behind_pending(count: int):
+    if registry.enabled:
+        WRITE_BEHIND_PENDING.set((), count)
+
+def backend_ejected(backend: str):
+    if registry.enabled:
+        BACKEND_EJECTIONS.inc((backend,))
+
+def backend_hedged(endpoint: str, outcome: str):
+    if registry.enabled:
+        BACKEND_HEDGES.inc((endpoint, outcome))
+
+def body_compressed(direction: str, encoding: str, uncompressed: int, compressed: int):
+    if registry.enabled:
+        HTTP_BODY_BYTES.inc((direction, encoding, "uncompressed"), uncompressed)
+        HTTP_BODY_BYTES.inc((direction, encoding, "compressed"), compressed)
+
+def latency_summary() -> Dict[str, Dict[str, Dict[str, Optional[float]]]]:
+    """
+    Estimated p50/p95/p99 latencies in milliseconds, for GET /health
+
+    Returns:
+        {"tools": {tool: {...}}, "backend": {"METHOD endpoint": {...}}}
+    """
+    def percentiles(histogram: Histogram, labels: Labels) -> Dict[str, Optional[float]]:
+        return {
+            name: None if value is None else round(value * 1000, 3)
+            for name, value in (
+                ("p50", histogram.quantile(labels, 0.5)),
+                ("p95", histogram.quantile(labels, 0.95)),
+                ("p99", histogram.quantile(labels, 0.99)),
+            )
+        }
+
+    return {
+        "tools": {labels[0]: percentiles(TOOL_CALL_DURATION, labels) for labels in list(TOOL_CALL_DURATION.values)},
+        "backend": {" ".join(labels): percentiles(BACKEND_REQUEST_DURATION, labels)
+                    for labels in list(BACKEND_REQUEST_DURATION.values)}
+    }
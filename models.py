@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_serializer
 from typing import Dict, List, Optional, Any
 from datetime import datetime
+from serialization import as_builtin
 # Books API models
 class Book(BaseModel):
     """Representation of a book in the database"""
@@ -15,6 +16,11 @@ class ToolCallResult(BaseModel):
     result: Any
     error: Optional[str] = None
 
+    @field_serializer("result", when_used="json")
+    def _serialize_result(self, result: Any) -> Any:
+        # Results may be compact catalog views, which pydantic cannot encode itself
+        return as_builtin(result)
+
 class ToolCallRequest(BaseModel):
     """Request to call a specific tool with parameters"""
     name: str
@@ -30,6 +36,8 @@ class ToolDefinition(BaseModel):
 class MCPRequest(BaseModel):
     """Request containing one or more tool calls"""
     tool_calls: List[ToolCallRequest] = Field(default_factory=list)
+    # Keep create/update/delete calls for the same book id in order (server default if unset)
+    serialize_writes: Optional[bool] = None
 
 class MCPResponse(BaseModel):
     """Response containing results of one or more tool calls"""
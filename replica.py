@@ -0,0 +1,337 @@
+import heapq
+import re
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, List, MutableSequence, Optional, Sequence
+
+from catalog import CompactCatalog
+from config import get_replica_enabled, get_replica_refresh_interval
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def tokenize(text: Any) -> List[str]:
+    """Split text into lowercase word tokens"""
+    return TOKEN_PATTERN.findall(str(text or "").lower())
+
+def normalize_author(author: Any) -> str:
+    return " ".join(tokenize(author))
+
+def normalize_isbn(isbn: Any) -> str:
+    """Reduce an ISBN to its digits (and a trailing X check digit)"""
+    return "".join(ch for ch in str(isbn or "").upper() if ch.isdigit() or ch == "X")
+
+def published_day(book: Dict[str, Any]) -> str:
+    """The YYYY-MM-DD part of a book's publishedDate, which sorts chronologically"""
+    return str(book.get("publishedDate") or "")[:10]
+
+def isbn_key(normalized: str) -> Optional[int]:
+    """
+    Pack a normalized ISBN into an int for the sorted ISBN index
+
+    Layout: digits << 6 | digit count << 1 | trailing X. Returns None for
+    ISBNs with more than 17 digits or an X anywhere but at the end.
+    """
+    digits = normalized[:-1] if normalized.endswith("X") else normalized
+    if len(digits) > 17 or (digits and not digits.isdigit()):
+        return None
+    return int(digits or "0") << 6 | len(digits) << 1 | (digits is not normalized)
+
+class SortedPairs:
+    """
+    (key, book id) pairs kept sorted in two parallel columns
+
+    Used for indexes with about one entry per book, where a dict of sets
+    would cost far more than the books themselves.
+    """
+
+    def __init__(self, keys: Optional[MutableSequence] = None, ids: Optional[array] = None):
+        self.keys = keys if keys is not None else array("q")
+        self.ids = ids if ids is not None else array("q")
+
+    @classmethod
+    def build(cls, keys: MutableSequence, ids: array) -> "SortedPairs":
+        """Sort pairs appended in any order"""
+        order = sorted(range(len(ids)), key=lambda index: (keys[index], ids[index]))
+        if isinstance(keys, array):
+            sorted_keys: MutableSequence = array(keys.typecode, (keys[index] for index in order))
+        else:
+            sorted_keys = [keys[index] for index in order]
+        return cls(sorted_keys, array("q", (ids[index] for index in order)))
+
+    def _position(self, key: Any, book_id: int) -> int:
+        low = bisect_left(self.keys, key)
+        high = bisect_right(self.keys, key, low)
+        return bisect_left(self.ids, book_id, low, high)
+
+    def insert(self, key: Any, book_id: int):
+        position = self._position(key, book_id)
+        self.keys.insert(position, key)
+        self.ids.insert(position, book_id)
+
+    def remove(self, key: Any, book_id: int):
+        position = self._position(key, book_id)
+        if position < len(self.ids) and self.keys[position] == key and self.ids[position] == book_id:
+            del self.keys[position]
+            del self.ids[position]
+
+    def ids_between(self, low: int, high: int) -> array:
+        return self.ids[low:high]
+
+    def lookup(self, key: Any) -> array:
+        low = bisect_left(self.keys, key)
+        return self.ids[low:bisect_right(self.keys, key, low)]
+
+class BookReplica:
+    """
+    In-memory copy of the Books API catalog with secondary indexes
+
+    The replica is loaded from GET /books and patched by writes made through
+    BookService, so search tools can answer without a backend round trip.
+    Books are kept in a CompactCatalog and materialized only for results.
+    Indexes cover normalized author and title tokens (arrays of ids per
+    key), and ISBN digits and publication day (sorted parallel columns, the
+    days kept in order for range queries). A search walks the smallest
+    matching index entry and checks the other criteria on each candidate.
+    """
+
+    def __init__(self, enabled: bool, refresh_interval: float):
+        self.enabled = enabled
+        self.refresh_interval = refresh_interval
+        self.loaded_at: Optional[float] = None
+        self.generation = 0
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.books = CompactCatalog()
+        self.by_author: Dict[str, array] = {}
+        self.by_title_token: Dict[str, array] = {}
+        self.by_isbn = SortedPairs()
+        self.by_isbn_text: Dict[str, array] = {}
+        self.by_published = SortedPairs([], array("q"))
+
+    def is_stale(self) -> bool:
+        """Whether the replica must be reloaded before answering (always true when disabled)"""
+        if not self.enabled or self.loaded_at is None:
+            return True
+        return time.monotonic() - self.loaded_at > self.refresh_interval
+
+    def load(self, books: Iterable[Dict[str, Any]], generation: int) -> bool:
+        """
+        Replace the replica contents with a full catalog snapshot
+
+        Args:
+            books: The full list of books from GET /books
+            generation: The replica generation observed before the snapshot was requested
+
+        Returns:
+            False if a write was applied while the snapshot was in flight (the snapshot is discarded)
+        """
+        return self.install(BookReplica.build(books), generation)
+
+    @classmethod
+    def build(cls, books: Iterable[Dict[str, Any]]) -> "BookReplica":
+        """
+        Build the catalog and indexes for a snapshot in a new, unshared replica
+
+        Nothing is locked, so the async service builds snapshots in a worker
+        thread and only holds the lock for install().
+        """
+        staged = cls(enabled=True, refresh_interval=0.0)
+        isbn_keys, isbn_ids = array("q"), array("q")
+        days: List[str] = []
+        day_ids = array("q")
+        interned: Dict[str, str] = {}
+        for book in books:
+            if isinstance(book, dict) and type(book.get("id")) is int:
+                key = staged._index(book)
+                if key is not None:
+                    isbn_keys.append(key)
+                    isbn_ids.append(book["id"])
+                day = published_day(book)
+                days.append(interned.setdefault(day, day))
+                day_ids.append(book["id"])
+        staged.by_isbn = SortedPairs.build(isbn_keys, isbn_ids)
+        staged.by_published = SortedPairs.build(days, day_ids)
+        return staged
+
+    def install(self, staged: "BookReplica", generation: int) -> bool:
+        """
+        Swap in the contents of a replica made by build()
+
+        Args:
+            staged: The built snapshot
+            generation: The replica generation observed before the snapshot was requested
+
+        Returns:
+            False if a write was applied while the snapshot was in flight (the snapshot is discarded)
+        """
+        with self._lock:
+            if generation != self.generation:
+                return False
+            self.books = staged.books
+            self.by_author = staged.by_author
+            self.by_title_token = staged.by_title_token
+            self.by_isbn = staged.by_isbn
+            self.by_isbn_text = staged.by_isbn_text
+            self.by_published = staged.by_published
+            self.loaded_at = time.monotonic()
+            return True
+
+    def clear(self):
+        """Drop all books so the next search reloads the catalog"""
+        with self._lock:
+            self.generation += 1
+            self._reset()
+            self.loaded_at = None
+
+    def book_created(self, book: Dict[str, Any]):
+        with self._lock:
+            self.generation += 1
+            if isinstance(book, dict) and type(book.get("id")) is int:
+                self._unindex(book["id"])
+                self._insert(book)
+
+    def book_updated(self, book_id: int, book_data: Dict[str, Any]):
+        with self._lock:
+            self.generation += 1
+            existing = self._unindex(book_id)
+            if existing is not None:
+                self._insert({**existing, **book_data, "id": book_id})
+
+    def book_deleted(self, book_id: int):
+        with self._lock:
+            self.generation += 1
+            self._unindex(book_id)
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        author: Optional[str] = None,
+        isbn: Optional[str] = None,
+        published_after: Optional[str] = None,
+        published_before: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Find books matching every given criterion
+
+        Args:
+            query: Words that must all appear in the title
+            author: Author name (case and punctuation insensitive)
+            isbn: ISBN with or without hyphens
+            published_after: Earliest publication date, inclusive (YYYY-MM-DD prefix)
+            published_before: Latest publication date, inclusive (YYYY-MM-DD prefix)
+            limit: Maximum number of books to return
+
+        Returns:
+            Matching books ordered by id
+        """
+        with self._lock:
+            author_key = normalize_author(author) if author else None
+            isbn_text = normalize_isbn(isbn) if isbn else None
+            tokens = set(tokenize(query))
+            after = str(published_after or "")[:10]
+            before = str(published_before or "9999-12-31")[:10]
+
+            # The ids matching each criterion's index; candidates come from the smallest
+            sources: List[Sequence[int]] = []
+            if author_key is not None:
+                sources.append(self.by_author.get(author_key, ()))
+            if isbn_text is not None:
+                sources.append(self._isbn_ids(isbn_text))
+            for token in tokens:
+                sources.append(self.by_title_token.get(token, ()))
+            if published_after or published_before:
+                days = self.by_published.keys
+                low = bisect_left(days, after)
+                sources.append(self.by_published.ids_between(low, bisect_right(days, before, low)))
+
+            if limit is not None:
+                limit = max(0, int(limit))
+            if len(sources) <= 1:
+                ids: Iterable[int] = sources[0] if sources else self.books.live_ids()
+                ids = sorted(ids) if limit is None else heapq.nsmallest(limit, ids)
+                return [self.books.get(book_id) for book_id in ids]
+
+            matches = []
+            for book_id in min(sources, key=len):
+                book = self.books.get(book_id)
+                if (book is not None
+                        and (author_key is None or normalize_author(book.get("author")) == author_key)
+                        and (isbn_text is None or normalize_isbn(book.get("isbn")) == isbn_text)
+                        and tokens.issubset(tokenize(book.get("title")))
+                        and (not (published_after or published_before) or after <= published_day(book) <= before)):
+                    matches.append(book)
+            matches.sort(key=lambda book: book["id"])
+            return matches if limit is None else matches[:limit]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "books": len(self.books),
+            "loaded": self.loaded_at is not None,
+            "age_seconds": None if self.loaded_at is None else round(time.monotonic() - self.loaded_at, 3)
+        }
+
+    def _isbn_ids(self, normalized: str) -> Sequence[int]:
+        key = isbn_key(normalized)
+        if key is None:
+            return self.by_isbn_text.get(normalized, ())
+        return self.by_isbn.lookup(key)
+
+    def _index(self, book: Dict[str, Any]) -> Optional[int]:
+        """Store a book and add it to the per-key indexes; returns its ISBN key for the caller to place"""
+        book_id = book["id"]
+        self.books.append(book)
+        self.by_author.setdefault(normalize_author(book.get("author")), array("q")).append(book_id)
+        for token in set(tokenize(book.get("title"))):
+            self.by_title_token.setdefault(token, array("q")).append(book_id)
+        normalized = normalize_isbn(book.get("isbn"))
+        key = isbn_key(normalized)
+        if key is None:
+            self.by_isbn_text.setdefault(normalized, array("q")).append(book_id)
+        return key
+
+    def _insert(self, book: Dict[str, Any]):
+        """Index one book, keeping the sorted indexes in order"""
+        key = self._index(book)
+        if key is not None:
+            self.by_isbn.insert(key, book["id"])
+        self.by_published.insert(sys.intern(published_day(book)), book["id"])
+
+    def _unindex(self, book_id: int) -> Optional[Dict[str, Any]]:
+        book = self.books.get(book_id)
+        if book is None:
+            return None
+        self.books.delete(book_id)
+        _discard(self.by_author, normalize_author(book.get("author")), book_id)
+        for token in set(tokenize(book.get("title"))):
+            _discard(self.by_title_token, token, book_id)
+        normalized = normalize_isbn(book.get("isbn"))
+        key = isbn_key(normalized)
+        if key is None:
+            _discard(self.by_isbn_text, normalized, book_id)
+        else:
+            self.by_isbn.remove(key, book_id)
+        self.by_published.remove(published_day(book), book_id)
+        return book
+
+def _discard(index: Dict[str, array], key: str, book_id: int):
+    ids = index.get(key)
+    if ids is not None:
+        try:
+            ids.remove(book_id)
+        except ValueError:
+            return
+        if not ids:
+            del index[key]
+
+# Process-wide catalog replica used by the search tools
+book_replica = BookReplica(
+    enabled=get_replica_enabled(),
+    refresh_interval=get_replica_refresh_interval()
+)
\ No newline at end of file
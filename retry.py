@@ -0,0 +1,92 @@
+import random
+import threading
+from typing import Any, Dict, Optional
+
+from config import (
+    get_retry_enabled,
+    get_retry_max_attempts,
+    get_retry_base_delay,
+    get_retry_max_delay,
+    get_retry_budget_ratio,
+    get_retry_budget_capacity,
+)
+
+# Books API responses worth retrying: the backend or a proxy in front of it is
+# briefly unavailable, and the request was not applied
+RETRY_STATUSES = frozenset((502, 503, 504))
+
+class RetryPolicy:
+    """
+    Jittered exponential backoff with a retry budget shared by all Books API requests
+
+    Every first attempt deposits budget_ratio tokens (up to budget_capacity)
+    and every retry withdraws one, so retries stay a bounded fraction of the
+    traffic and cannot multiply load on a backend that is already failing.
+    Delays use "full jitter": a random time between zero and the exponential
+    backoff for the attempt, capped at max_delay.
+    """
+
+    def __init__(self, enabled: bool, max_attempts: int, base_delay: float, max_delay: float,
+                 budget_ratio: float, budget_capacity: float):
+        self.enabled = enabled
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget_ratio = budget_ratio
+        self.budget_capacity = budget_capacity
+        self.tokens = budget_capacity
+        self.retries = 0
+        self.budget_exhausted = 0
+        self._lock = threading.Lock()
+
+    def request_started(self):
+        """Record a first attempt, adding to the retry budget"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.tokens = min(self.budget_capacity, self.tokens + self.budget_ratio)
+
+    def next_delay(self, attempt: int) -> Optional[float]:
+        """
+        Decide whether a failed attempt may be retried
+
+        Args:
+            attempt: Zero-based number of the attempt that failed
+
+        Returns:
+            Seconds to wait before the retry, or None if it may not be retried
+        """
+        if not self.enabled or attempt + 1 >= self.max_attempts:
+            return None
+        with self._lock:
+            if self.tokens < 1:
+                self.budget_exhausted += 1
+                return None
+            self.tokens -= 1
+            self.retries += 1
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def reset(self):
+        """Refill the retry budget and clear the counters"""
+        with self._lock:
+            self.tokens = self.budget_capacity
+            self.retries = 0
+            self.budget_exhausted = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "retries": self.retries,
+            "budget_exhausted": self.budget_exhausted,
+            "budget_tokens": round(self.tokens, 2)
+        }
+
+# Process-wide retry policy used by BookService and AsyncBookService
+retry_policy = RetryPolicy(
+    enabled=get_retry_enabled(),
+    max_attempts=get_retry_max_attempts(),
+    base_delay=get_retry_base_delay(),
+    max_delay=get_retry_max_delay(),
+    budget_ratio=get_retry_budget_ratio(),
+    budget_capacity=get_retry_budget_capacity()
+)
@@ -0,0 +1,154 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from config import get_conditional_requests_enabled, get_conditional_cache_size
+from metrics import backend_response_revalidated
+
+class _Representation:
+    """The last 200 response seen for a Books API resource and the value parsed from it"""
+
+    __slots__ = ("etag", "last_modified", "digest", "value", "size", "parse_time")
+
+    def __init__(self, etag: Optional[str], last_modified: Optional[str], digest: bytes,
+                 value: Any, size: int, parse_time: float):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
+        self.value = value
+        self.size = size
+        self.parse_time = parse_time
+
+class Revalidator:
+    """
+    Conditional GETs and parse reuse for Books API resources
+
+    For each path the last response's ETag and Last-Modified validators are
+    sent back as If-None-Match and If-Modified-Since, and a 304 Not Modified
+    answer is resolved to the value parsed from the earlier body. A 200 whose
+    body hashes the same as the previous one (for backends that send no
+    validators) also reuses the parsed value instead of decoding it again.
+
+    Parsed values are shared with the book cache and with earlier callers,
+    so they must not be modified in place.
+    """
+
+    def __init__(self, enabled: bool, max_size: int):
+        self.enabled = enabled
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, _Representation]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.not_modified = 0
+        self.unchanged = 0
+        self.changed = 0
+        self.bytes_saved = 0
+        self.parse_seconds_saved = 0.0
+
+    def request_headers(self, path: str) -> Dict[str, str]:
+        """The conditional headers to send with a GET of path"""
+        if not self.enabled:
+            return {}
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is None:
+            return {}
+        headers = {}
+        if entry.etag is not None:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified is not None:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def parse(self, path: str, endpoint: str, response, parse: Callable[[bytes], Any]) -> Optional[Any]:
+        """
+        Resolve a 200 or 304 response for path to its parsed body
+
+        Args:
+            path: The requested Books API path
+            endpoint: The path's endpoint template, used as a metrics label
+            response: A requests.Response or BufferedResponse
+            parse: Decodes a response body
+
+        Returns:
+            The parsed body, or None for a 304 whose earlier body is no longer known
+        """
+        if not self.enabled:
+            return parse(response.content) if response.status_code != 304 else None
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                self._entries.move_to_end(path)
+
+        if response.status_code == 304:
+            if entry is None:
+                return None
+            self._record(endpoint, "not_modified", entry.size, entry.parse_time)
+            return entry.value
+
+        content = response.content
+        digest = hashlib.blake2b(content, digest_size=16).digest()
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if entry is not None and entry.digest == digest:
+            value, parse_time = entry.value, entry.parse_time
+            self._record(endpoint, "unchanged", 0, parse_time)
+        else:
+            start = time.perf_counter()
+            value = parse(content)
+            parse_time = time.perf_counter() - start
+            self._record(endpoint, "changed", 0, 0.0)
+
+        with self._lock:
+            self._entries[path] = _Representation(etag, last_modified, digest, value, len(content), parse_time)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return value
+
+    def forget(self, path: str):
+        """Drop what is known about path, e.g. after the resource was deleted"""
+        with self._lock:
+            self._entries.pop(path, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def reset(self):
+        """Forget all resources and clear the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.not_modified = self.unchanged = self.changed = self.bytes_saved = 0
+            self.parse_seconds_saved = 0.0
+
+    def _record(self, endpoint: str, outcome: str, bytes_saved: int, parse_seconds_saved: float):
+        with self._lock:
+            if outcome == "not_modified":
+                self.not_modified += 1
+            elif outcome == "unchanged":
+                self.unchanged += 1
+            else:
+                self.changed += 1
+            self.bytes_saved += bytes_saved
+            self.parse_seconds_saved += parse_seconds_saved
+        backend_response_revalidated(endpoint, outcome, bytes_saved, parse_seconds_saved)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "not_modified": self.not_modified,
+            "unchanged": self.unchanged,
+            "changed": self.changed,
+            "bytes_saved": self.bytes_saved,
+            "parse_ms_saved": round(self.parse_seconds_saved * 1000, 3)
+        }
+
+# Process-wide validators and parsed bodies used by BookService and AsyncBookService
+revalidator = Revalidator(
+    enabled=get_conditional_requests_enabled(),
+    max_size=get_conditional_cache_size()
+)
@@ -1,56 +1,174 @@
-from fastapi import APIRouter, HTTPException
-from models import MCPRequest, MCPResponse, ToolsListResponse, ToolCallResult
-from tools import get_tool_implementations, get_tools_list
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request, WebSocket
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from models import MCPRequest, MCPResponse, ToolsListResponse
+from tools import get_tools_list, get_tools_list_json
+from dispatcher import execute_tool_calls, stream_tool_calls
+from streaming import negotiate_stream_format, encode_stream
+from cache import book_cache
+from shared_cache import SharedBookCache
+from singleflight import singleflight_stats
+from replica import book_replica
+from serialization import dumps, encode_mcp_response, encode_mcp_response_msgpack, negotiate_msgpack
+from config import get_fast_serialization
+from metrics import registry, latency_summary
+from circuit_breaker import backend_health
+from retry import retry_policy
+from revalidation import revalidator
+from admission import admission, client_id, AdmissionRejected
+from write_behind import write_behind
+from balancer import backend_pool
+from compression import etag_for_coding, response_compression
+from mcp_session import serve_websocket, session_stats
 
 # Create router
 router = APIRouter()
 
+# Fixed for the life of the process, so /health does not count the tools on every call
+AVAILABLE_TOOLS = len(get_tools_list())
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header names etag (weakly compared, as RFC 9110 requires for GET)
+
+    The ETags given to compressed forms of the body (see compression.etag_for_coding) match too.
+    """
+    if not if_none_match:
+        return False
+    etags = {etag, *(etag_for_coding(etag, codec.name) for codec in response_compression.codecs)}
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag in etags or (tag.startswith("W/") and tag[2:] in etags):
+            return True
+    return False
+
 @router.get("/tools", response_model=ToolsListResponse)
-def list_tools():
+async def list_tools(request: Request):
     """
     List all available tools
     
     This endpoint complies with the MCP specification for tool discovery.
     Returns a list of all tools available through this MCP server.
+    
+    The body is encoded once at startup and carries an ETag; a request whose
+    If-None-Match matches it is answered with 304 Not Modified.
     """
-    return ToolsListResponse(tools=get_tools_list())
+    body, etag = get_tools_list_json()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
 
 @router.post("/tool-calls", response_model=MCPResponse)
-def process_tool_calls(request: MCPRequest):
+async def process_tool_calls(request: MCPRequest, http_request: Request):
     """
     Process tool calls
     
     This endpoint complies with the MCP specification for tool execution.
-    It accepts a list of tool calls, executes them, and returns the results.
-    """
-    results = []
-    tool_implementations = get_tool_implementations()
-    
-    for tool_call in request.tool_calls:
-        if tool_call.name not in tool_implementations:
-            results.append(ToolCallResult(
-                result=None,
-                error=f"Unknown tool: {tool_call.name}"
-            ))
-            continue
-            
-        # Get the implementation
-        implementation = tool_implementations[tool_call.name]
-        
-        # Execute the tool
-        result = implementation(**tool_call.parameters)
-        results.append(result)
+    It accepts a list of tool calls, executes them concurrently, and returns
+    the results in the order the calls were given.
+    
+    Clients sending "Accept: application/x-ndjson" or "Accept: text/event-stream"
+    instead receive each result as soon as it completes, tagged with the index
+    of its call, and full list_books results are streamed from the Books API.
+    
+    Results come from our own services, so the response body is encoded
+    directly rather than re-validated against MCPResponse. Clients sending
+    "Accept: application/msgpack" receive the same body as MessagePack when
+    the msgpack package is installed.
+    
+    Oversized batches are refused with 413, and clients over their rate limit
+    or requests arriving while the Books API queue is full with 429 and a
+    Retry-After header.
+    """
+    try:
+        admission.admit(
+            client_id(http_request.headers, http_request.client.host if http_request.client else None),
+            len(request.tool_calls)
+        )
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=e.headers)
     
+    stream_format = negotiate_stream_format(http_request.headers.get("accept"))
+    if stream_format is not None:
+        results = stream_tool_calls(
+            request.tool_calls,
+            serialize_writes=request.serialize_writes
+        )
+        return StreamingResponse(encode_stream(results, stream_format), media_type=stream_format)
+    
+    results = await execute_tool_calls(
+        request.tool_calls,
+        serialize_writes=request.serialize_writes
+    )
+    msgpack_type = negotiate_msgpack(http_request.headers.get("accept"))
+    if msgpack_type is not None:
+        return Response(encode_mcp_response_msgpack(results), media_type=msgpack_type)
+    if get_fast_serialization():
+        return Response(encode_mcp_response(results), media_type="application/json")
     return MCPResponse(tool_call_results=results)
 
+@router.websocket("/mcp")
+async def mcp_websocket(websocket: WebSocket):
+    """
+    Persistent MCP session over WebSocket
+
+    Speaks MCP JSON-RPC (initialize, ping, tools/list, tools/call and
+    notifications/cancelled), one message per frame. Tool calls run through
+    the same dispatcher as /tool-calls; many may be in flight on one
+    connection and each answer is sent as soon as its call completes.
+    """
+    await websocket.accept(subprotocol="mcp" if "mcp" in websocket.scope.get("subprotocols", ()) else None)
+    await serve_websocket(websocket)
+
 @router.get("/health")
-def health_check():
+async def health_check():
     """
     Health check endpoint
     
-    Returns the status of the MCP server and the number of available tools.
+    Returns the status of the MCP server, the number of available tools,
+    the book cache hit/miss/eviction counters, request coalescing counters,
+    the state of the catalog replica, estimated tool and Books API latencies,
+    Books API retry and conditional request counters, admission control and
+    write-behind queue counters, the load and health of each Books API
+    replica, response compression and MCP session counters and the
+    circuit breaker state of each Books API endpoint. The status is
+    "degraded" while any endpoint's circuit is not closed.
+    
+    Served on the event loop, as the counters are all in memory except the
+    shared cache's sizes, which are read on a worker thread.
+    """
+    backend = backend_health.stats()
+    if isinstance(book_cache, SharedBookCache):
+        cache_stats = await asyncio.get_running_loop().run_in_executor(None, book_cache.stats)
+    else:
+        cache_stats = book_cache.stats()
+    return Response(dumps({
+        "status": backend["status"],
+        "available_tools": AVAILABLE_TOOLS,
+        "cache": cache_stats,
+        "singleflight": singleflight_stats(),
+        "replica": book_replica.stats(),
+        "latency_ms": latency_summary(),
+        "retry": retry_policy.stats(),
+        "conditional_requests": revalidator.stats(),
+        "admission": admission.stats(),
+        "write_behind": write_behind.stats(),
+        "backends": backend_pool.stats(),
+        "compression": response_compression.stats(),
+        "sessions": session_stats(),
+        "backend": backend["endpoints"]
+    }), media_type="application/json")
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Prometheus metrics endpoint
+    
+    Returns per-tool call counts, latency histograms and in-flight gauges,
+    and Books API latency, status code and error counters in the Prometheus
+    text exposition format.
     """
-    return {
-        "status": "healthy",
-        "available_tools": len(get_tools_list())
-    }
\ No newline at end of file
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
\ No newline at end of file
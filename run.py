@@ -1,12 +1,35 @@
+import argparse
+import importlib.util
+import os
+import sys
 import uvicorn
-from config import get_server_host, get_server_port
+from shared_cache import remove_shared_store
+from config import (
+    get_server_host,
+    get_server_port,
+    get_server_mode,
+    get_workers,
+    get_graceful_shutdown_timeout,
+    get_backlog,
+    get_book_cache_backend,
+    get_shared_cache_path,
+    get_write_behind_enabled,
+)
 
-def main():
-    """Start the MCP server"""
-    host = get_server_host()
-    port = get_server_port()
-    
-    print(f"Starting MCP Server on {host}:{port}")
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+def get_loop() -> str:
+    """Use uvloop when it is installed (it does not support Windows)"""
+    return "uvloop" if sys.platform != "win32" and _installed("uvloop") else "asyncio"
+
+def get_http() -> str:
+    """Use the httptools parser when it is installed"""
+    return "httptools" if _installed("httptools") else "h11"
+
+def run_development(host: str, port: int):
+    """Run a single process that reloads when the code changes"""
+    print(f"Starting MCP Server on {host}:{port} (development, auto-reload)")
     uvicorn.run(
         "main:app",
         host=host,
@@ -14,5 +37,83 @@ def main():
         reload=True
     )
 
+def run_production(host: str, port: int, workers: int):
+    """
+    Run several worker processes that share one listening socket
+
+    The supervisor binds the port once and starts each worker as a fresh
+    (spawned) process that imports main:app itself, so every worker builds
+    its own catalog replica and Books API connection pools; nothing is
+    inherited from the parent. This module must not import the app. With
+    more than one worker the book cache defaults to the "shared" backend, a
+    database on tmpfs that all workers open; it is emptied here before they
+    start. Write-behind is turned off with more than one worker.
+
+    On SIGTERM or SIGINT each worker stops accepting connections, waits up to
+    the graceful shutdown timeout for in-flight requests, and then closes its
+    connection pools.
+    """
+    # Workers read their settings from the environment
+    os.environ["MCP_SERVER_MODE"] = "production"
+    os.environ["MCP_WORKERS"] = str(workers)
+    if workers > 1 and get_write_behind_enabled():
+        # The queue is per process: reads, flush_writes and shutdown in one worker
+        # would not see writes another worker has acknowledged but not yet sent
+        print("Write-behind keeps queued writes in one process and is disabled with more than one worker")
+        os.environ["MCP_WRITE_BEHIND_ENABLED"] = "false"
+    if get_book_cache_backend() == "shared":
+        remove_shared_store(get_shared_cache_path())
+
+    loop, http = get_loop(), get_http()
+    print(f"Starting MCP Server on {host}:{port} (production, {workers} workers, loop={loop}, http={http})")
+    uvicorn.run(
+        "main:app",
+        host=host,
+        port=port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        backlog=get_backlog(),
+        timeout_graceful_shutdown=get_graceful_shutdown_timeout(),
+        access_log=False
+    )
+
+def run_stdio():
+    """
+    Serve one MCP session over stdin and stdout instead of HTTP
+
+    For MCP clients that launch the server as a subprocess. Only JSON-RPC
+    messages may reach stdout, so everything else printed by the process
+    (including by C extensions) is sent to stderr.
+    """
+    import asyncio
+    from mcp_session import serve_stdio
+
+    protocol_out = os.fdopen(os.dup(sys.stdout.fileno()), "wb", buffering=0)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdout = sys.stderr
+    asyncio.run(serve_stdio(sys.stdin, protocol_out))
+
+def main():
+    """Start the MCP server"""
+    parser = argparse.ArgumentParser(description="Start the MCP server")
+    parser.add_argument("--production", action="store_true",
+                        help="Run multiple workers without auto-reload (same as MCP_SERVER_MODE=production)")
+    parser.add_argument("--workers", type=int, help="Worker processes in production mode (default: MCP_WORKERS or CPU count)")
+    parser.add_argument("--stdio", action="store_true", help="Serve one MCP session over stdin/stdout instead of HTTP")
+    args = parser.parse_args()
+
+    if args.stdio:
+        run_stdio()
+        return
+
+    host = get_server_host()
+    port = get_server_port()
+    
+    if args.production or get_server_mode() == "production":
+        run_production(host, port, max(1, args.workers or get_workers()))
+    else:
+        run_development(host, port)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,169 @@
+import json
+from typing import Any, Callable, Dict, Iterable, Optional
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; MessagePack responses are offered only when it is installed
+    msgpack = None
+
+# Accept header media types answered with a MessagePack body
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/vnd.msgpack", "application/x-msgpack")
+
+# Sequence types that encode themselves at the top level (see register_sequence)
+_SEQUENCE_ENCODERS: Dict[type, Callable[[Any], bytes]] = {}
+
+def register_sequence(cls: type, encode: Callable[[Any], bytes]):
+    """
+    Teach the encoders a read-only sequence type that is not a list
+
+    encode_value uses encode for a top-level value of type cls; nested
+    inside other values it is encoded as a list of its items.
+    """
+    _SEQUENCE_ENCODERS[cls] = encode
+
+def as_builtin(value: Any) -> Any:
+    """A registered sequence as a list, for encoders that do not know it; anything else unchanged"""
+    if type(value) in _SEQUENCE_ENCODERS:
+        return list(value)
+    return value
+
+def _default(value: Any) -> Any:
+    if type(value) in _SEQUENCE_ENCODERS:
+        return list(value)
+    return str(value)
+
+def dumps(value: Any) -> bytes:
+    """
+    Encode a value as compact JSON
+
+    Uses orjson when it is installed. Registered sequence types are encoded
+    as lists; other values JSON cannot represent are encoded with str().
+
+    Args:
+        value: The value to encode
+
+    Returns:
+        UTF-8 encoded JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, separators=(",", ":"), default=_default).encode()
+
+def loads(data: bytes) -> Any:
+    """Decode a JSON document, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+class JSONList(list):
+    """
+    A list decoded from a JSON array that keeps the array's original bytes
+
+    Encoders copy raw into their output instead of re-encoding the list. Any
+    copy or slice is a plain list, so changed data is always re-encoded; the
+    list itself must not be modified in place.
+    """
+
+    __slots__ = ("raw",)
+
+    def __init__(self, items: Iterable[Any], raw: bytes):
+        super().__init__(items)
+        self.raw = raw
+
+def loads_list(data: bytes) -> Any:
+    """
+    Decode a JSON document, wrapping a top-level array in a JSONList
+
+    Args:
+        data: The JSON document, e.g. a Books API response body
+
+    Returns:
+        A JSONList for arrays, otherwise the decoded value
+    """
+    value = loads(data)
+    if not isinstance(value, list):
+        return value
+    # Raw newlines can only be whitespace between tokens; dropping them keeps
+    # the bytes usable on a single NDJSON line or SSE data field
+    raw = bytes(data)
+    if b"\n" in raw or b"\r" in raw:
+        raw = raw.replace(b"\n", b"").replace(b"\r", b"")
+    return JSONList(value, raw)
+
+def encode_value(value: Any) -> bytes:
+    """Encode a value, copying the original bytes of a JSONList"""
+    if type(value) is JSONList:
+        return value.raw
+    encode = _SEQUENCE_ENCODERS.get(type(value))
+    if encode is not None:
+        return encode(value)
+    return dumps(value)
+
+def encode_result_fields(result: Any) -> bytes:
+    """
+    Encode the "result" and "error" members of a ToolCallResult
+
+    Args:
+        result: The ToolCallResult to encode
+
+    Returns:
+        The members without the enclosing braces, so callers can add their own
+    """
+    return b'"result":' + encode_value(result.result) + b',"error":' + dumps(result.error)
+
+def encode_mcp_response(results: Iterable[Any]) -> bytes:
+    """
+    Encode an MCPResponse body without building and validating the model
+
+    Args:
+        results: The ToolCallResults of the request
+
+    Returns:
+        The JSON body {"tool_call_results": [...]}
+    """
+    return b'{"tool_call_results":[' + b",".join(
+        b"{" + encode_result_fields(result) + b"}" for result in results
+    ) + b"]}"
+
+def negotiate_msgpack(accept: Optional[str]) -> Optional[str]:
+    """
+    Pick a MessagePack media type from the Accept header
+
+    Args:
+        accept: The request's Accept header
+
+    Returns:
+        The MessagePack media type the client asked for, or None for JSON
+        (always None when msgpack is not installed)
+    """
+    if msgpack is None or not accept:
+        return None
+    accept = accept.lower()
+    for media_type in MSGPACK_MEDIA_TYPES:
+        if media_type in accept:
+            return media_type
+    return None
+
+def encode_mcp_response_msgpack(results: Iterable[Any]) -> bytes:
+    """
+    Encode an MCPResponse body as MessagePack
+
+    The body has the same structure as the JSON one; registered sequence
+    types are packed as arrays and values MessagePack cannot represent as
+    strings.
+
+    Args:
+        results: The ToolCallResults of the request
+
+    Returns:
+        The MessagePack map {"tool_call_results": [...]}
+    """
+    return msgpack.packb(
+        {"tool_call_results": [{"result": result.result, "error": result.error} for result in results]},
+        default=_default
+    )
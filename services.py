@@ -1,40 +1,792 @@
 from models import Book, ToolCallResult
-import requests
-from typing import Dict, Any
+from http_client import get_session, get_async_client, get_timeout
+from cache import book_cache, idempotent_creates
+from shared_cache import SharedBookCache
+from singleflight import sync_flight, async_flight
+from replica import BookReplica, book_replica
+from serialization import dumps, loads, loads_list
+from catalog import loads_catalog
+from metrics import backend_request_started, backend_request_finished, backend_request_rejected
+from metrics import backend_request_retried, backend_retries_exhausted, error_category
+from circuit_breaker import backend_health, CircuitOpenError, EndpointBreaker
+from retry import retry_policy, RETRY_STATUSES
+from revalidation import revalidator
+from admission import admission, BackendOverloadedError
+from balancer import backend_pool, Backend
+from write_behind import write_behind, PendingWrite
+from config import get_serve_stale, get_books_api_url, get_compact_catalog
+from config import get_backend_honors_idempotency_key, get_idempotency_key_lease
+from config import get_bulk_concurrency, get_bulk_max_items
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import aiohttp
+import asyncio
+import sys
+import time
+from typing import TYPE_CHECKING, Dict, Any, AsyncIterator, Callable, List, Optional, Tuple, Union
+
+if TYPE_CHECKING:
+    import requests
 
 # Base URL of the Books API
-BOOKS_API_URL = "http://localhost:5288"
+BOOKS_API_URL = get_books_api_url()
+
+# Decode list_books bodies into a CompactCatalog (catalog.py) instead of a JSONList
+COMPACT_CATALOG = get_compact_catalog()
+
+# Whether the Books API applies a create only once per Idempotency-Key. Only
+# then may a keyed create that reached the backend be sent again.
+BACKEND_HONORS_IDEMPOTENCY_KEY = get_backend_honors_idempotency_key()
+
+# How long a create_book call may hold its idempotency key, and how often a
+# call with the same key checks whether it has finished
+IDEMPOTENCY_KEY_LEASE = get_idempotency_key_lease()
+IDEMPOTENCY_KEY_POLL_INTERVAL = 0.05
+
+# Response handling shared by the sync and async services. Both requests.Response
+# and BufferedResponse expose status_code, content and text. Successful reads are
+# stored in the book cache and successful writes update or invalidate it and
+# patch the catalog replica used by the search tools. The list_books result keeps
+# the backend's JSON bytes (serialization.JSONList) so responses can reuse them,
+# or with COMPACT_CATALOG is packed into a columnar catalog.CatalogView instead.
+#
+# Cache misses go through a single-flight group so identical concurrent reads
+# share one backend request. The flight key includes the cache generation, so
+# a read issued after a write never joins a request that started before it.
+#
+# Reads are sent as conditional GETs (revalidation.py): a 304 Not Modified, or
+# a 200 whose body is byte-for-byte unchanged, reuses the previously parsed value.
+#
+# In write-behind mode (write_behind.py) AsyncBookService queues writes instead
+# of sending them, and its reads apply the queued writes to what they read.
+
+# Failures to get a response from the Books API, including requests refused by
+# an open circuit (see circuit_breaker.py) and, on the async path, requests that
+# found no free concurrency slot (see admission.py)
+ASYNC_REQUEST_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, CircuitOpenError, BackendOverloadedError)
+
+def sync_request_errors() -> Tuple[type, ...]:
+    """
+    The sync path's counterpart of ASYNC_REQUEST_ERRORS, for except clauses
+
+    requests is only imported once BookService sends its first request (see
+    http_client.get_session), and none of its exceptions exist before then.
+    """
+    requests = sys.modules.get("requests")
+    return (requests.RequestException, CircuitOpenError) if requests is not None else (CircuitOpenError,)
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Sent with create_book requests that carry a client-supplied idempotency key
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+
+class BufferedResponse:
+    """A fully read async Books API response with the requests.Response attributes used here"""
+
+    __slots__ = ("status_code", "content", "headers")
+
+    def __init__(self, status_code: int, content: bytes, headers: Any = None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = {} if headers is None else headers
+
+    def json(self) -> Any:
+        return loads(self.content)
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+def _endpoint(path: str) -> str:
+    """The endpoint template of a Books API path, used for metrics and circuit breakers"""
+    return "/books" if path == "/books" else "/books/{id}"
+
+def _begin_request(method: str, path: str) -> Tuple[EndpointBreaker, float]:
+    """Check the endpoint's circuit and start timing a Books API request"""
+    breaker = backend_health.breaker(method, _endpoint(path))
+    try:
+        breaker.before_request()
+    except CircuitOpenError:
+        backend_request_rejected(breaker.method, breaker.endpoint)
+        raise
+    return breaker, backend_request_started()
+
+def _end_request(breaker: EndpointBreaker, start: float, backend: Backend,
+                 status: Optional[int] = None, error: Optional[BaseException] = None):
+    """Record a Books API request's outcome in the metrics, the endpoint's circuit breaker and the replica's health"""
+    elapsed = backend_request_finished(breaker.method, breaker.endpoint, start, status, error)
+    breaker.record(elapsed, status, error)
+    if error is None and status is not None and status < 500:
+        backend_pool.done(backend, elapsed, False)
+        if breaker.method == "GET":
+            backend_pool.observe_read(breaker.endpoint, elapsed)
+    elif error is not None and error_category(error) in ("cancelled", "other"):
+        backend_pool.done(backend, elapsed, None)
+    else:
+        backend_pool.done(backend, elapsed, True)
+
+def _async_timeout(breaker: EndpointBreaker) -> aiohttp.ClientTimeout:
+    return aiohttp.ClientTimeout(total=None, sock_connect=get_timeout()[0], sock_read=breaker.read_timeout())
+
+def _retry_reason(status: Optional[int] = None, error: Optional[BaseException] = None) -> Optional[str]:
+    """Why a failed attempt is worth retrying (the error category or status code), or None"""
+    if error is not None:
+        category = error_category(error)
+        return category if category in ("timeout", "connection") else None
+    return str(status) if status in RETRY_STATUSES else None
+
+def _never_sent(error: BaseException) -> bool:
+    """Whether a failed attempt is known not to have reached the Books API (it failed before or while connecting)"""
+    if isinstance(error, (CircuitOpenError, BackendOverloadedError, aiohttp.ClientConnectorError)):
+        return True
+    connect_timeout = getattr(aiohttp, "ConnectionTimeoutError", None)  # aiohttp 3.10+
+    if connect_timeout is not None and isinstance(error, connect_timeout):
+        return True
+    # requests is only loaded by the sync client; without it no error can be one of its exceptions
+    requests = sys.modules.get("requests")
+    if requests is None:
+        return False
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.ConnectionError) or not error.args:
+        return False
+    # urllib3 wraps the failure in a MaxRetryError whose reason says whether a connection was made
+    reason = getattr(error.args[0], "reason", None)
+    return isinstance(reason, sys.modules["urllib3"].exceptions.NewConnectionError)
+
+def _may_resend(method: str, idempotency_key: Optional[str], error: Optional[BaseException] = None) -> bool:
+    """
+    Whether a failed attempt may be sent again without risking a duplicate create
+
+    A POST is only resent when it carries an idempotency key and either the
+    Books API honors the key or the attempt never reached the backend.
+    """
+    if method != "POST":
+        return True
+    if idempotency_key is None:
+        return False
+    return BACKEND_HONORS_IDEMPOTENCY_KEY or (error is not None and _never_sent(error))
+
+def _retry_delay(method: str, path: str, attempt: int, idempotent: bool, reason: Optional[str]) -> Optional[float]:
+    """The backoff before retrying a failed attempt, or None if it must not be retried"""
+    if not idempotent or reason is None or not retry_policy.enabled:
+        return None
+    delay = retry_policy.next_delay(attempt)
+    if delay is None:
+        backend_retries_exhausted(method, _endpoint(path))
+    else:
+        backend_request_retried(method, _endpoint(path), reason)
+    return delay
+
+def _idempotency_headers(idempotency_key: Optional[str]) -> Dict[str, str]:
+    return {} if idempotency_key is None else {IDEMPOTENCY_KEY_HEADER: idempotency_key}
+
+def _sync_attempt(method: str, path: str, json_body: Any, headers: Optional[Dict[str, str]]) -> "requests.Response":
+    """Send one request to the Books API on the shared session"""
+    breaker, start = _begin_request(method, path)
+    backend = backend_pool.choose(BOOKS_API_URL)
+    try:
+        response = get_session().request(
+            method,
+            f"{backend.url}{path}",
+            json=json_body,
+            headers=headers,
+            timeout=(get_timeout()[0], breaker.read_timeout())
+        )
+    except BaseException as e:
+        _end_request(breaker, start, backend, error=e)
+        raise
+    _end_request(breaker, start, backend, response.status_code)
+    return response
+
+def _sync_request(method: str, path: str, json_body: Any = None, idempotency_key: Optional[str] = None,
+                  headers: Optional[Dict[str, str]] = None) -> "requests.Response":
+    """
+    Send a request to the Books API, retrying transient failures of idempotent requests
+
+    POST is only retried when an idempotency key is given (see _may_resend);
+    the key is sent as the Idempotency-Key header so the Books API can
+    recognise a replayed create.
+    """
+    headers = {**(headers or {}), **_idempotency_headers(idempotency_key)} or None
+    retry_policy.request_started()
+    attempt = 0
+    while True:
+        try:
+            response = _sync_attempt(method, path, json_body, headers)
+        except sync_request_errors() as e:
+            delay = _retry_delay(method, path, attempt, _may_resend(method, idempotency_key, e),
+                                 _retry_reason(error=e))
+            if delay is None:
+                raise
+        else:
+            delay = _retry_delay(method, path, attempt, _may_resend(method, idempotency_key),
+                                 _retry_reason(response.status_code))
+            if delay is None:
+                return response
+        attempt += 1
+        time.sleep(delay)
+
+async def _async_attempt(method: str, path: str, data: Optional[bytes], headers: Optional[Dict[str, str]],
+                         backend: Optional[Backend] = None) -> BufferedResponse:
+    """
+    Send one request to the Books API on the shared async client and read the whole body
+
+    The request goes to backend if one was chosen by the caller, otherwise to
+    the replica the balancer picks once the request is let through.
+    """
+    try:
+        slot = await admission.acquire_backend()
+        try:
+            breaker, start = _begin_request(method, path)
+        except BaseException:
+            admission.release_backend(slot)
+            raise
+    except BaseException:
+        if backend is not None:
+            backend_pool.done(backend, 0.0, None)
+        raise
+    if backend is None:
+        backend = backend_pool.choose(BOOKS_API_URL)
+    try:
+        try:
+            async with get_async_client().request(
+                method,
+                f"{backend.url}{path}",
+                data=data,
+                headers=headers,
+                timeout=_async_timeout(breaker)
+            ) as response:
+                buffered = BufferedResponse(response.status, await response.read(), response.headers)
+        except BaseException as e:
+            _end_request(breaker, start, backend, error=e)
+            raise
+    finally:
+        admission.release_backend(slot)
+    _end_request(breaker, start, backend, buffered.status_code)
+    return buffered
+
+def _answered(task: "asyncio.Future[BufferedResponse]") -> bool:
+    return not task.cancelled() and task.exception() is None and task.result().status_code < 500
+
+async def _hedged_get(path: str, headers: Optional[Dict[str, str]]) -> BufferedResponse:
+    """
+    GET path from one replica and, if it has not answered within the recent p95, from a second one too
+
+    The first usable answer wins and the other request is cancelled. If
+    neither is usable, the first replica's outcome is returned or raised.
+    """
+    endpoint = _endpoint(path)
+    delay = backend_pool.hedge_delay(BOOKS_API_URL, endpoint)
+    if delay is None:
+        return await _async_attempt("GET", path, None, headers)
+    primary_backend = backend_pool.choose(BOOKS_API_URL)
+    primary = asyncio.ensure_future(_async_attempt("GET", path, None, headers, primary_backend))
+    tasks = [primary]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done or not backend_pool.take_hedge(endpoint):
+            return await primary
+        hedge_backend = backend_pool.choose(BOOKS_API_URL, avoid=primary_backend)
+        tasks.append(asyncio.ensure_future(_async_attempt("GET", path, None, headers, hedge_backend)))
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if _answered(task):
+                    if task is not primary:
+                        backend_pool.hedge_won(hedge_backend, endpoint)
+                    return task.result()
+        return await primary
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()  # Retrieved, so a loser's failure is not logged as unhandled
+
+async def _async_request(method: str, path: str, json_body: Any = None, idempotency_key: Optional[str] = None,
+                         headers: Optional[Dict[str, str]] = None) -> BufferedResponse:
+    """Async counterpart of _sync_request"""
+    data = None if json_body is None else dumps(json_body)
+    headers = {
+        **(headers or {}),
+        **(JSON_HEADERS if json_body is not None else {}),
+        **_idempotency_headers(idempotency_key)
+    } or None
+    retry_policy.request_started()
+    attempt = 0
+    while True:
+        try:
+            if method == "GET":
+                response = await _hedged_get(path, headers)
+            else:
+                response = await _async_attempt(method, path, data, headers)
+        except ASYNC_REQUEST_ERRORS as e:
+            delay = _retry_delay(method, path, attempt, _may_resend(method, idempotency_key, e),
+                                 _retry_reason(error=e))
+            if delay is None:
+                raise
+        else:
+            delay = _retry_delay(method, path, attempt, _may_resend(method, idempotency_key),
+                                 _retry_reason(response.status_code))
+            if delay is None:
+                return response
+        attempt += 1
+        await asyncio.sleep(delay)
+
+async def _open_books_stream_attempt() -> aiohttp.ClientResponse:
+    """
+    Send GET /books without reading the body; latency is recorded up to the response headers
+
+    The concurrency slot is also held only until the headers arrive.
+    """
+    slot = await admission.acquire_backend()
+    try:
+        breaker, start = _begin_request("GET", "/books")
+        backend = backend_pool.choose(BOOKS_API_URL)
+        try:
+            response = await get_async_client().get(
+                f"{backend.url}/books",
+                headers=revalidator.request_headers("/books") or None,
+                timeout=_async_timeout(breaker)
+            )
+        except BaseException as e:
+            _end_request(breaker, start, backend, error=e)
+            raise
+    finally:
+        admission.release_backend(slot)
+    _end_request(breaker, start, backend, response.status)
+    return response
+
+async def _open_books_stream() -> aiohttp.ClientResponse:
+    """Open GET /books for streaming, retrying failures that happen before the body is read"""
+    retry_policy.request_started()
+    attempt = 0
+    while True:
+        try:
+            response = await _open_books_stream_attempt()
+        except ASYNC_REQUEST_ERRORS as e:
+            delay = _retry_delay("GET", "/books", attempt, True, _retry_reason(error=e))
+            if delay is None:
+                raise
+        else:
+            delay = _retry_delay("GET", "/books", attempt, True, _retry_reason(response.status))
+            if delay is None:
+                return response
+            response.release()
+        attempt += 1
+        await asyncio.sleep(delay)
+
+def _api_error(response) -> ToolCallResult:
+    return ToolCallResult(
+        result=None,
+        error=f"API Error: {response.status_code} - {response.text}"
+    )
+
+def _connection_error(e: Exception) -> ToolCallResult:
+    return ToolCallResult(
+        result=None,
+        error=f"Failed to connect to Books API: {str(e) or type(e).__name__}"
+    )
+
+def _stale_book(book_id: int) -> Optional[ToolCallResult]:
+    """A cached copy of the book regardless of its age, if stale reads are enabled"""
+    book = book_cache.get_stale_book(book_id) if get_serve_stale() else None
+    return None if book is None else ToolCallResult(result=book)
+
+def _stale_books(limit: Optional[int], offset: int, fields: Optional[List[str]]) -> Optional[ToolCallResult]:
+    """The cached list_books snapshot regardless of its age, if stale reads are enabled"""
+    books = book_cache.get_stale_books() if get_serve_stale() else None
+    return None if books is None else ToolCallResult(result=_page_books(books, limit, offset, fields))
+
+def _list_books_result(response, generation: int) -> ToolCallResult:
+    if response.status_code in (200, 304):
+        books = revalidator.parse("/books", "/books", response, loads_catalog if COMPACT_CATALOG else loads_list)
+        if books is None:
+            return _api_error(response)
+        book_cache.put_books(books, generation)
+        return ToolCallResult(
+            result=books
+        )
+    return _api_error(response)
+
+def _create_book_result(response, book_data: Optional[dict] = None,
+                        idempotency_key: Optional[str] = None) -> ToolCallResult:
+    if response.status_code == 201:  # Created
+        book = loads(response.content)
+        book_cache.book_created(book)
+        book_replica.book_created(book)
+        if idempotency_key is not None:
+            idempotent_creates.created(idempotency_key, book_data, book)
+        return ToolCallResult(
+            result=book
+        )
+    if idempotency_key is not None:
+        # A gateway error may come after the backend applied the create
+        if response.status_code in RETRY_STATUSES and not BACKEND_HONORS_IDEMPOTENCY_KEY:
+            idempotent_creates.outcome_unknown(idempotency_key, book_data)
+        else:
+            idempotent_creates.release(idempotency_key)
+    if response.status_code == 400:
+        return ToolCallResult(
+            result=None,
+            error=f"Bad request: {response.text}"
+        )
+    return _api_error(response)
+
+def _create_failed(idempotency_key: str, book_data: dict, error: BaseException):
+    """Release the key of a create that got no response, unless the create may have been applied"""
+    if BACKEND_HONORS_IDEMPOTENCY_KEY or _never_sent(error):
+        idempotent_creates.release(idempotency_key)
+    else:
+        idempotent_creates.outcome_unknown(idempotency_key, book_data)
+
+# Returned by _claim_create while another call is sending the create for the same key
+KEY_IN_USE = object()
+
+def _claim_create(idempotency_key: Any, book_data: dict) -> Union[ToolCallResult, object, None]:
+    """
+    Take idempotency_key for this create, or answer the call from the create it was already used for
+
+    Returns:
+        None if this call now holds the key and must send the create, KEY_IN_USE
+        while another call (in any worker, with the shared cache) is sending it,
+        or the result: the originally created book, or an error if the key is
+        invalid, was used for different book data, or was used for a create
+        whose outcome is unknown
+    """
+    if not isinstance(idempotency_key, str) or not idempotency_key:
+        return ToolCallResult(result=None, error="idempotency_key must be a non-empty string")
+    entry = idempotent_creates.claim(idempotency_key, book_data, IDEMPOTENCY_KEY_LEASE,
+                                     reclaim_unknown=BACKEND_HONORS_IDEMPOTENCY_KEY)
+    if entry is None:
+        return None
+    if entry["book_data"] != book_data:
+        return ToolCallResult(
+            result=None,
+            error=f"idempotency_key {idempotency_key!r} was already used to create a different book"
+        )
+    if entry["state"] == "created":
+        return ToolCallResult(result=entry["book"])
+    if entry["state"] == "pending":
+        return KEY_IN_USE
+    return ToolCallResult(
+        result=None,
+        error=f"An earlier create_book call with idempotency_key {idempotency_key!r} got no answer from "
+              "the Books API and may have created the book; check with search_books before creating "
+              "it again with a new key"
+    )
+
+def _get_book_result(response, book_id: int, generation: int) -> ToolCallResult:
+    if response.status_code in (200, 304):
+        book = revalidator.parse(f"/books/{book_id}", "/books/{id}", response, loads)
+        if book is None:
+            return _api_error(response)
+        book_cache.put_book(book_id, book, generation)
+        return ToolCallResult(
+            result=book
+        )
+    elif response.status_code == 404:
+        return ToolCallResult(
+            result=None,
+            error=f"Book with ID {book_id} not found"
+        )
+    return _api_error(response)
+
+def _update_book_result(response, book_id: int, book_data: dict) -> ToolCallResult:
+    if response.status_code == 204:  # NoContent
+        book_cache.book_updated(book_id)
+        book_replica.book_updated(book_id, book_data)
+        return ToolCallResult(
+            result={"message": "Book updated successfully"}
+        )
+    elif response.status_code == 400:
+        return ToolCallResult(
+            result=None,
+            error=f"Bad request: {response.text}"
+        )
+    elif response.status_code == 404:
+        return ToolCallResult(
+            result=None,
+            error=f"Book with ID {book_id} not found"
+        )
+    return _api_error(response)
+
+def _delete_book_result(response, book_id: int) -> ToolCallResult:
+    if response.status_code == 204:  # NoContent
+        book_cache.book_deleted(book_id)
+        book_replica.book_deleted(book_id)
+        revalidator.forget(f"/books/{book_id}")
+        return ToolCallResult(
+            result={"message": "Book deleted successfully"}
+        )
+    elif response.status_code == 404:
+        return ToolCallResult(
+            result=None,
+            error=f"Book with ID {book_id} not found"
+        )
+    return _api_error(response)
+
+# The shared book cache (and the idempotency keys kept with it) makes blocking
+# sqlite calls that can wait up to the busy timeout for another worker's write
+# lock. The async service makes them on this one thread instead of the event loop.
+_shared_cache_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shared-cache")
+
+async def _cache_call(call: Callable[..., Any], *args: Any) -> Any:
+    """Run a step that reads or writes the book cache: inline for the in-memory cache, off the loop for the shared one"""
+    if not isinstance(book_cache, SharedBookCache):
+        return call(*args)
+    return await asyncio.get_running_loop().run_in_executor(_shared_cache_thread, call, *args)
+
+def _cached_books() -> Tuple[Optional[List[Dict[str, Any]]], int]:
+    """The cached list_books snapshot, or None and the generation a fetch starts at"""
+    books = book_cache.get_books()
+    return books, (book_cache.generation if books is None else -1)
+
+def _cached_book(book_id: int) -> Tuple[Optional[Dict[str, Any]], int]:
+    """The cached book, or None and the generation a fetch starts at"""
+    book = book_cache.get_book(book_id)
+    return book, (book_cache.generation if book is None else -1)
+
+async def _send_pending_write(book_id: int, entry: PendingWrite) -> Optional[str]:
+    """Send one book's coalesced write-behind writes to the Books API; returns an error message or None"""
+    path = f"/books/{book_id}"
+    if entry.deleted:
+        result = await _cache_call(_delete_book_result, await _async_request("DELETE", path), book_id)
+        if result.error is not None:
+            return result.error
+    if entry.create is not None:
+        result = await _cache_call(_create_book_result, await _async_request("POST", "/books", entry.create))
+    elif entry.update is not None:
+        result = await _cache_call(_update_book_result, await _async_request("PUT", path, entry.update),
+                                   book_id, entry.update)
+    else:
+        return None
+    return result.error
+
+write_behind.bind(_send_pending_write)
+
+def _with_pending_writes(book_id: int, book: Optional[Dict[str, Any]]) -> ToolCallResult:
+    """Apply the queued write-behind writes to a book read from the cache or Books API"""
+    book = write_behind.overlay_book(book_id, book)
+    if book is None:
+        return ToolCallResult(result=None, error=f"Book with ID {book_id} not found")
+    return ToolCallResult(result=book)
+
+def _page_books(books: List[Dict[str, Any]], limit: Optional[int], offset: Optional[int],
+                fields: Optional[List[str]]) -> Any:
+    """
+    Apply list_books pagination and field projection to the full book list
+
+    This runs on the parsed (or cached) list before any ToolCallResult or
+    response is built, so unwanted books and fields are never serialized.
+
+    Returns:
+        The list unchanged when no options are given, a projected list when
+        only fields is given, otherwise a page envelope with books, total,
+        offset, limit and next_offset (None on the last page)
+    """
+    if limit is None and not offset and not fields:
+        return books
+
+    total = len(books)
+    start = max(0, int(offset or 0))
+    end = total if limit is None else start + max(0, int(limit))
+    # A page is small, so a view of a compact catalog is materialized here
+    page = books[start:end]
+    if not isinstance(page, list):
+        page = list(page)
+
+    if fields:
+        keys = ["id"] + [field for field in fields if field != "id"]
+        page = [{key: book[key] for key in keys if key in book} for book in page]
+
+    if limit is None and not offset:
+        return page
+    next_offset = start + len(page)
+    return {
+        "books": page,
+        "total": total,
+        "offset": start,
+        "limit": limit,
+        "next_offset": next_offset if next_offset < total else None
+    }
+
+def _validate_book_data(book_data: Any, creating: bool) -> Optional[str]:
+    """
+    Check a book payload locally before it is sent to the Books API
+
+    Args:
+        book_data: The book object from a tool call
+        creating: Whether title and author are required
+
+    Returns:
+        An error message, or None if the payload looks valid
+    """
+    if not isinstance(book_data, dict):
+        return "book_data must be an object"
+    if creating:
+        for field in ("title", "author"):
+            if not isinstance(book_data.get(field), str) or not book_data[field].strip():
+                return f"{field} is required"
+    for field in ("title", "author", "isbn"):
+        if book_data.get(field) is not None and not isinstance(book_data[field], str):
+            return f"{field} must be a string"
+    book_id = book_data.get("id")
+    if book_id is not None and (not isinstance(book_id, int) or isinstance(book_id, bool)):
+        return "id must be an integer"
+    published_date = book_data.get("publishedDate")
+    if published_date is not None:
+        try:
+            if not published_date.endswith("Z"):
+                raise ValueError
+            datetime.fromisoformat(published_date[:-1])
+        except (AttributeError, ValueError):
+            return "publishedDate must be in ISO 8601 UTC format ending with 'Z' (e.g., '2024-04-11T00:00:00Z')"
+    return None
+
+def _parse_book_id(book_id: Any) -> Tuple[Optional[str], Optional[int]]:
+    if isinstance(book_id, bool):
+        return "book_id must be an integer", None
+    try:
+        return None, int(book_id)
+    except (TypeError, ValueError):
+        return "book_id must be an integer", None
+
+# Each bulk "prepare" function turns one input item into (error, args for the single-item method)
+
+def _prepare_create(book_data: Any) -> Tuple[Optional[str], tuple]:
+    return _validate_book_data(book_data, creating=True), (book_data,)
+
+def _prepare_book_id(book_id: Any) -> Tuple[Optional[str], tuple]:
+    error, book_id = _parse_book_id(book_id)
+    return error, (book_id,)
+
+def _prepare_update(item: Any) -> Tuple[Optional[str], tuple]:
+    if not isinstance(item, dict):
+        return "each update must be an object with book_id and book_data", ()
+    error, book_id = _parse_book_id(item.get("book_id"))
+    book_data = item.get("book_data")
+    error = error or _validate_book_data(book_data, creating=False)
+    return error, (book_id, dict(book_data) if error is None else None)
+
+def _check_bulk_items(items: Any, name: str) -> Optional[ToolCallResult]:
+    """Validate the shape of a bulk input once, before any item is processed"""
+    if not isinstance(items, list):
+        return ToolCallResult(result=None, error=f"{name} must be an array")
+    max_items = get_bulk_max_items()
+    if len(items) > max_items:
+        return ToolCallResult(result=None, error=f"{name} has {len(items)} items; the maximum is {max_items}")
+    return None
+
+def _bulk_result(results: List[ToolCallResult]) -> ToolCallResult:
+    failed = sum(1 for result in results if result.error is not None)
+    return ToolCallResult(
+        result={
+            "results": [{"result": result.result, "error": result.error} for result in results],
+            "succeeded": len(results) - failed,
+            "failed": failed
+        }
+    )
+
+def _run_bulk(items: List[Any], prepare: Callable, call: Callable[..., ToolCallResult]) -> ToolCallResult:
+    """Run a single-item BookService method for every item on a bounded thread pool"""
+    def run_one(item: Any) -> ToolCallResult:
+        error, args = prepare(item)
+        if error is not None:
+            return ToolCallResult(result=None, error=error)
+        return call(*args)
+
+    if not items:
+        return _bulk_result([])
+    with ThreadPoolExecutor(max_workers=min(get_bulk_concurrency(), len(items))) as pool:
+        return _bulk_result(list(pool.map(run_one, items)))
+
+async def _run_bulk_async(items: List[Any], prepare: Callable, call: Callable[..., Any]) -> ToolCallResult:
+    """Run a single-item AsyncBookService method for every item with bounded concurrency"""
+    semaphore = asyncio.Semaphore(get_bulk_concurrency())
+
+    async def run_one(item: Any) -> ToolCallResult:
+        error, args = prepare(item)
+        if error is not None:
+            return ToolCallResult(result=None, error=error)
+        async with semaphore:
+            return await call(*args)
+
+    return _bulk_result(list(await asyncio.gather(*(run_one(item) for item in items))))
+
+class BookStream:
+    """
+    A list_books result whose JSON body is read incrementally from the Books API
+
+    Raw newlines can only appear between tokens in a JSON document, so they
+    are dropped to keep the body on a single NDJSON line or SSE data field.
+    """
+
+    def __init__(self, response: aiohttp.ClientResponse):
+        self.response = response
+
+    async def iter_json(self) -> AsyncIterator[bytes]:
+        """Yield the body in chunks as it arrives, closing the response at the end"""
+        try:
+            async for chunk in self.response.content.iter_any():
+                yield chunk.replace(b"\n", b"").replace(b"\r", b"")
+        finally:
+            await self.aclose()
+
+    async def aclose(self):
+        self.response.release()
+
+def _search_error(e: Exception) -> ToolCallResult:
+    return ToolCallResult(
+        result=None,
+        error=f"Error searching books: {str(e)}"
+    )
 
 class BookService:
 
     @staticmethod
-    def list_books() -> ToolCallResult:
+    def _fetch_books(generation: int) -> ToolCallResult:
+        # Make API request to the Books API
+        response = _sync_request("GET", "/books", headers=revalidator.request_headers("/books"))
+        return _list_books_result(response, generation)
+
+    @staticmethod
+    def _fetch_book(book_id: int, generation: int) -> ToolCallResult:
+        # Make API request to the Books API
+        path = f"/books/{book_id}"
+        response = _sync_request("GET", path, headers=revalidator.request_headers(path))
+        return _get_book_result(response, book_id, generation)
+
+    @staticmethod
+    def list_books(limit: Optional[int] = None, offset: int = 0,
+                   fields: Optional[List[str]] = None) -> ToolCallResult:
         """
         Retrieve all books from the Books API
-        
+
+        Args:
+            limit: Maximum number of books to return (returns a page envelope)
+            offset: Number of books to skip (returns a page envelope)
+            fields: Book fields to include; id is always included
+
         Returns:
-            ToolCallResult with the list of books or an error message
+            ToolCallResult with the list (or page) of books or an error message
         """
         try:
-            # Make API request to the Books API
-            response = requests.get(f"{BOOKS_API_URL}/books")
-            
-            # Handle different response statuses
-            if response.status_code == 200:
-                return ToolCallResult(
-                    result=response.json()
-                )
-            else:
-                return ToolCallResult(
-                    result=None,
-                    error=f"API Error: {response.status_code} - {response.text}"
-                )
-                
-        except requests.RequestException as e:
+            books = book_cache.get_books()
+            if books is None:
+                generation = book_cache.generation
+                result = sync_flight.do(("list_books", generation), BookService._fetch_books, generation)
+                if result.error is not None:
+                    return result
+                books = result.result
             return ToolCallResult(
-                result=None,
-                error=f"Failed to connect to Books API: {str(e)}"
+                result=_page_books(books, limit, offset, fields)
             )
+
+        except sync_request_errors() as e:
+            return _stale_books(limit, offset, fields) or _connection_error(e)
         except Exception as e:
             return ToolCallResult(
                 result=None,
@@ -42,46 +794,46 @@ class BookService:
             )
 
     @staticmethod
-    def create_book(book_data: dict) -> ToolCallResult:
+    def _create_book(book_data: dict, idempotency_key: Optional[str]) -> ToolCallResult:
+        # Make API request to the Books API
+        # The API expects POST to /books with book data in the body
+        try:
+            response = _sync_request("POST", "/books", book_data, idempotency_key)
+        except BaseException as e:
+            if idempotency_key is not None:
+                _create_failed(idempotency_key, book_data, e)
+            raise
+        return _create_book_result(response, book_data, idempotency_key)
+
+    @staticmethod
+    def create_book(book_data: dict, idempotency_key: Optional[str] = None) -> ToolCallResult:
         """
         Create a new book by calling the Books API
-        
+
         Args:
             book_data: Dictionary containing book details (id, title, author, isbn, publishedDate)
                 - publishedDate must be in ISO 8601 UTC format ending with 'Z' (e.g., '2024-04-11T00:00:00Z')
-            
+            idempotency_key: Client-chosen key for this create. Repeating the call with the
+                same key returns the book created the first time instead of creating another
+                one. The request is retried when it could not reach the Books API, and on
+                any transient failure if BOOKS_API_HONORS_IDEMPOTENCY_KEY is set.
+
         Returns:
             ToolCallResult with the created book or an error message
         """
         try:
-            # Make API request to the Books API
-            # The API expects POST to /books with book data in the body
-            response = requests.post(
-                f"{BOOKS_API_URL}/books",
-                json=book_data
-            )
-            
-            # Handle different response statuses
-            if response.status_code == 201:  # Created
-                return ToolCallResult(
-                    result=response.json()
-                )
-            elif response.status_code == 400:
-                return ToolCallResult(
-                    result=None,
-                    error=f"Bad request: {response.text}"
-                )
-            else:
-                return ToolCallResult(
-                    result=None,
-                    error=f"API Error: {response.status_code} - {response.text}"
-                )
-                
-        except requests.RequestException as e:
-            return ToolCallResult(
-                result=None,
-                error=f"Failed to connect to Books API: {str(e)}"
-            )
+            if idempotency_key is None:
+                return BookService._create_book(book_data, None)
+            claim = _claim_create(idempotency_key, book_data)
+            while claim is KEY_IN_USE:
+                time.sleep(IDEMPOTENCY_KEY_POLL_INTERVAL)
+                claim = _claim_create(idempotency_key, book_data)
+            if claim is not None:
+                return claim
+            return BookService._create_book(book_data, idempotency_key)
+
+        except sync_request_errors() as e:
+            return _connection_error(e)
         except Exception as e:
             return ToolCallResult(
                 result=None,
@@ -92,40 +844,24 @@ class BookService:
     def get_book(book_id: int) -> ToolCallResult:
         """
         Retrieve a book by ID from the Books API
-        
+
         Args:
             book_id: ID of the book to retrieve
-            
+
         Returns:
             ToolCallResult with the book data or an error message
         """
         try:
             book_id = int(book_id)
-            
-            # Make API request to the Books API
-            response = requests.get(f"{BOOKS_API_URL}/books/{book_id}")
-            
-            # Handle different response statuses
-            if response.status_code == 200:
-                return ToolCallResult(
-                    result=response.json()
-                )
-            elif response.status_code == 404:
-                return ToolCallResult(
-                    result=None,
-                    error=f"Book with ID {book_id} not found"
-                )
-            else:
-                return ToolCallResult(
-                    result=None,
-                    error=f"API Error: {response.status_code} - {response.text}"
-                )
-                
-        except requests.RequestException as e:
-            return ToolCallResult(
-                result=None,
-                error=f"Failed to connect to Books API: {str(e)}"
-            )
+
+            cached = book_cache.get_book(book_id)
+            if cached is not None:
+                return ToolCallResult(result=cached)
+            generation = book_cache.generation
+            return sync_flight.do(("get_book", book_id, generation), BookService._fetch_book, book_id, generation)
+
+        except sync_request_errors() as e:
+            return _stale_book(book_id) or _connection_error(e)
         except Exception as e:
             return ToolCallResult(
                 result=None,
@@ -136,53 +872,27 @@ class BookService:
     def update_book(book_id: int, book_data: dict) -> ToolCallResult:
         """
         Update an existing book via the Books API
-        
+
         Args:
             book_id: ID of the book to update
             book_data: Dictionary containing updated book details (must include id matching book_id)
                 - publishedDate must be in ISO 8601 UTC format ending with 'Z' (e.g., '2024-04-11T00:00:00Z')
-            
+
         Returns:
             ToolCallResult with the updated book or an error message
         """
         try:
             book_id = int(book_id)
-            
+
             # Ensure book_data has the correct id
             book_data["id"] = book_id
-            
+
             # Make API request to the Books API using PUT method
-            response = requests.put(
-                f"{BOOKS_API_URL}/books/{book_id}",
-                json=book_data
-            )
-            
-            # Handle different response statuses
-            if response.status_code == 204:  # NoContent
-                return ToolCallResult(
-                    result={"message": "Book updated successfully"}
-                )
-            elif response.status_code == 400:
-                return ToolCallResult(
-                    result=None,
-                    error=f"Bad request: {response.text}"
-                )
-            elif response.status_code == 404:
-                return ToolCallResult(
-                    result=None,
-                    error=f"Book with ID {book_id} not found"
-                )
-            else:
-                return ToolCallResult(
-                    result=None,
-                    error=f"API Error: {response.status_code} - {response.text}"
-                )
-                
-        except requests.RequestException as e:
-            return ToolCallResult(
-                result=None,
-                error=f"Failed to connect to Books API: {str(e)}"
-            )
+            response = _sync_request("PUT", f"/books/{book_id}", book_data)
+            return _update_book_result(response, book_id, book_data)
+
+        except sync_request_errors() as e:
+            return _connection_error(e)
         except Exception as e:
             return ToolCallResult(
                 result=None,
@@ -193,42 +903,517 @@ class BookService:
     def delete_book(book_id: int) -> ToolCallResult:
         """
         Delete a book by ID via the Books API
-        
+
         Args:
             book_id: ID of the book to delete
-            
+
         Returns:
             ToolCallResult with the deleted book or an error message
         """
         try:
             book_id = int(book_id)
-            
+
             # Make API request to the Books API
-            response = requests.delete(f"{BOOKS_API_URL}/books/{book_id}")
-            
-            # Handle different response statuses
-            if response.status_code == 204:  # NoContent
-                return ToolCallResult(
-                    result={"message": "Book deleted successfully"}
-                )
-            elif response.status_code == 404:
-                return ToolCallResult(
-                    result=None,
-                    error=f"Book with ID {book_id} not found"
-                )
-            else:
-                return ToolCallResult(
-                    result=None,
-                    error=f"API Error: {response.status_code} - {response.text}"
-                )
-                
-        except requests.RequestException as e:
+            response = _sync_request("DELETE", f"/books/{book_id}")
+            return _delete_book_result(response, book_id)
+
+        except sync_request_errors() as e:
+            return _connection_error(e)
+        except Exception as e:
             return ToolCallResult(
                 result=None,
-                error=f"Failed to connect to Books API: {str(e)}"
+                error=f"Error deleting book: {str(e)}"
+            )
+
+    @staticmethod
+    def create_books(books: List[dict]) -> ToolCallResult:
+        """
+        Create many books, calling the Books API concurrently
+
+        Args:
+            books: List of book_data objects as accepted by create_book
+
+        Returns:
+            ToolCallResult with per-item results and errors plus succeeded/failed counts
+        """
+        return _check_bulk_items(books, "books") or _run_bulk(books, _prepare_create, BookService.create_book)
+
+    @staticmethod
+    def get_books(book_ids: List[int]) -> ToolCallResult:
+        """
+        Retrieve many books by ID
+
+        Args:
+            book_ids: IDs of the books to retrieve
+
+        Returns:
+            ToolCallResult with per-item results and errors plus succeeded/failed counts
+        """
+        return _check_bulk_items(book_ids, "book_ids") or _run_bulk(book_ids, _prepare_book_id, BookService.get_book)
+
+    @staticmethod
+    def update_books(updates: List[dict]) -> ToolCallResult:
+        """
+        Update many books
+
+        Args:
+            updates: List of {"book_id": ..., "book_data": {...}} objects
+
+        Returns:
+            ToolCallResult with per-item results and errors plus succeeded/failed counts
+        """
+        return _check_bulk_items(updates, "updates") or _run_bulk(updates, _prepare_update, BookService.update_book)
+
+    @staticmethod
+    def delete_books(book_ids: List[int]) -> ToolCallResult:
+        """
+        Delete many books by ID
+
+        Args:
+            book_ids: IDs of the books to delete
+
+        Returns:
+            ToolCallResult with per-item results and errors plus succeeded/failed counts
+        """
+        return _check_bulk_items(book_ids, "book_ids") or _run_bulk(book_ids, _prepare_book_id, BookService.delete_book)
+
+    @staticmethod
+    def refresh_replica(force: bool = False) -> Optional[ToolCallResult]:
+        """
+        Reload the catalog replica from the Books API when it is stale
+
+        Args:
+            force: Reload even if the replica is still fresh
+
+        Returns:
+            An error ToolCallResult if the replica has no data and could not be loaded, otherwise None
+        """
+        if not force and not book_replica.is_stale():
+            return None
+        generation = book_replica.generation
+        result = BookService.list_books()
+        if result.error is not None:
+            # Keep answering from the previous snapshot if there is one
+            return None if book_replica.loaded_at is not None else result
+        book_replica.load(result.result, generation)
+        return None
+
+    @staticmethod
+    def search_books(query: Optional[str] = None, author: Optional[str] = None, isbn: Optional[str] = None,
+                     published_after: Optional[str] = None, published_before: Optional[str] = None,
+                     limit: int = 50) -> ToolCallResult:
+        """
+        Search the local catalog replica
+
+        Args:
+            query: Words that must all appear in the title
+            author: Author name
+            isbn: ISBN with or without hyphens
+            published_after: Earliest publication date, inclusive (ISO 8601)
+            published_before: Latest publication date, inclusive (ISO 8601)
+            limit: Maximum number of books to return
+
+        Returns:
+            ToolCallResult with the matching books or an error message
+        """
+        try:
+            error = BookService.refresh_replica()
+            if error is not None:
+                return error
+            return ToolCallResult(
+                result=book_replica.search(query, author, isbn, published_after, published_before, limit)
             )
+        except Exception as e:
+            return _search_error(e)
+
+    @staticmethod
+    def find_books_by_author(author: str, limit: int = 50) -> ToolCallResult:
+        """
+        Find books by author in the local catalog replica
+
+        Args:
+            author: Author name (case and punctuation insensitive)
+            limit: Maximum number of books to return
+
+        Returns:
+            ToolCallResult with the author's books or an error message
+        """
+        return BookService.search_books(author=author, limit=limit)
+
+    @staticmethod
+    def flush_writes(wait: bool = True) -> ToolCallResult:
+        """
+        Report the write-behind queue, first waiting for queued writes to reach the Books API
+
+        Writes are only queued by AsyncBookService; this waits on its event loop.
+
+        Returns:
+            ToolCallResult with pending, flushed and failed write counts and recent failures
+        """
+        try:
+            if wait:
+                write_behind.flush_blocking()
+            return ToolCallResult(result=write_behind.stats())
+        except Exception as e:
+            return ToolCallResult(result=None, error=f"Error flushing writes: {str(e)}")
+
+class AsyncBookService:
+    """Async counterpart of BookService backed by the shared aiohttp.ClientSession"""
+
+    @staticmethod
+    async def _fetch_books(generation: int) -> ToolCallResult:
+        response = await _async_request("GET", "/books", headers=revalidator.request_headers("/books"))
+        return await _cache_call(_list_books_result, response, generation)
+
+    @staticmethod
+    async def _fetch_book(book_id: int, generation: int) -> ToolCallResult:
+        path = f"/books/{book_id}"
+        response = await _async_request("GET", path, headers=revalidator.request_headers(path))
+        return await _cache_call(_get_book_result, response, book_id, generation)
+
+    @staticmethod
+    async def list_books(limit: Optional[int] = None, offset: int = 0,
+                         fields: Optional[List[str]] = None) -> ToolCallResult:
+        """
+        Retrieve all books from the Books API
+
+        Args:
+            limit: Maximum number of books to return (returns a page envelope)
+            offset: Number of books to skip (returns a page envelope)
+            fields: Book fields to include; id is always included
+
+        Returns:
+            ToolCallResult with the list (or page) of books or an error message
+        """
+        try:
+            books, generation = await _cache_call(_cached_books)
+            if books is None:
+                result = await async_flight.do(("list_books", generation), AsyncBookService._fetch_books, generation)
+                if result.error is not None:
+                    return result
+                books = result.result
+            return ToolCallResult(
+                result=_page_books(write_behind.overlay_books(books), limit, offset, fields)
+            )
+
+        except ASYNC_REQUEST_ERRORS as e:
+            return await _cache_call(_stale_books, limit, offset, fields) or _connection_error(e)
+        except Exception as e:
+            return ToolCallResult(
+                result=None,
+                error=f"Error retrieving books: {str(e)}"
+            )
+
+    @staticmethod
+    async def stream_books(limit: Optional[int] = None, offset: int = 0,
+                           fields: Optional[List[str]] = None) -> Union[ToolCallResult, BookStream]:
+        """
+        Retrieve all books, streaming the Books API response body instead of buffering it
+
+        Paged or projected requests, cache hits and reads that must include
+        queued writes need the parsed list, so they are answered like list_books.
+
+        Returns:
+            A BookStream for a full catalog read, otherwise a ToolCallResult
+        """
+        try:
+            if limit is not None or offset or fields or write_behind.has_writes():
+                return await AsyncBookService.list_books(limit, offset, fields)
+            cached, generation = await _cache_call(_cached_books)
+            if cached is not None:
+                return ToolCallResult(result=cached)
+
+            response = await _open_books_stream()
+            if response.status == 200:
+                return BookStream(response)
+            async with response:
+                buffered = BufferedResponse(response.status, await response.read(), response.headers)
+            return await _cache_call(_list_books_result, buffered, generation)
+
+        except ASYNC_REQUEST_ERRORS as e:
+            return await _cache_call(_stale_books, limit, offset, fields) or _connection_error(e)
+        except Exception as e:
+            return ToolCallResult(
+                result=None,
+                error=f"Error retrieving books: {str(e)}"
+            )
+
+    @staticmethod
+    async def _create_book(book_data: dict, idempotency_key: Optional[str]) -> ToolCallResult:
+        try:
+            response = await _async_request("POST", "/books", book_data, idempotency_key)
+        except BaseException as e:
+            if idempotency_key is not None:
+                await _cache_call(_create_failed, idempotency_key, book_data, e)
+            raise
+        return await _cache_call(_create_book_result, response, book_data, idempotency_key)
+
+    @staticmethod
+    async def create_book(book_data: dict, idempotency_key: Optional[str] = None) -> ToolCallResult:
+        """
+        Create a new book by calling the Books API
+
+        Args:
+            book_data: Dictionary containing book details (id, title, author, isbn, publishedDate)
+            idempotency_key: Client-chosen key for this create; see BookService.create_book
+
+        Returns:
+            ToolCallResult with the created book or an error message. In write-behind
+            mode a book with an id and no idempotency_key is queued and returned as given.
+        """
+        try:
+            if write_behind.enabled and idempotency_key is None and isinstance(book_data, dict) \
+                    and book_data.get("id") is not None:
+                return await AsyncBookService._queue_create(book_data)
+            if idempotency_key is None:
+                return await AsyncBookService._create_book(book_data, None)
+            claim = await _cache_call(_claim_create, idempotency_key, book_data)
+            while claim is KEY_IN_USE:
+                await asyncio.sleep(IDEMPOTENCY_KEY_POLL_INTERVAL)
+                claim = await _cache_call(_claim_create, idempotency_key, book_data)
+            if claim is not None:
+                return claim
+            return await AsyncBookService._create_book(book_data, idempotency_key)
+
+        except ASYNC_REQUEST_ERRORS as e:
+            return _connection_error(e)
+        except Exception as e:
+            return ToolCallResult(
+                result=None,
+                error=f"Error creating book: {str(e)}"
+            )
+
+    @staticmethod
+    async def _queue_create(book_data: dict) -> ToolCallResult:
+        error = _validate_book_data(book_data, creating=True)
+        if error is None and (await _cache_call(_cached_book, book_data["id"]))[0] is not None:
+            error = f"Book with ID {book_data['id']} already exists"
+        if error is None:
+            error = await write_behind.create(book_data["id"], book_data)
+        if error is not None:
+            return ToolCallResult(result=None, error=error)
+        return ToolCallResult(result={**book_data})
+
+    @staticmethod
+    async def _read_book(book_id: int) -> ToolCallResult:
+        cached, generation = await _cache_call(_cached_book, book_id)
+        if cached is not None:
+            return ToolCallResult(result=cached)
+        return await async_flight.do(("get_book", book_id, generation), AsyncBookService._fetch_book, book_id, generation)
+
+    @staticmethod
+    async def get_book(book_id: int) -> ToolCallResult:
+        """
+        Retrieve a book by ID from the Books API
+
+        Args:
+            book_id: ID of the book to retrieve
+
+        Returns:
+            ToolCallResult with the book data or an error message
+        """
+        try:
+            book_id = int(book_id)
+
+            if not write_behind.has_writes(book_id):
+                return await AsyncBookService._read_book(book_id)
+            if write_behind.replaces(book_id):
+                return _with_pending_writes(book_id, None)
+            result = await AsyncBookService._read_book(book_id)
+            return result if result.error is not None else _with_pending_writes(book_id, result.result)
+
+        except ASYNC_REQUEST_ERRORS as e:
+            return await _cache_call(_stale_book, book_id) or _connection_error(e)
+        except Exception as e:
+            return ToolCallResult(
+                result=None,
+                error=f"Error retrieving book: {str(e)}"
+            )
+
+    @staticmethod
+    async def update_book(book_id: int, book_data: dict) -> ToolCallResult:
+        """
+        Update an existing book via the Books API
+
+        Args:
+            book_id: ID of the book to update
+            book_data: Dictionary containing updated book details (must include id matching book_id)
+
+        Returns:
+            ToolCallResult with the updated book or an error message
+        """
+        try:
+            book_id = int(book_id)
+            if write_behind.enabled:
+                error = _validate_book_data(book_data, creating=False) or await write_behind.update(book_id, book_data)
+                if error is not None:
+                    return ToolCallResult(result=None, error=error)
+                return ToolCallResult(result={"message": "Book update queued"})
+            book_data["id"] = book_id
+            response = await _async_request("PUT", f"/books/{book_id}", book_data)
+            return await _cache_call(_update_book_result, response, book_id, book_data)
+
+        except ASYNC_REQUEST_ERRORS as e:
+            return _connection_error(e)
+        except Exception as e:
+            return ToolCallResult(
+                result=None,
+                error=f"Error updating book: {str(e)}"
+            )
+
+    @staticmethod
+    async def delete_book(book_id: int) -> ToolCallResult:
+        """
+        Delete a book by ID via the Books API
+
+        Args:
+            book_id: ID of the book to delete
+
+        Returns:
+            ToolCallResult with the deleted book or an error message
+        """
+        try:
+            book_id = int(book_id)
+            if write_behind.enabled:
+                error = await write_behind.delete(book_id)
+                if error is not None:
+                    return ToolCallResult(result=None, error=error)
+                return ToolCallResult(result={"message": "Book delete queued"})
+            response = await _async_request("DELETE", f"/books/{book_id}")
+            return await _cache_call(_delete_book_result, response, book_id)
+
+        except ASYNC_REQUEST_ERRORS as e:
+            return _connection_error(e)
         except Exception as e:
             return ToolCallResult(
                 result=None,
                 error=f"Error deleting book: {str(e)}"
-            )
\ No newline at end of file
+            )
+
+    @staticmethod
+    async def create_books(books: List[dict]) -> ToolCallResult:
+        """
+        Create many books, calling the Books API concurrently
+
+        Returns:
+            ToolCallResult with per-item results and errors plus succeeded/failed counts
+        """
+        return _check_bulk_items(books, "books") or \
+            await _run_bulk_async(books, _prepare_create, AsyncBookService.create_book)
+
+    @staticmethod
+    async def get_books(book_ids: List[int]) -> ToolCallResult:
+        """
+        Retrieve many books by ID
+
+        Returns:
+            ToolCallResult with per-item results and errors plus succeeded/failed counts
+        """
+        return _check_bulk_items(book_ids, "book_ids") or \
+            await _run_bulk_async(book_ids, _prepare_book_id, AsyncBookService.get_book)
+
+    @staticmethod
+    async def update_books(updates: List[dict]) -> ToolCallResult:
+        """
+        Update many books
+
+        Returns:
+            ToolCallResult with per-item results and errors plus succeeded/failed counts
+        """
+        return _check_bulk_items(updates, "updates") or \
+            await _run_bulk_async(updates, _prepare_update, AsyncBookService.update_book)
+
+    @staticmethod
+    async def delete_books(book_ids: List[int]) -> ToolCallResult:
+        """
+        Delete many books by ID
+
+        Returns:
+            ToolCallResult with per-item results and errors plus succeeded/failed counts
+        """
+        return _check_bulk_items(book_ids, "book_ids") or \
+            await _run_bulk_async(book_ids, _prepare_book_id, AsyncBookService.delete_book)
+
+    @staticmethod
+    async def refresh_replica(force: bool = False) -> Optional[ToolCallResult]:
+        """
+        Reload the catalog replica from the Books API when it is stale
+
+        Args:
+            force: Reload even if the replica is still fresh
+
+        Returns:
+            An error ToolCallResult if the replica has no data and could not be loaded, otherwise None
+        """
+        if not force and not book_replica.is_stale():
+            return None
+        generation = book_replica.generation
+        result = await AsyncBookService.list_books()
+        if result.error is not None:
+            return None if book_replica.loaded_at is not None else result
+        # Concurrent callers share one fetch; only the first needs to rebuild the indexes
+        if force or book_replica.is_stale():
+            # Building the indexes takes a while for a large catalog; keep it off the event loop
+            staged = await asyncio.get_running_loop().run_in_executor(None, BookReplica.build, result.result)
+            book_replica.install(staged, generation)
+        return None
+
+    @staticmethod
+    async def search_books(query: Optional[str] = None, author: Optional[str] = None, isbn: Optional[str] = None,
+                           published_after: Optional[str] = None, published_before: Optional[str] = None,
+                           limit: int = 50) -> ToolCallResult:
+        """
+        Search the local catalog replica
+
+        Returns:
+            ToolCallResult with the matching books or an error message
+        """
+        try:
+            # The replica only learns about writes once they are sent
+            if write_behind.has_writes():
+                await write_behind.flush()
+            error = await AsyncBookService.refresh_replica()
+            if error is not None:
+                return error
+            return ToolCallResult(
+                result=book_replica.search(query, author, isbn, published_after, published_before, limit)
+            )
+        except Exception as e:
+            return _search_error(e)
+
+    @staticmethod
+    async def find_books_by_author(author: str, limit: int = 50) -> ToolCallResult:
+        """
+        Find books by author in the local catalog replica
+
+        Returns:
+            ToolCallResult with the author's books or an error message
+        """
+        return await AsyncBookService.search_books(author=author, limit=limit)
+
+    @staticmethod
+    async def flush_writes(wait: bool = True) -> ToolCallResult:
+        """
+        Report the write-behind queue, first waiting for queued writes to reach the Books API
+
+        Args:
+            wait: Wait for every write queued so far to be sent before reporting
+
+        Returns:
+            ToolCallResult with pending, flushed and failed write counts and recent failures
+        """
+        try:
+            if wait:
+                await write_behind.flush()
+            return ToolCallResult(result=write_behind.stats())
+        except Exception as e:
+            return ToolCallResult(result=None, error=f"Error flushing writes: {str(e)}")
+
+async def refresh_replica_periodically():
+    """Keep the catalog replica warm so search tools never wait on a reload"""
+    while True:
+        try:
+            await AsyncBookService.refresh_replica(force=True)
+        except Exception as e:
+            print(f"Catalog replica refresh failed: {str(e)}")
+        await asyncio.sleep(book_replica.refresh_interval)
\ No newline at end of file
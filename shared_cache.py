@@ -0,0 +1,288 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional
+
+from catalog import CatalogView, loads_catalog
+from serialization import dumps, loads, loads_list, JSONList
+
+class SharedStore:
+    """
+    A SQLite database shared by every worker process on the host
+
+    Each thread gets its own connection. The database is only a cache, so
+    durability is traded for speed: WAL journaling with synchronous=OFF, and
+    the file is normally placed on tmpfs (/dev/shm).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self.transaction() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (id INTEGER PRIMARY KEY CHECK (id = 0), generation INTEGER)")
+            conn.execute("INSERT OR IGNORE INTO meta (id, generation) VALUES (0, 0)")
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run statements atomically, holding the database write lock across processes"""
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @property
+    def generation(self) -> int:
+        return self.connection().execute("SELECT generation FROM meta").fetchone()[0]
+
+    def bump_generation(self, conn: sqlite3.Connection):
+        conn.execute("UPDATE meta SET generation = generation + 1")
+
+class SharedTTLCache:
+    """
+    TTLCache counterpart stored in one table of a SharedStore
+
+    Entries are evicted oldest-expiry first rather than least recently used,
+    since recording every read would need the cross-process write lock.
+    With memoize=True each process keeps the decoded value of the entries it
+    has read and reuses it while the stored version is unchanged, so large
+    values such as the list_books snapshot are not decoded on every hit.
+    """
+
+    # Inserts between checks of the table size
+    TRIM_INTERVAL = 64
+
+    def __init__(self, store: SharedStore, table: str, max_size: int, ttl: float,
+                 encode: Callable[[Any], bytes] = dumps, decode: Callable[[bytes], Any] = loads,
+                 memoize: bool = False):
+        self.store = store
+        self.table = table
+        self.max_size = max_size
+        self.ttl = ttl
+        self.encode = encode
+        self.decode = decode
+        self.memoize = memoize
+        self._memo: Dict[Hashable, tuple] = {}
+        self._inserts = 0
+        # Counters are per process
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_hits = 0
+        with store.transaction() as conn:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {table} "
+                         "(key PRIMARY KEY, value BLOB, expires_at REAL, version INTEGER)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_expires_at ON {table} (expires_at)")
+
+    def _load(self, key: Hashable, fresh_only: bool) -> Optional[Any]:
+        conn = self.store.connection()
+        if not self.memoize:
+            row = conn.execute(f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if fresh_only and row[1] <= time.time():
+                return _EXPIRED
+            return self.decode(row[0])
+        row = conn.execute(f"SELECT version, expires_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        version, expires_at = row
+        if fresh_only and expires_at <= time.time():
+            return _EXPIRED
+        memo = self._memo.get(key)
+        if memo is not None and memo[0] == version:
+            return memo[1]
+        row = conn.execute(f"SELECT value FROM {self.table} WHERE key = ? AND version = ?", (key, version)).fetchone()
+        if row is None:
+            return None
+        value = self.decode(row[0])
+        self._memo[key] = (version, value)
+        return value
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired"""
+        value = self._load(key, fresh_only=True)
+        if value is None or value is _EXPIRED:
+            if value is _EXPIRED:
+                self.expirations += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def get_stale(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key even if it has expired, or None if missing"""
+        value = self._load(key, fresh_only=False)
+        if value is not None:
+            self.stale_hits += 1
+        return value
+
+    def insert(self, conn: sqlite3.Connection, key: Hashable, value: Any, condition: str = "", params: tuple = ()):
+        """Store value under key with a fresh expiry, if the optional SQL condition holds"""
+        conn.execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, version) "
+            f"SELECT ?, ?, ?, ? {condition}",
+            (key, self.encode(value), time.time() + self.ttl, random.getrandbits(62)) + params
+        )
+        self._inserts += 1
+        if self._inserts % self.TRIM_INTERVAL == 0 or self.max_size <= self.TRIM_INTERVAL:
+            self._trim(conn)
+
+    def set(self, key: Hashable, value: Any):
+        """Store value under key, evicting the entries closest to expiry when full"""
+        if self.max_size <= 0:
+            return
+        self.insert(self.store.connection(), key, value)
+
+    def _trim(self, conn: sqlite3.Connection):
+        excess = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0] - self.max_size
+        if excess > 0:
+            conn.execute(f"DELETE FROM {self.table} WHERE key IN "
+                         f"(SELECT key FROM {self.table} ORDER BY expires_at LIMIT ?)", (excess,))
+            self.evictions += excess
+
+    def delete(self, key: Hashable, conn: Optional[sqlite3.Connection] = None):
+        (conn or self.store.connection()).execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def clear(self, conn: Optional[sqlite3.Connection] = None):
+        (conn or self.store.connection()).execute(f"DELETE FROM {self.table}")
+        self._memo.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": self.store.connection().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0],
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "stale_hits": self.stale_hits
+        }
+
+# Marks an entry that exists but has expired
+_EXPIRED = object()
+
+def _encode_books(books: List[Dict[str, Any]]) -> bytes:
+    if type(books) is JSONList:
+        return books.raw
+    if type(books) is CatalogView:
+        return books.to_json()
+    return dumps(books)
+
+class SharedBookCache:
+    """
+    BookCache backed by a SharedStore, so every worker process reads and
+    invalidates the same copy of each book
+
+    The write generation lives in the store: a write in any worker bumps it
+    in the same transaction that updates or drops the affected entries, and
+    reads only populate the cache if the generation they started at is still
+    current. Writes drop the list_books snapshot instead of patching it, since
+    re-encoding the whole catalog on every write would cost more than the
+    next list_books fetch.
+
+    The snapshot is stored as JSON. With compact=True each process decodes
+    it into a catalog.CatalogView rather than a JSONList of dicts.
+    """
+
+    LIST_KEY = "books"
+
+    def __init__(self, enabled: bool, max_size: int, ttl: float, list_ttl: float, path: str,
+                 compact: bool = False):
+        self.enabled = enabled
+        self.store = SharedStore(path)
+        self.books = SharedTTLCache(self.store, "books", max_size, ttl)
+        self.lists = SharedTTLCache(self.store, "lists", 1, list_ttl, encode=_encode_books,
+                                    decode=loads_catalog if compact else loads_list, memoize=True)
+
+    @property
+    def generation(self) -> int:
+        return self.store.generation
+
+    def get_book(self, book_id: int) -> Optional[Dict[str, Any]]:
+        return self.books.get(book_id) if self.enabled else None
+
+    def get_books(self) -> Optional[List[Dict[str, Any]]]:
+        return self.lists.get(self.LIST_KEY) if self.enabled else None
+
+    def get_stale_book(self, book_id: int) -> Optional[Dict[str, Any]]:
+        """A cached book even if it has expired, for use while the Books API is unavailable"""
+        return self.books.get_stale(book_id) if self.enabled else None
+
+    def get_stale_books(self) -> Optional[List[Dict[str, Any]]]:
+        """The list_books snapshot even if it has expired, for use while the Books API is unavailable"""
+        return self.lists.get_stale(self.LIST_KEY) if self.enabled else None
+
+    def put_book(self, book_id: int, book: Dict[str, Any], generation: int):
+        """Cache a book read that started at the given generation"""
+        if self.enabled and self.books.max_size > 0:
+            self.books.insert(self.store.connection(), book_id, book,
+                              "WHERE (SELECT generation FROM meta) = ?", (generation,))
+
+    def put_books(self, books: List[Dict[str, Any]], generation: int):
+        """Cache a list_books read that started at the given generation"""
+        if self.enabled:
+            self.lists.insert(self.store.connection(), self.LIST_KEY, books,
+                              "WHERE (SELECT generation FROM meta) = ?", (generation,))
+
+    def book_created(self, book: Dict[str, Any]):
+        """Record a successful create: cache the new book and drop the list snapshot"""
+        with self.store.transaction() as conn:
+            self.store.bump_generation(conn)
+            self.lists.clear(conn)
+            book_id = book.get("id") if isinstance(book, dict) else None
+            if book_id is not None and self.enabled and self.books.max_size > 0:
+                self.books.insert(conn, book_id, book)
+
+    def book_updated(self, book_id: int):
+        """Record a successful update: the backend returns no body, so drop the stale copies"""
+        with self.store.transaction() as conn:
+            self.store.bump_generation(conn)
+            self.books.delete(book_id, conn)
+            self.lists.clear(conn)
+
+    def book_deleted(self, book_id: int):
+        """Record a successful delete: drop the book and the list snapshot"""
+        with self.store.transaction() as conn:
+            self.store.bump_generation(conn)
+            self.books.delete(book_id, conn)
+            self.lists.clear(conn)
+
+    def clear(self):
+        with self.store.transaction() as conn:
+            self.store.bump_generation(conn)
+            self.books.clear(conn)
+            self.lists.clear(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "backend": "shared",
+            "path": self.store.path,
+            "books": self.books.stats(),
+            "list_books": self.lists.stats()
+        }
+
+def remove_shared_store(path: str):
+    """Delete a SharedStore's database files, e.g. before starting a new set of workers"""
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,64 @@
+from typing import AsyncIterator, Optional, Tuple, Union
+
+from models import ToolCallResult
+from services import BookStream
+from serialization import encode_result_fields
+
+# Media types that switch /tool-calls into streaming mode
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+SSE_MEDIA_TYPE = "text/event-stream"
+
+def negotiate_stream_format(accept: Optional[str]) -> Optional[str]:
+    """
+    Pick a streaming format from the Accept header
+
+    Args:
+        accept: The request's Accept header
+
+    Returns:
+        NDJSON_MEDIA_TYPE or SSE_MEDIA_TYPE, or None for a regular JSON response
+    """
+    accept = (accept or "").lower()
+    if NDJSON_MEDIA_TYPE in accept:
+        return NDJSON_MEDIA_TYPE
+    if SSE_MEDIA_TYPE in accept:
+        return SSE_MEDIA_TYPE
+    return None
+
+async def encode_stream(
+    results: AsyncIterator[Tuple[int, Union[ToolCallResult, BookStream]]],
+    media_type: str
+) -> AsyncIterator[bytes]:
+    """
+    Encode streamed tool call results as NDJSON lines or SSE events
+
+    Each result is written as {"index": ..., "result": ..., "error": ...} as
+    soon as it is available; index is the call's position in the request.
+    A BookStream is copied through chunk by chunk without being parsed.
+    SSE streams end with a "done" event.
+
+    Args:
+        results: (index, result) pairs from dispatcher.stream_tool_calls
+        media_type: NDJSON_MEDIA_TYPE or SSE_MEDIA_TYPE
+
+    Yields:
+        Encoded response body chunks
+    """
+    if media_type == SSE_MEDIA_TYPE:
+        prefix, suffix = b"event: result\ndata: ", b"\n\n"
+    else:
+        prefix, suffix = b"", b"\n"
+
+    try:
+        async for index, result in results:
+            if isinstance(result, BookStream):
+                yield prefix + b'{"index":%d,"error":null,"result":' % index
+                async for chunk in result.iter_json():
+                    yield chunk
+                yield b"}" + suffix
+            else:
+                yield prefix + b'{"index":%d,' % index + encode_result_fields(result) + b"}" + suffix
+        if media_type == SSE_MEDIA_TYPE:
+            yield b"event: done\ndata: {}\n\n"
+    finally:
+        await results.aclose()
\ No newline at end of file
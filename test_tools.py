@@ -2,8 +2,38 @@
 """Test script to verify MCP server tools"""
 
 from tools import get_tools_list, get_tool_implementations
-from services import BookService
+from services import BookService, AsyncBookService
+from models import ToolCallRequest
+from dispatcher import execute_tool_calls, validate_tool_call
+from cache import book_cache
+from replica import BookReplica, book_replica
+from circuit_breaker import backend_health
+from retry import retry_policy
+from cache import idempotent_creates, IdempotencyKeys
+from shared_cache import SharedBookCache, SharedTTLCache, remove_shared_store
+from revalidation import revalidator
+from admission import admission, Slots, AdmissionRejected
+from admission import _current_client as current_admission_client
+from write_behind import write_behind
+from balancer import backend_pool
+from catalog import CatalogView, loads_catalog
+from serialization import dumps, encode_value, msgpack
+from compression import response_compression
+from mcp_session import Session
+from benchmarks.stub_books_api import StubBooksAPI, make_book
+from benchmarks.bench_workers import free_port
+import services
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import gzip
 import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 
 def test_tool_definitions():
     """Test that all tools are properly defined"""
@@ -91,6 +121,1323 @@ def test_get_book():
         print(f"✗ Exception: {str(e)}")
         return False
 
+def test_async_client_per_loop():
+    """Test that the shared async client left behind by a finished event loop is closed"""
+    print("\n" + "=" * 60)
+    print("Testing the async client across event loops (stub Books API)")
+    print("=" * 60)
+    
+    from http_client import get_async_client
+    
+    try:
+        with StubBooksAPI(catalog_size=3) as stub:
+            async def read_book():
+                client = get_async_client()
+                async with client.get(f"{stub.url}/books/1") as response:
+                    await response.read()
+                return client
+            
+            first = asyncio.run(read_book())
+            second = asyncio.run(read_book())
+            if first is second or not first.closed or second.closed:
+                print(f"✗ Client of the finished loop was not closed (closed={first.closed})")
+                return False
+            print("✓ A new client per event loop, the previous one closed")
+            return True
+    except Exception as e:
+        print(f"✗ Exception: {str(e)}")
+        return False
+
+def test_concurrent_batch():
+    """Test that a concurrent batch keeps result order and per-book write order"""
+    print("\n" + "=" * 60)
+    print("Testing concurrent tool call batch (stub Books API)")
+    print("=" * 60)
+    
+    original_url = services.BOOKS_API_URL
+    try:
+        with StubBooksAPI(latency=0.01) as stub:
+            services.BOOKS_API_URL = stub.url
+            book_cache.clear()
+            tool_calls = [
+                ToolCallRequest(name="get_book", parameters={"book_id": i}) for i in range(1, 11)
+            ] + [
+                ToolCallRequest(name="update_book", parameters={"book_id": 5, "book_data": {"title": title}})
+                for title in ("First", "Second", "Third")
+            ]
+            results = asyncio.run(execute_tool_calls(tool_calls, concurrency=8, serialize_writes=True))
+            
+            ids = [result.result["id"] for result in results[:10]]
+            if ids != list(range(1, 11)):
+                print(f"✗ Results out of order: {ids}")
+                return False
+            if stub.books[5]["title"] != "Third":
+                print(f"✗ Writes applied out of order, final title: {stub.books[5]['title']}")
+                return False
+            print(f"✓ {len(results)} results returned in order, writes to book 5 serialized")
+            return True
+    except Exception as e:
+        print(f"✗ Exception: {str(e)}")
+        return False
+    finally:
+        services.BOOKS_API_URL = original_url
+
+def test_book_cache():
+    """Test that reads are cached and writes through BookService invalidate them"""
+    print("\n" + "=" * 60)
+    print("Testing book cache (stub Books API)")
+    print("=" * 60)
+    
+    original_url = services.BOOKS_API_URL
+    try:
+        with StubBooksAPI() as stub:
+            services.BOOKS_API_URL = stub.url
+            book_cache.clear()
+            
+            BookService.get_book(1)
+            BookService.list_books()
+            requests_before = stub.request_count
+            BookService.get_book(1)
+            BookService.list_books()
+            if stub.request_count != requests_before:
+                print("✗ Repeated reads were not served from the cache")
+                return False
+            
+            BookService.update_book(1, {"title": "Updated"})
+            BookService.delete_book(2)
+            book = BookService.get_book(1).result
+            books = BookService.list_books().result
+            if book["title"] != "Updated" or any(b["id"] == 2 for b in books):
+                print("✗ Cache served stale data after a write")
+                return False
+            print(f"✓ Cache hits and write invalidation working: {book_cache.stats()['books']}")
+            return True
+    except Exception as e:
+        print(f"✗ Exception: {str(e)}")
+        return False
+    finally:
+        services.BOOKS_API_URL = original_url
+        book_cache.clear()
+
+def test_request_coalescing():
+    """Test that identical concurrent reads share one backend request"""
+    print("\n" + "=" * 60)
+    print("Testing request coalescing (stub Books API)")
+    print("=" * 60)
+    
+    original_url = services.BOOKS_API_URL
+    cache_enabled = book_cache.enabled
+    try:
+        with StubBooksAPI(latency=0.1) as stub:
+            services.BOOKS_API_URL = stub.url
+            book_cache.enabled = False
+            with ThreadPoolExecutor(max_workers=20) as pool:
+                results = list(pool.map(lambda _: BookService.get_book(1), range(20)))
+            
+            if any(result.result["id"] != 1 for result in results):
+                print("✗ Coalesced callers received the wrong result")
+                return False
+            if stub.request_count >= len(results):
+                print(f"✗ {stub.request_count} backend requests for {len(results)} identical reads")
+                return False
+            print(f"✓ {len(results)} identical reads served by {stub.request_count} backend request(s)")
+            return True
+    except Exception as e:
+        print(f"✗ Exception: {str(e)}")
+        return False
+    finally:
+        services.BOOKS_API_URL = original_url
+        book_cache.enabled = cache_enabled
+
+def test_search_books():
+    """Test that the search tools answer from the local replica and see writes"""
+    print("\n" + "=" * 60)
+    print("Testing search_books / find_books_by_author (stub Books API)")
+    print("=" * 60)
+    
+    original_url = services.BOOKS_API_URL
+    try:
+        with StubBooksAPI(catalog_size=1000) as stub:
+            services.BOOKS_API_URL = stub.url
+            book_cache.clear()
+            book_replica.clear()
+            
+            by_author = BookService.find_books_by_author("author 7", limit=100)
+            requests_after_load = stub.request_count
+            by_title = BookService.search_books(query="Sample Book 507")
+            by_isbn = BookService.search_books(isbn="9780000000012")
+            by_date = BookService.search_books(published_after="1960-01-01", published_before="1960-12-31", limit=1000)
+            
+            if stub.request_count != requests_after_load:
+                print("✗ Searches went to the backend after the replica was loaded")
+                return False
+            if [book["id"] for book in by_author.result] != [7, 507]:
+                print(f"✗ Unexpected author matches: {by_author.result}")
+                return False
+            if [book["id"] for book in by_title.result] != [507] or [book["id"] for book in by_isbn.result] != [12]:
+                print("✗ Unexpected title or ISBN matches")
+                return False
+            if not by_date.result or any(not book["publishedDate"].startswith("1960") for book in by_date.result):
+                print("✗ Unexpected publication date matches")
+                return False
+            
+            BookService.update_book(507, {"author": "Someone Else"})
+            if [book["id"] for book in BookService.find_books_by_author("author 7").result] != [7]:
+                print("✗ Replica was not patched after an update")
+                return False
+            print(f"✓ Searches served from a {len(book_replica.books)}-book replica, writes applied")
+            
+            # The async refresh builds the indexes in a worker thread and drops the
+            # snapshot if a write lands while it is being built
+            build = BookReplica.build
+            built_on = []
+            def build_during_write(books):
+                built_on.append(threading.current_thread())
+                if len(built_on) == 1:
+                    book_replica.book_deleted(7)
+                return build(books)
+            BookReplica.build = staticmethod(build_during_write)
+            try:
+                async def refresh_twice():
+                    await AsyncBookService.refresh_replica(force=True)
+                    discarded = [book["id"] for book in book_replica.search(author="author 7")]
+                    await AsyncBookService.refresh_replica(force=True)
+                    return discarded
+                discarded = asyncio.run(refresh_twice())
+            finally:
+                BookReplica.build = build
+            if threading.main_thread() in built_on:
+                print("✗ Replica indexes were built on the event loop thread")
+                return False
+            if discarded != [] or [book["id"] for book in book_replica.search(author="author 7")] != [7]:
+                print(f"✗ Snapshot built during a write was not discarded ({discarded})")
+                return False
+            print("✓ Async refresh built off the event loop, snapshot raced by a write discarded")
+            return True
+    except Exception as e:
+        print(f"✗ Exception: {str(e)}")
+        return False
+    finally:
+        services.BOOKS_API_URL = original_url
+        book_cache.clear()
+        book_replica.clear()
+
+def test_bulk_tools():
+    """Test that the bulk tools apply every valid item and report per-item errors"""
+    print("\n" + "=" * 60)
+    print("Testing create_books / get_books / update_books / delete_books (stub Books API)")
+    print("=" * 60)
+    
+    original_url = services.BOOKS_API_URL
+    try:
+        with StubBooksAPI(catalog_size=0) as stub:
+            services.BOOKS_API_URL = stub.url
+            book_cache.clear()
+            books = [
+                {"title": f"Bulk Book {i}", "author": "Bulk Author", "publishedDate": "2020-01-01T00:00:00Z"}
+                for i in range(200)
+            ] + [{"title": "Missing author"}]
+            created = asyncio.run(execute_tool_calls([
+                ToolCallRequest(name="create_books", parameters={"books": books})
+            ]))[0].result
+            
+            if created["succeeded"] != 200 or created["failed"] != 1 or created["results"][-1]["error"] is None:
+                print(f"✗ Unexpected create_books counts: {created['succeeded']} succeeded, {created['failed']} failed")
+                return False
+            ids = [item["result"]["id"] for item in created["results"][:200]]
+            
+            updated = BookService.update_books([{"book_id": ids[0], "book_data": {"title": "Renamed"}}])
+            fetched = BookService.get_books(ids[:3])
+            deleted = BookService.delete_books(ids)
+            
+            if updated.result["succeeded"] != 1 or fetched.result["results"][0]["result"]["title"] != "Renamed":
+                print("✗ update_books result not visible to get_books")
+                return False
+            if deleted.result["succeeded"] != 200 or stub.books:
+                print(f"✗ delete_books left {len(stub.books)} books in the backend")
+                return False
+            print("✓ 200 books created, updated, read and deleted in bulk, invalid item reported")
+            return True
+    except Exception as e:
+        print(f"✗ Exception: {str(e)}")
+        return False
+    finally:
+        services.BOOKS_API_URL = original_url
+        book_cache.clear()
+
+def test_streaming_tool_calls():
+    """Test NDJSON streaming mode of /tool-calls"""
+    print("\n" + "=" * 60)
+    print("Testing streaming /tool-calls (stub Books API)")
+    print("=" * 60)
+    
+    from fastapi.testclient import TestClient
+    from main import app
+    
+    original_url = services.BOOKS_API_URL
+    try:
+        with StubBooksAPI(catalog_size=500) as stub, TestClient(app) as client:
+            services.BOOKS_API_URL = stub.url
+            book_cache.clear()
+            response = client.post(
+                "/tool-calls",
+                json={"tool_calls": [
+                    {"name": "list_books", "parameters": {}},
+                    {"name": "get_book", "parameters": {"book_id": 3}},
+                    {"name": "unknown_tool", "parameters": {}}
+                ]},
+                headers={"Accept": "application/x-ndjson"}
+            )
+            lines = [json.loads(line) for line in response.text.splitlines()]
+            by_index = {line["index"]: line for line in lines}
+            
+            if sorted(by_index) != [0, 1, 2]:
+                print(f"✗ Expected one line per tool call, got indexes {sorted(by_index)}")
+                return False
+            if len(by_index[0]["result"]) != 500 or by_index[1]["result"]["id"] != 3 or not by_index[2]["error"]:
+                print("✗ Unexpected streamed results")
+                return False
+            print(f"✓ {len(lines)} NDJSON results streamed ({len(response.content)} bytes)")
+            return True
+    except Exception as e:
+        print(f"✗ Exception: {str(e)}")
+        return False
+    finally:
+        services.BOOKS_API_URL = original_url
+
+def test_fast_serialization():
+    """Test that the fast /tool-calls response matches the response_model encoding"""
+    print("\n" + "=" * 60)
+    print("Testing fast-path /tool-calls serialization (stub Books API)")
+    print("=" * 60)
+    
+    from fastapi.testclient import TestClient
+    from main import app
+    
+    original_url = services.BOOKS_API_URL
+    original_setting = os.environ.get("MCP_FAST_SERIALIZATION")
+    body = {"tool_calls": [
+        {"name": "list_books", "parameters": {}},
+        {"name": "list_books", "parameters": {"limit": 2, "fields": ["title"]}},
+        {"name": "get_book", "parameters": {"book_id": 3}},
+        {"name": "unknown_tool", "parameters": {}}
+    ]}
+    try:
+        with StubBooksAPI(catalog_size=50) as stub, TestClient(app) as client:
+            services.BOOKS_API_URL = stub.url
+            responses = {}
+            for fast in ("false", "true"):
+                os.environ["MCP_FAST_SERIALIZATION"] = fast
+                book_cache.clear()
+                responses[fast] = client.post("/tool-calls", json=body).json()
+            
+            if responses["true"] != responses["false"]:
+                print("✗ Fast-path response differs from the response_model encoding")
+                return False
+            print(f"✓ Fast-path response matches ({len(responses['true']['tool_call_results'])} results)")
+            return True
+    except Exception as e:
+        print(f"✗ Exception: {str(e)}")
+        return False
+    finally:
+        services.BOOKS_API_URL = original_url
+        if original_setting is None:
+            os.environ.pop("MCP_FAST_SERIALIZATION", None)
+        else:
+            os.environ["MCP_FAST_SERIALIZATION"] = original_setting
+
+def test_metrics():
+    """Test that tool calls and Books API requests are reported on /metrics"""
+    print("\n" + "=" * 60)
+    print("Testing /metrics (stub Books API)")
+    print("=" * 60)
+    
+    from fastapi.testclient import TestClient
+    from main import app
+    
+    original_url = services.BOOKS_API_URL
+    try:
+        with StubBooksAPI(catalog_size=10) as stub, TestClient(app) as client:
+            services.BOOKS_API_URL = stub.url
+            book_cache.clear()
+            client.post("/tool-calls", json={"tool_calls": [
+                {"name": "get_book", "parameters": {"book_id": 1}},
+                {"name": "get_book", "parameters": {"book_id": 9999}}
+            ]})
+            response = client.get("/metrics")
+            expected = [
+                'mcp_tool_calls_total{tool="get_book",outcome="ok"}',
+                'mcp_tool_calls_total{tool="get_book",outcome="error"}',
+                'mcp_tool_call_duration_seconds_count{tool="get_book"}',
+                'mcp_backend_requests_total{method="GET",endpoint="/books/{id}",status="404"}',
+            ]
+            missing = [line for line in expected if line not in response.text]
+            if response.status_code != 200 or missing:
+                print(f"✗ Missing metrics: {missing}")
+                return False
+            if client.get("/health").json()["latency_ms"]["tools"]["get_book"]["p99"] is None:
+                print("✗ No get_book latency percentiles on /health")
+                return False
+            print("✓ Tool and Books API metrics exposed")
+            return True
+    except Exception as e:
+        print(f"✗ Exception: {str(e)}")
+        return False
+    finally:
+        services.BOOKS_API_URL = original_url
+        book_cache.clear()
+
+def test_backend_outage():
+    """Test that a hanging Books API trips the circuit breaker instead of stalling tool calls"""
+    print("\n" + "=" * 60)
+    print("Testing circuit breaker during a Books API outage (stub Books API)")
+    print("=" * 60)
+    
+    original_url = services.BOOKS_API_URL
+    original_settings = (backend_health.failure_threshold, backend_health.reset_timeout, backend_health.timeout_min)
+    original_ttl = book_cache.books.ttl
+    original_serve_stale = os.environ.get("MCP_SERVE_STALE")
+    get_books = lambda ids: [ToolCallRequest(name="get_book", parameters={"book_id": i}) for i in ids]
+    try:
+        with StubBooksAPI(catalog_size=200) as stub:
+            services.BOOKS_API_URL = stub.url
+            book_cache.clear()
+            backend_health.reset()
+            backend_health.failure_threshold, backend_health.reset_timeout, backend_health.timeout_min = 3, 0.5, 0.05
+            os.environ["MCP_SERVE_STALE"] = "true"
+            
+            # Learn the endpoint's latency and leave books 1-20 in the cache, already expired
+            book_cache.books.ttl = 0
+            asyncio.run(execute_tool_calls(get_books(range(1, 21))))
+            book_cache.books.ttl = original_ttl
+            
+            # The backend now hangs; without a breaker 200 calls would take ~20s at concurrency 10
+            stub.latency = 1.0
+            start = time.perf_counter()
+            results = asyncio.run(execute_tool_calls(get_books(range(1, 201))))
+            elapsed = time.perf_counter() - start
+            breaker = backend_health.breaker("GET", "/books/{id}")
+            
+            if elapsed > 1.0 or breaker.state != "open":
+                print(f"✗ Outage took {elapsed:.2f}s, circuit {breaker.stats()}")
+                return False
+            if any(result.result is None for result in results[:20]) or any(result.error is None for result in results[20:]):
+                print("✗ Expected stale results for cached books and errors for the rest")
+                return False
+            
+            # After the reset timeout a probe closes the circuit again
+            stub.latency = 0
+            time.sleep(0.6)
+            recovered = asyncio.run(execute_tool_calls(get_books([21])))[0]
+            if recovered.error is not None or breaker.state != "closed":
+                print(f"✗ Circuit did not recover: {recovered.error}")
+                return False
+            print(f"✓ 200 calls during the outage finished in {elapsed:.2f}s, stale books served, circuit recovered")
+            return True
+    except Exception as e:
+        print(f"✗ Exception: {str(e)}")
+        return False
+    finally:
+        services.BOOKS_API_URL = original_url
+        backend_health.failure_threshold, backend_health.reset_timeout, backend_health.timeout_min = original_settings
+        backend_health.reset()
+        book_cache.books.ttl = original_ttl
+        book_cache.clear()
+        if original_serve_stale is None:
+            os.environ.pop("MCP_SERVE_STALE", None)
+        else:
+            os.environ["MCP_SERVE_STALE"] = original_serve_stale
+
+def test_retries():
+    """Test that dropped Books API responses are retried and keyed creates are not duplicated"""
+    print("\n" + "=" * 60)
+    print("Testing retries and idempotent creates (stub Books API)")
+    print("=" * 60)
+    
+    original_url = services.BOOKS_API_URL
+    book_data = {"title": "Retried Book", "author": "Retry Author"}
+    try:
+        with StubBooksAPI(catalog_size=10) as stub:
+            services.BOOKS_API_URL = stub.url
+            book_cache.clear()
+            backend_health.reset()
+            retry_policy.reset()
+            
+            # Idempotent reads survive connection resets
+            stub.drop_responses = 2
+            result = BookService.get_book(1)
+            if result.error is not None or retry_policy.retries != 2:
+                print(f"✗ get_book was not retried: {result.error}, {retry_policy.stats()}")
+                return False
+            # aiohttp itself replays a GET once on a dropped connection, so drop more than that
+            stub.drop_responses = 3
+            result = asyncio.run(AsyncBookService.get_book(2))
+            if result.error is not None or retry_policy.retries < 3:
+                print(f"✗ Async get_book was not retried: {result.error}, {retry_policy.stats()}")
+                return False
+            
+            # A create without a key is never retried, since the book may already exist
+            retries = retry_policy.retries
+            stub.drop_responses = 1
+            result = BookService.create_book(dict(book_data))
+            if result.error is None or retry_policy.retries != retries:
+                print("✗ create_book without idempotency_key should not be retried")
+                return False
+            
+            # A keyed create whose response is lost may have been applied, so by default it is not resent
+            books_before = len(stub.books)
+            retries = retry_policy.retries
+            stub.drop_responses = 1
+            lost = BookService.create_book(dict(book_data), idempotency_key="retry-test-lost")
+            if lost.error is None or retry_policy.retries != retries or len(stub.books) != books_before + 1:
+                print("✗ Keyed create was resent to a Books API not known to honor Idempotency-Key")
+                return False
+            
+            # Its key now refuses to post again, since the book may exist
+            unknown = BookService.create_book(dict(book_data), idempotency_key="retry-test-lost")
+            if unknown.error is None or len(stub.books) != books_before + 1:
+                print("✗ Create with a key whose outcome is unknown was posted again")
+                return False
+            
+            # Concurrent calls with one key wait for the first instead of posting again
+            books_before = len(stub.books)
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                concurrent = list(pool.map(
+                    lambda _: BookService.create_book(dict(book_data), idempotency_key="retry-test-concurrent"),
+                    range(4)
+                ))
+            if len(stub.books) != books_before + 1 or any(r.result != concurrent[0].result for r in concurrent):
+                print(f"✗ Concurrent keyed creates posted {len(stub.books) - books_before} books")
+                return False
+            
+            # ...but one that never reached the backend is
+            services.BOOKS_API_URL = f"http://127.0.0.1:{free_port()}"
+            refused = BookService.create_book(dict(book_data), idempotency_key="retry-test-refused")
+            services.BOOKS_API_URL = stub.url
+            backend_health.reset()
+            if refused.error is None or retry_policy.retries == retries:
+                print("✗ Keyed create that could not connect was not retried")
+                return False
+            
+            # A keyed create whose response is lost is retried and applied once by a backend that honors the key
+            services.BACKEND_HONORS_IDEMPOTENCY_KEY = True
+            books_before = len(stub.books)
+            stub.drop_responses = 1
+            first = asyncio.run(AsyncBookService.create_book(dict(book_data), idempotency_key="retry-test-1"))
+            requests_before = stub.request_count
+            replay = BookService.create_book(dict(book_data), idempotency_key="retry-test-1")
+            if first.error is not None or replay.result != first.result or len(stub.books) != books_before + 1:
+                print(f"✗ Keyed create duplicated or failed: {first.error}, {len(stub.books) - books_before} books")
+                return False
+            if stub.request_count != requests_before:
+                print("✗ Replayed create should be answered without calling the Books API")
+                return False
+            conflict = BookService.create_book({"title": "Other", "author": "Other"}, idempotency_key="retry-test-1")
+            if conflict.error is None:
+                print("✗ Reusing an idempotency_key for different book data should fail")
+                return False
+            print(f"✓ Reads and keyed creates retried ({retry_policy.retries} retries), replayed create returned book {first.result['id']}")
+            return True
+    except Exception as e:
+        print(f"✗ Exception: {str(e)}")
+        return False
+    finally:
+        services.BOOKS_API_URL = original_url
+        services.BACKEND_HONORS_IDEMPOTENCY_KEY = False
+        book_cache.clear()
+        idempotent_creates.clear()
+        backend_health.reset()
+        retry_policy.reset()
+
+def test_shared_cache():
+    """Test that workers using the shared book cache see each other's reads and invalidations"""
+    print("\n" + "=" * 60)
+    print("Testing shared cross-worker book cache (stub Books API)")
+    print("=" * 60)
+    
+    original_url = services.BOOKS_API_URL
+    original_cache = services.book_cache
+    path = os.path.join(tempfile.mkdtemp(), "shared-cache.sqlite3")
+    try:
+        with StubBooksAPI(catalog_size=10) as stub:
+            services.BOOKS_API_URL = stub.url
+            # Two handles on the same store stand in for two worker processes
+            worker_a = SharedBookCache(True, 100, 30, 5, path)
+            worker_b = SharedBookCache(True, 100, 30, 5, path)
+            
+            services.book_cache = worker_a
+            BookService.get_book(1)
+            BookService.list_books()
+            services.book_cache = worker_b
+            requests_before = stub.request_count
+            book = BookService.get_book(1)
+            books = BookService.list_books()
+            if book.error is not None or len(books.result) != 10 or stub.request_count != requests_before:
+                print("✗ Second worker did not read the first worker's cached entries")
+                return False
+            
+            update = BookService.update_book(1, {"title": "Shared Title"})
+            if update.error is not None or worker_a.get_book(1) is not None or worker_a.get_books() is not None:
+                print("✗ Update in one worker did not invalidate the other worker's view")
+                return False
+            services.book_cache = worker_a
+            if BookService.get_book(1).result["title"] != "Shared Title":
+                print("✗ First worker read a stale book after the update")
+                return False
+            
+            # A create_book idempotency key claimed in one worker is seen, and then replayed, by the other
+            keys_a = IdempotencyKeys(SharedTTLCache(worker_a.store, "idempotency_keys", 100, 60), worker_a.store.transaction)
+            keys_b = IdempotencyKeys(SharedTTLCache(worker_b.store, "idempotency_keys", 100, 60), worker_b.store.transaction)
+            book_data = {"title": "Shared Create", "author": "Shared Author"}
+            claimed = keys_a.claim("shared-key", book_data, lease=60)
+            pending = keys_b.claim("shared-key", book_data, lease=60)
+            if claimed is not None or pending is None or pending["state"] != "pending":
+                print("✗ Idempotency key claimed in one worker was not seen as in use by the other")
+                return False
+            keys_a.created("shared-key", book_data, dict(book_data, id=99))
+            services.idempotent_creates = keys_b
+            requests_before = stub.request_count
+            replay = BookService.create_book(dict(book_data), idempotency_key="shared-key")
+            if replay.result != dict(book_data, id=99) or stub.request_count != requests_before:
+                print("✗ Create in one worker was not replayed by the other")
+                return False
+            
+            # While another worker holds the write lock, the async service waits off the event loop
+            services.book_cache = worker_a
+            
+            async def update_while_locked():
+                ticks = []
+                
+                async def ticker():
+                    while True:
+                        ticks.append(time.perf_counter())
+                        await asyncio.sleep(0.01)
+                
+                ticking = asyncio.ensure_future(ticker())
+                update = asyncio.ensure_future(AsyncBookService.update_book(2, {"title": "Waited"}))
+                await asyncio.sleep(0.5)
+                blocked = not update.done()
+                locker.execute("COMMIT")
+                result = await update
+                ticking.cancel()
+                return result, blocked, max(b - a for a, b in zip(ticks, ticks[1:]))
+            
+            locker = sqlite3.connect(path, isolation_level=None)
+            locker.execute("BEGIN IMMEDIATE")
+            try:
+                update, blocked, longest_gap = asyncio.run(update_while_locked())
+            finally:
+                locker.close()
+            if update.error is not None or not blocked or longest_gap > 0.2:
+                print(f"✗ Shared cache write stalled the event loop for {longest_gap:.2f}s ({update.error})")
+                return False
+            print(f"✓ Entries shared between workers, invalidations visible to all ({worker_a.stats()['books']['size']} books cached)")
+            return True
+    except Exception as e:
+        print(f"✗ Exception: {str(e)}")
+        return False
+    finally:
+        services.BOOKS_API_URL = original_url
+        services.book_cache = original_cache
+        services.idempotent_creates = idempotent_creates
+        remove_shared_store(path)
+
+def test_conditional_requests():
+    """Test that unchanged Books API bodies are revalidated instead of re-downloaded and re-parsed"""
+    print("\n" + "=" * 60)
+    print("Testing conditional requests (stub Books API)")
+    print("=" * 60)
+    
+    original_url = services.BOOKS_API_URL
+    original_enabled = book_cache.enabled
+    try:
+        # Read through to the backend every time
+        book_cache.enabled = False
+        revalidator.reset()
+        with StubBooksAPI(catalog_size=50) as stub:
+            services.BOOKS_API_URL = stub.url
+            first = BookService.list_books()
+            second = asyncio.run(AsyncBookService.list_books())
+            if second.error is not None or second.result != first.result or revalidator.not_modified != 1:
+                print(f"✗ Second list_books was not answered by a 304: {revalidator.stats()}")
+                return False
+            if revalidator.bytes_saved <= 0:
+                print("✗ No bytes saved reported for the 304")
+                return False
+            
+            stub.books[1] = {**stub.books[1], "title": "Changed Title"}
+            changed = BookService.list_books()
+            book = BookService.get_book(1)
+            book_again = BookService.get_book(1)
+            if changed.result[0]["title"] != "Changed Title" or book_again.result != book.result:
+                print("✗ Changed catalog or revalidated book returned the wrong data")
+                return False
+        
+        # Without validators an identical body still skips parsing
+        with StubBooksAPI(catalog_size=50, etags=False) as stub:
+            services.BOOKS_API_URL = stub.url
+            BookService.list_books()
+            BookService.list_books()
+            if revalidator.unchanged != 1:
+                print(f"✗ Identical body without ETag was parsed again: {revalidator.stats()}")
+                return False
+        print(f"✓ {revalidator.not_modified} not modified, {revalidator.unchanged} unchanged, "
+              f"{revalidator.bytes_saved} bytes saved")
+        return True
+    except Exception as e:
+        print(f"✗ Exception: {str(e)}")
+        return False
+    finally:
+        services.BOOKS_API_URL = original_url
+        book_cache.enabled = original_enabled
+        book_cache.clear()
+        revalidator.reset()
+
+def test_argument_validation():
+    """Test that tool calls with invalid parameters are rejected before reaching the Books API"""
+    print("\n" + "=" * 60)
+    print("Testing tool argument validation (stub Books API)")
+    print("=" * 60)
+    
+    original_url = services.BOOKS_API_URL
+    try:
+        with StubBooksAPI(catalog_size=10) as stub:
+            services.BOOKS_API_URL = stub.url
+            book_cache.clear()
+            invalid = [
+                ToolCallRequest(name="get_book", parameters={}),
+                ToolCallRequest(name="get_book", parameters={"book_id": "1"}),
+                ToolCallRequest(name="get_book", parameters={"book_id": True}),
+                ToolCallRequest(name="get_book", parameters={"book_id": 1, "verbose": True}),
+                ToolCallRequest(name="create_book", parameters={"book_data": {"title": "No author"}}),
+                ToolCallRequest(name="update_book", parameters={"book_id": 1, "book_data": {"title": 5}}),
+                ToolCallRequest(name="list_books", parameters={"fields": ["title", "price"]}),
+                ToolCallRequest(name="get_books", parameters={"book_ids": 3})
+            ]
+            results = asyncio.run(execute_tool_calls(invalid))
+            if any(result.error is None or not result.error.startswith("Invalid parameters") for result in results):
+                print(f"✗ Invalid calls were not rejected: {[result.error for result in results]}")
+                return False
+            if stub.request_count != 0:
+                print(f"✗ Invalid calls reached the Books API {stub.request_count} times")
+                return False
+            
+            # Bulk tools still report invalid items individually
+            bulk = asyncio.run(execute_tool_calls([
+                ToolCallRequest(name="get_books", parameters={"book_ids": [1, "x"]})
+            ]))[0]
+            if bulk.error is not None or bulk.result["succeeded"] != 1 or bulk.result["failed"] != 1:
+                print(f"✗ Unexpected get_books result: {bulk.error or bulk.result}")
+                return False
+            if validate_tool_call(ToolCallRequest(name="update_book", parameters={"book_id": 1, "book_data": {"extra": 1}})):
+                print("✗ Extra fields inside book_data should be allowed")
+                return False
+            print(f"✓ {len(results)} invalid calls rejected locally, e.g. {results[1].error!r}")
+            return True
+    except Exception as e:
+        print(f"✗ Exception: {str(e)}")
+        return False
+    finally:
+        services.BOOKS_API_URL = original_url
+        book_cache.clear()
+
+def test_admission_control():
+    """Test batch limits, per-client rate limits and backend load shedding"""
+    print("\n" + "=" * 60)
+    print("Testing admission control (stub Books API)")
+    print("=" * 60)
+    
+    from fastapi.testclient import TestClient
+    from main import app
+    
+    original_url = services.BOOKS_API_URL
+    original_settings = (admission.rate, admission.burst, admission.max_batch_size,
+                         admission.queue_size, admission.queue_timeout, admission.backend)
+    original_enabled = book_cache.enabled
+    
+    def batch(size):
+        return {"tool_calls": [{"name": "get_book", "parameters": {"book_id": 1}}] * size}
+    
+    try:
+        admission.rate, admission.burst, admission.max_batch_size = 1.0, 5, 20
+        admission.reset()
+        with StubBooksAPI(catalog_size=10, latency=0.2) as stub, TestClient(app) as client:
+            services.BOOKS_API_URL = stub.url
+            too_large = client.post("/tool-calls", json=batch(21))
+            first = client.post("/tool-calls", json=batch(5), headers={"X-API-Key": "agent-a"})
+            limited = client.post("/tool-calls", json=batch(1), headers={"X-API-Key": "agent-a"})
+            other = client.post("/tool-calls", json=batch(1), headers={"X-API-Key": "agent-b"})
+            if too_large.status_code != 413 or first.status_code != 200 or other.status_code != 200:
+                print(f"✗ Unexpected statuses: {too_large.status_code}, {first.status_code}, {other.status_code}")
+                return False
+            if limited.status_code != 429 or "Retry-After" not in limited.headers:
+                print(f"✗ Client over its rate limit got {limited.status_code} without Retry-After")
+                return False
+            
+            # A batch larger than the burst is charged in full: its client waits for all of it
+            large = client.post("/tool-calls", json=batch(15), headers={"X-API-Key": "agent-c"})
+            after_large = client.post("/tool-calls", json=batch(1), headers={"X-API-Key": "agent-c"})
+            if large.status_code != 200 or after_large.status_code != 429 \
+                    or int(after_large.headers.get("Retry-After", 0)) < 10:
+                print(f"✗ Batch over the burst was not charged in full: {large.status_code}, "
+                      f"{after_large.status_code} Retry-After {after_large.headers.get('Retry-After')}")
+                return False
+            
+            # One backend slot: a second uncached read queues, times out and new requests are shed
+            book_cache.enabled = False
+            admission.backend = Slots(1)
+            admission.queue_size, admission.queue_timeout = 1, 0.05
+            
+            async def saturate():
+                calls = asyncio.ensure_future(execute_tool_calls([
+                    ToolCallRequest(name="get_book", parameters={"book_id": 1}),
+                    ToolCallRequest(name="get_book", parameters={"book_id": 2})
+                ]))
+                await asyncio.sleep(0.02)
+                try:
+                    admission.admit("ip:10.0.0.1", 1)
+                    shed = None
+                except AdmissionRejected as e:
+                    shed = e
+                return shed, await calls
+            shed, results = asyncio.run(saturate())
+            if shed is None or shed.status_code != 429 or shed.headers.get("Retry-After") is None:
+                print("✗ Request arriving while the backend queue was full was not shed")
+                return False
+            if results[0].error is not None or results[1].error is None:
+                print(f"✗ Expected the queued call to time out: {[r.error for r in results]}")
+                return False
+            if admission.backend.in_flight != 0:
+                print(f"✗ {admission.backend.in_flight} backend slots leaked")
+                return False
+        print(f"✓ Rejections: {admission.stats()['rejections']}")
+        return True
+    except Exception as e:
+        print(f"✗ Exception: {str(e)}")
+        return False
+    finally:
+        services.BOOKS_API_URL = original_url
+        (admission.rate, admission.burst, admission.max_batch_size,
+         admission.queue_size, admission.queue_timeout, admission.backend) = original_settings
+        admission.reset()
+        book_cache.enabled = original_enabled
+        book_cache.clear()
+
+def test_write_behind():
+    """Test that queued writes coalesce, are visible to reads and reach the Books API on flush"""
+    print("\n" + "=" * 60)
+    print("Testing write-behind batching (stub Books API)")
+    print("=" * 60)
+    
+    original_url = services.BOOKS_API_URL
+    original_settings = (write_behind.enabled, write_behind.flush_interval)
+    
+    async def scenario(stub):
+        admission.enabled, original_admission = True, admission.enabled
+        try:
+            admission.admit("key:write-behind-test", 1)
+        finally:
+            admission.enabled = original_admission
+        acks = [
+            await AsyncBookService.update_book(1, {"title": "First"}),
+            await AsyncBookService.update_book(1, {"author": "Second"}),
+            await AsyncBookService.create_book({"id": 500, "title": "Temporary", "author": "Nobody"}),
+            await AsyncBookService.delete_book(500),
+            await AsyncBookService.delete_book(2),
+            await AsyncBookService.create_book({"id": 600, "title": "Kept", "author": "Somebody"})
+        ]
+        if any(ack.error is not None for ack in acks):
+            return f"writes were not acknowledged: {[ack.error for ack in acks]}"
+        requests_before_flush = stub.request_count
+        book = (await AsyncBookService.get_book(1)).result
+        if book is None or book["title"] != "First" or book["author"] != "Second":
+            return f"queued updates not visible: {book}"
+        if (await AsyncBookService.get_book(2)).error is None or (await AsyncBookService.get_book(500)).error is None:
+            return "deleted or cancelled books still readable"
+        ids = {book["id"] for book in (await AsyncBookService.list_books()).result}
+        if 2 in ids or 500 in ids or 600 not in ids:
+            return "list_books does not reflect queued writes"
+        if (await AsyncBookService.update_book(2, {"title": "Gone"})).error is None:
+            return "update of a book deleted in the queue was accepted"
+        
+        reads = stub.request_count - requests_before_flush
+        # The flusher must not run as the client whose request queued the writes
+        admission_clients = []
+        send = write_behind._apply
+        
+        async def recording_send(book_id, entry):
+            admission_clients.append(current_admission_client.get())
+            return await send(book_id, entry)
+        
+        write_behind.bind(recording_send)
+        try:
+            status = (await AsyncBookService.flush_writes()).result
+        finally:
+            write_behind.bind(send)
+        if any(client is not None for client in admission_clients):
+            return "queued writes were flushed under the admission client of the request that queued them"
+        # One PUT for book 1, one DELETE for book 2, one POST for book 600; book 500 cancelled
+        writes = stub.request_count - requests_before_flush - reads
+        if status["pending"] != 0 or status["flushed"] != 3 or status["failed"] != 0 or writes != 3:
+            return f"unexpected flush: {writes} requests, {status}"
+        if stub.books[1]["title"] != "First" or stub.books[1]["author"] != "Second" \
+                or 2 in stub.books or 500 in stub.books or stub.books[600]["title"] != "Kept":
+            return "Books API state does not match the queued writes"
+        return None
+    
+    try:
+        # Only flush when asked to, so request counts are deterministic
+        write_behind.enabled, write_behind.flush_interval = True, 60.0
+        write_behind.reset()
+        book_cache.clear()
+        with StubBooksAPI(catalog_size=10) as stub:
+            services.BOOKS_API_URL = stub.url
+            error = asyncio.run(scenario(stub))
+            if error is not None:
+                print(f"✗ {error}")
+                return False
+            
+            # The production launcher turns write-behind off for its workers when there are several
+            import run
+            saved_env = {name: os.environ.get(name) for name in ("MCP_SERVER_MODE", "MCP_WORKERS", "MCP_WRITE_BEHIND_ENABLED")}
+            saved_launch = (run.uvicorn.run, run.remove_shared_store)
+            run.uvicorn.run, run.remove_shared_store = (lambda *args, **kwargs: None), (lambda path: None)
+            try:
+                os.environ["MCP_WRITE_BEHIND_ENABLED"] = "true"
+                run.run_production("127.0.0.1", free_port(), 1)
+                single = os.environ["MCP_WRITE_BEHIND_ENABLED"]
+                run.run_production("127.0.0.1", free_port(), 2)
+                multiple = os.environ["MCP_WRITE_BEHIND_ENABLED"]
+            finally:
+                run.uvicorn.run, run.remove_shared_store = saved_launch
+                for name, value in saved_env.items():
+                    if value is None:
+                        os.environ.pop(name, None)
+                    else:
+                        os.environ[name] = value
+            if (single, multiple) != ("true", "false"):
+                print(f"✗ Write-behind not refused with several workers: {single}, {multiple}")
+                return False
+            print(f"✓ 6 writes coalesced into 3 Books API requests: {write_behind.stats()}")
+            return True
+    except Exception as e:
+        print(f"✗ Exception: {str(e)}")
+        return False
+    finally:
+        services.BOOKS_API_URL = original_url
+        write_behind.enabled, write_behind.flush_interval = original_settings
+        write_behind.reset()
+        book_cache.clear()
+
+def test_backend_balancing():
+    """Test latency-aware balancing, ejection and hedged reads across several Books API replicas"""
+    print("\n" + "=" * 60)
+    print("Testing Books API replica balancing (stub Books APIs)")
+    print("=" * 60)
+    
+    original_url = services.BOOKS_API_URL
+    original_settings = (backend_pool.hedge_enabled, backend_pool.hedge_budget_ratio)
+    original_enabled = book_cache.enabled
+    
+    async def read(count):
+        results = [await AsyncBookService.get_book(book_id % 10 + 1) for book_id in range(count)]
+        return [result.error for result in results if result.error is not None]
+    
+    try:
+        book_cache.enabled = False
+        backend_pool.reset()
+        backend_health.reset()
+        retry_policy.reset()
+        with StubBooksAPI(catalog_size=10, latency=0.002) as fast, \
+                StubBooksAPI(catalog_size=10, latency=0.03) as slow, \
+                StubBooksAPI(catalog_size=10, fail_status=503) as broken:
+            services.BOOKS_API_URL = ",".join((fast.url, slow.url, broken.url))
+            errors = asyncio.run(read(60))
+            if errors:
+                print(f"✗ Reads failed: {errors[:3]}")
+                return False
+            if fast.request_count < 3 * slow.request_count:
+                print(f"✗ Fast replica got {fast.request_count} requests, slow replica {slow.request_count}")
+                return False
+            if broken.request_count > backend_pool.eject_failures:
+                print(f"✗ Failing replica was not avoided: {broken.request_count} requests")
+                return False
+            print(f"✓ Requests per replica: fast={fast.request_count} slow={slow.request_count} "
+                  f"failing={broken.request_count}")
+            
+            # Replicas that keep failing are taken out of rotation
+            slow.fail_status = 503
+            services.BOOKS_API_URL = ",".join((slow.url, broken.url))
+            asyncio.run(read(4))
+            slow.fail_status = None
+            if any(replica["healthy"] for replica in backend_pool.stats()["replicas"] if replica["url"] != fast.url):
+                print(f"✗ Failing replicas were not ejected: {backend_pool.stats()}")
+                return False
+            print("✓ Failing replicas ejected")
+            backend_pool.reset()
+            backend_health.reset()
+            
+            # The balancer is steered to a replica that has become slow; the hedge answers first
+            backend_pool.hedge_enabled, backend_pool.hedge_budget_ratio = True, 1.0
+            services.BOOKS_API_URL = ",".join((fast.url, slow.url))
+            slow.latency = 0.002
+            asyncio.run(read(40))
+            slow.latency = 0.5
+            fast_backend, slow_backend = backend_pool.backends(services.BOOKS_API_URL)
+            fast_backend.latency, slow_backend.latency = 1.0, 0.0
+            start = time.perf_counter()
+            errors = asyncio.run(read(1))
+            elapsed = time.perf_counter() - start
+            if errors or elapsed > 0.25 or fast_backend.hedges_won != 1:
+                print(f"✗ Hedged read took {elapsed * 1000:.0f}ms: {errors}, {backend_pool.stats()}")
+                return False
+            print(f"✓ Read hedged to the fast replica in {elapsed * 1000:.0f}ms instead of 500ms")
+        return True
+    except Exception as e:
+        print(f"✗ Exception: {str(e)}")
+        return False
+    finally:
+        services.BOOKS_API_URL = original_url
+        backend_pool.hedge_enabled, backend_pool.hedge_budget_ratio = original_settings
+        backend_pool.reset()
+        backend_health.reset()
+        book_cache.enabled = original_enabled
+        book_cache.clear()
+
+def test_compact_catalog():
+    """Test that the compact catalog gives back every book exactly and stays in step with writes"""
+    print("\n" + "=" * 60)
+    print("Testing compact catalog (stub Books API)")
+    print("=" * 60)
+    
+    original_url = services.BOOKS_API_URL
+    original_setting = services.COMPACT_CATALOG
+    original_cache = services.book_cache
+    books = [make_book(book_id) for book_id in range(1, 101)] + [
+        {"id": 200, "title": "Odd", "author": None, "isbn": "12X-4", "publishedDate": "2020-01-01"},
+        {"id": 150, "title": "Out of order", "series": {"name": "S", "number": 2}},
+        {"title": "No id"}
+    ]
+    try:
+        compact = loads_catalog(dumps(books))
+        if not isinstance(compact, CatalogView) or list(compact) != books or json.loads(encode_value(compact)) != books:
+            print("✗ Books changed on their way through the compact catalog")
+            return False
+        if compact.catalog.get(150) != books[101] or compact[10:12] != books[10:12]:
+            print("✗ Lookup by id or slicing returned the wrong books")
+            return False
+        
+        services.COMPACT_CATALOG = True
+        with StubBooksAPI(catalog_size=100) as stub:
+            services.BOOKS_API_URL = stub.url
+            book_cache.clear()
+            listed = BookService.list_books()
+            if not isinstance(listed.result, CatalogView) or len(listed.result) != 100:
+                print(f"✗ list_books was not held in a compact catalog: {type(listed.result).__name__}")
+                return False
+            BookService.delete_book(5)
+            BookService.create_book({"title": "Compact", "author": "Someone"})
+            requests_before = stub.request_count
+            cached = BookService.list_books(limit=3, offset=97)
+            ids = [book["id"] for book in cached.result["books"]]
+            if stub.request_count != requests_before or cached.result["total"] != 100 or ids != [99, 100, 101]:
+                print(f"✗ Cached snapshot was not patched by writes: {cached.result['total']} books, {ids}")
+                return False
+            if book_cache.get_books().catalog is not listed.result.catalog or len(listed.result) != 100 \
+                    or 101 in [book["id"] for book in listed.result]:
+                print("✗ Create copied the cached catalog or changed the snapshot an earlier caller holds")
+                return False
+            
+            # With the shared backend, other workers read the snapshot back as a compact catalog too
+            path = os.path.join(tempfile.mkdtemp(), "shared-cache.sqlite3")
+            worker_a = SharedBookCache(True, 100, 30, 5, path, compact=True)
+            worker_b = SharedBookCache(True, 100, 30, 5, path, compact=True)
+            services.book_cache = worker_a
+            shared = BookService.list_books().result
+            read_back = worker_b.get_books()
+            if not isinstance(shared, CatalogView) or not isinstance(read_back, CatalogView) \
+                    or read_back != shared or worker_b.get_books() is not read_back:
+                print(f"✗ Shared snapshot was not read back as a compact catalog: {type(read_back).__name__}")
+                return False
+        print(f"✓ {len(books)} books round-tripped; list_books cached as {listed.result!r}, "
+              f"also through the shared cache")
+        return True
+    except Exception as e:
+        print(f"✗ Exception: {str(e)}")
+        return False
+    finally:
+        services.BOOKS_API_URL = original_url
+        services.COMPACT_CATALOG = original_setting
+        services.book_cache = original_cache
+        book_cache.clear()
+
+def test_compression():
+    """Test negotiated response compression, MessagePack responses and compressed request bodies"""
+    print("\n" + "=" * 60)
+    print("Testing response compression (stub Books API)")
+    print("=" * 60)
+    
+    from fastapi.testclient import TestClient
+    from main import app
+    
+    original_url = services.BOOKS_API_URL
+    original_limit = response_compression.max_request_size
+    body = {"tool_calls": [{"name": "list_books", "parameters": {}}]}
+    try:
+        with StubBooksAPI(catalog_size=1000) as stub, TestClient(app) as client:
+            services.BOOKS_API_URL = stub.url
+            book_cache.clear()
+            plain = client.post("/tool-calls", json=body, headers={"Accept-Encoding": "identity"})
+            if "content-encoding" in plain.headers:
+                print("✗ Response was compressed for a client that did not accept it")
+                return False
+            
+            sizes = {}
+            for codec in response_compression.codecs:
+                response = client.post("/tool-calls", json=body, headers={"Accept-Encoding": codec.name})
+                if response.headers.get("content-encoding") != codec.name or response.json() != plain.json():
+                    print(f"✗ {codec.name} response was not compressed or did not decode to the same body")
+                    return False
+                sizes[codec.name] = int(response.headers["content-length"])
+            
+            small = client.post("/tool-calls", json={"tool_calls": [{"name": "get_book", "parameters": {"book_id": 1}}]},
+                                headers={"Accept-Encoding": "gzip"})
+            if "content-encoding" in small.headers:
+                print("✗ Body below the size threshold was compressed")
+                return False
+            
+            streamed = client.post("/tool-calls", json=body,
+                                   headers={"Accept-Encoding": "gzip", "Accept": "application/x-ndjson"})
+            if (streamed.headers.get("content-encoding") != "gzip"
+                    or len(json.loads(streamed.text.splitlines()[0])["result"]) != 1000):
+                print("✗ Streamed response was not compressed or did not decode")
+                return False
+            
+            headers = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+            decompressed = client.post("/tool-calls", content=gzip.compress(json.dumps(body).encode()), headers=headers)
+            corrupt = client.post("/tool-calls", content=b"not gzip", headers=headers)
+            unsupported = client.post("/tool-calls", content=b"{}", headers=dict(headers, **{"Content-Encoding": "lzma"}))
+            response_compression.max_request_size = 100
+            too_large = client.post("/tool-calls", content=gzip.compress(b" " * 1000 + json.dumps(body).encode()),
+                                    headers=headers)
+            statuses = (decompressed.status_code, corrupt.status_code, unsupported.status_code, too_large.status_code)
+            if decompressed.json() != plain.json() or statuses != (200, 400, 415, 413):
+                print(f"✗ Unexpected handling of compressed request bodies: {statuses}")
+                return False
+            
+            if msgpack is not None:
+                packed = client.post("/tool-calls", json=body, headers={"Accept": "application/msgpack"})
+                if (packed.headers["content-type"] != "application/msgpack"
+                        or msgpack.unpackb(packed.content) != plain.json()):
+                    print("✗ MessagePack response did not match the JSON response")
+                    return False
+                sizes["msgpack"] = len(packed.content)
+        
+        print(f"✓ {len(plain.content)} byte response sent as " +
+              ", ".join(f"{name} {size}" for name, size in sizes.items()))
+        return True
+    except Exception as e:
+        print(f"✗ Exception: {str(e)}")
+        return False
+    finally:
+        services.BOOKS_API_URL = original_url
+        response_compression.max_request_size = original_limit
+        book_cache.clear()
+
+def test_concurrent_compression():
+    """Test that large bodies compressed at the same time on worker threads each round-trip"""
+    print("\n" + "=" * 60)
+    print("Testing concurrent compression of large bodies")
+    print("=" * 60)
+    
+    from compression import OFFLOAD_SIZE
+    
+    bodies = [json.dumps([{"id": i, "title": f"Book {i} of batch {n}"} for i in range(20000)]).encode()
+              for n in range(8)]
+    
+    async def compress_all(codec):
+        return await asyncio.gather(*(response_compression.compress(codec, body) for body in bodies))
+    
+    try:
+        if min(len(body) for body in bodies) < OFFLOAD_SIZE:
+            print("✗ Test bodies are too small to be compressed on worker threads")
+            return False
+        for codec in response_compression.codecs:
+            compressed = asyncio.run(compress_all(codec))
+            for body, data in zip(bodies, compressed):
+                if codec.decompress(data, len(body)) != body:
+                    print(f"✗ A {codec.name} body compressed concurrently did not round-trip")
+                    return False
+        
+        print(f"✓ {len(bodies)} concurrent bodies round-tripped with " +
+              ", ".join(codec.name for codec in response_compression.codecs))
+        return True
+    except Exception as e:
+        print(f"✗ Exception: {str(e)}")
+        return False
+
+def test_mcp_session():
+    """Test pipelined JSON-RPC tool calls over the WebSocket and stdio MCP transports"""
+    print("\n" + "=" * 60)
+    print("Testing persistent MCP sessions (stub Books API)")
+    print("=" * 60)
+    
+    from fastapi.testclient import TestClient
+    from main import app
+    
+    def call(request_id, name, arguments):
+        return json.dumps({"jsonrpc": "2.0", "id": request_id, "method": "tools/call",
+                           "params": {"name": name, "arguments": arguments}})
+    
+    original_url = services.BOOKS_API_URL
+    try:
+        with StubBooksAPI(catalog_size=100, latency=0.1) as stub, TestClient(app) as client:
+            services.BOOKS_API_URL = stub.url
+            book_cache.clear()
+            with client.websocket_connect("/mcp") as ws:
+                ws.send_text(json.dumps({"jsonrpc": "2.0", "id": 0, "method": "initialize", "params": {}}))
+                if "protocolVersion" not in json.loads(ws.receive_text())["result"]:
+                    print("✗ initialize did not answer with a protocol version")
+                    return False
+                
+                # A slow call followed by a ping: the ping is answered first
+                ws.send_text(call(1, "get_book", {"book_id": 5}))
+                ws.send_text(json.dumps({"jsonrpc": "2.0", "id": 2, "method": "ping"}))
+                ws.send_text(call(3, "no_such_tool", {}))
+                ws.send_text("{not json")
+                answers = [json.loads(ws.receive_text()) for _ in range(4)]
+                if [answer["id"] for answer in answers] != [2, 3, None, 1]:
+                    print(f"✗ Unexpected answer order: {[answer['id'] for answer in answers]}")
+                    return False
+                book = json.loads(answers[3]["result"]["content"][0]["text"])
+                codes = (answers[1]["error"]["code"], answers[2]["error"]["code"])
+                if book["id"] != 5 or answers[3]["result"]["isError"] or codes != (-32602, -32700):
+                    print(f"✗ Unexpected answers: {answers}")
+                    return False
+            
+            # A reused in-flight id is refused; a call sent as a notification still runs before close returns
+            async def duplicate_and_notification():
+                sent = []
+                async def collect(message):
+                    sent.append(json.loads(message))
+                session = Session(collect, "ip:10.0.0.2")
+                await session.receive(call(7, "get_book", {"book_id": 1}))
+                await session.receive(call(7, "get_book", {"book_id": 2}))
+                await session.close(wait=True)
+                session = Session(collect, "ip:10.0.0.2")
+                await session.receive(json.dumps({"jsonrpc": "2.0", "method": "tools/call", "params": {
+                    "name": "update_book", "arguments": {"book_id": 3, "book_data": {"title": "Notified"}}}}))
+                await session.close(wait=True)
+                return sent
+            sent = asyncio.run(duplicate_and_notification())
+            if [answer.get("error", {}).get("code") for answer in sent] != [-32600, None] \
+                    or json.loads(sent[1]["result"]["content"][0]["text"])["id"] != 1:
+                print(f"✗ Reused request id was not refused: {sent}")
+                return False
+            if BookService.get_book(3).result["title"] != "Notified":
+                print("✗ Tool call sent as a notification was not finished when the session closed")
+                return False
+            
+            # Over stdio, pipelined calls are all answered before the process exits on EOF
+            process = subprocess.run(
+                [sys.executable, "run.py", "--stdio"],
+                input="".join(call(book_id, "get_book", {"book_id": book_id}) + "\n" for book_id in range(1, 21)),
+                capture_output=True, text=True, timeout=60,
+                cwd=os.path.dirname(os.path.abspath(__file__)), env=dict(os.environ, BOOKS_API_URL=stub.url)
+            )
+            answers = {answer["id"]: json.loads(answer["result"]["content"][0]["text"])
+                       for answer in map(json.loads, process.stdout.splitlines())}
+            if process.returncode != 0 or sorted(answers) != list(range(1, 21)) \
+                    or any(book["id"] != request_id for request_id, book in answers.items()):
+                print(f"✗ stdio session answered {sorted(answers)} (exit code {process.returncode})")
+                return False
+            
+            # An oversized line is skipped whole: one parse error, then the next call is answered
+            process = subprocess.run(
+                [sys.executable, "run.py", "--stdio"],
+                input="x" * 200000 + "\n" + call(1, "get_book", {"book_id": 1}) + "\n",
+                capture_output=True, text=True, timeout=60,
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                env=dict(os.environ, BOOKS_API_URL=stub.url, MCP_MAX_REQUEST_BODY_SIZE="1024")
+            )
+            answers = [json.loads(answer) for answer in process.stdout.splitlines()]
+            if [answer.get("error", {}).get("code") for answer in answers] != [-32700, None] \
+                    or json.loads(answers[1]["result"]["content"][0]["text"])["id"] != 1:
+                print(f"✗ stdio session after an oversized line answered {answers}")
+                return False
+        print("✓ WebSocket answers arrived as calls completed; 20 pipelined stdio calls answered, "
+              "oversized stdio line skipped")
+        return True
+    except Exception as e:
+        print(f"✗ Exception: {str(e)}")
+        return False
+    finally:
+        services.BOOKS_API_URL = original_url
+        book_cache.clear()
+
+def test_precomputed_responses():
+    """Test the cached /tools body and its ETag, /health, and that importing the app leaves requests unloaded"""
+    print("\n" + "=" * 60)
+    print("Testing precomputed /tools and /health responses")
+    print("=" * 60)
+    
+    from fastapi.testclient import TestClient
+    from main import app
+    from models import ToolsListResponse
+    from routes import health_check
+    
+    original_url = services.BOOKS_API_URL
+    try:
+        with StubBooksAPI(catalog_size=10) as stub, TestClient(app) as client:
+            services.BOOKS_API_URL = stub.url
+            tools = client.get("/tools", headers={"Accept-Encoding": "identity"})
+            etag = tools.headers.get("etag")
+            if tools.json() != ToolsListResponse(tools=get_tools_list()).model_dump() or not etag:
+                print("✗ /tools body did not match the tool definitions or had no ETag")
+                return False
+            
+            statuses = [client.get("/tools", headers={"If-None-Match": value}).status_code
+                        for value in (etag, f'"other", W/{etag}', '"other"')]
+            if statuses != [304, 304, 200]:
+                print(f"✗ Unexpected If-None-Match handling: {statuses}")
+                return False
+            
+            compressed = [client.get("/tools", headers={"Accept-Encoding": "gzip"}) for _ in range(2)]
+            if any(r.headers.get("content-encoding") != "gzip" or r.json() != tools.json() for r in compressed):
+                print("✗ Compressed /tools body did not decode to the same tool list")
+                return False
+            gzip_etag = compressed[0].headers.get("etag")
+            revalidated = client.get("/tools", headers={"Accept-Encoding": "gzip", "If-None-Match": gzip_etag})
+            if gzip_etag == etag or revalidated.status_code != 304 or revalidated.headers.get("etag") != gzip_etag:
+                print(f"✗ Compressed /tools shared the identity ETag or did not revalidate: {gzip_etag}, "
+                      f"{revalidated.status_code} {revalidated.headers.get('etag')}")
+                return False
+            
+            health = client.get("/health").json()
+            if health["available_tools"] != len(get_tools_list()) or "backend" not in health:
+                print(f"✗ Unexpected /health body: {health}")
+                return False
+            if not asyncio.iscoroutinefunction(health_check):
+                print("✗ /health is served through the threadpool")
+                return False
+        
+        loaded = subprocess.run(
+            [sys.executable, "-c", "import sys, main; print('requests' in sys.modules)"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, timeout=60
+        ).stdout.strip()
+        if loaded != "False":
+            print(f"✗ Importing the app loaded requests ({loaded!r})")
+            return False
+        
+        print(f"✓ /tools served with ETag {etag} ({gzip_etag} gzipped), 304 on match; "
+              "requests is not imported at startup")
+        return True
+    except Exception as e:
+        print(f"✗ Exception: {str(e)}")
+        return False
+    finally:
+        services.BOOKS_API_URL = original_url
+
 def main():
     """Run all tests"""
     print("\n" + "=" * 60)
@@ -110,6 +1457,30 @@ def main():
     results.append(("list_books", test_list_books()))
     results.append(("get_book", test_get_book()))
     
+    # Test batch execution against the stub Books API
+    results.append(("async client per loop", test_async_client_per_loop()))
+    results.append(("concurrent batch", test_concurrent_batch()))
+    results.append(("book cache", test_book_cache()))
+    results.append(("request coalescing", test_request_coalescing()))
+    results.append(("search_books", test_search_books()))
+    results.append(("bulk tools", test_bulk_tools()))
+    results.append(("streaming tool calls", test_streaming_tool_calls()))
+    results.append(("fast serialization", test_fast_serialization()))
+    results.append(("metrics", test_metrics()))
+    results.append(("backend outage", test_backend_outage()))
+    results.append(("retries", test_retries()))
+    results.append(("shared cache", test_shared_cache()))
+    results.append(("conditional requests", test_conditional_requests()))
+    results.append(("argument validation", test_argument_validation()))
+    results.append(("admission control", test_admission_control()))
+    results.append(("write-behind", test_write_behind()))
+    results.append(("backend balancing", test_backend_balancing()))
+    results.append(("compact catalog", test_compact_catalog()))
+    results.append(("compression", test_compression()))
+    results.append(("concurrent compression", test_concurrent_compression()))
+    results.append(("MCP sessions", test_mcp_session()))
+    results.append(("precomputed responses", test_precomputed_responses()))
+    
     # Summary
     print("\n" + "=" * 60)
     print("Test Summary")
@@ -1,15 +1,34 @@
-from services import BookService
-from models import ToolDefinition
-from typing import Dict, Callable, List, Any
+from services import BookService, AsyncBookService
+from models import ToolDefinition, ToolsListResponse
+from validation import compile_schema
+from typing import Dict, Callable, List, Any, Optional, Tuple
+import hashlib
+
+# Book fields accepted by the bulk tools
+BOOK_DATA_PROPERTIES = {
+    "id": {"type": "integer", "description": "Unique identifier for the book"},
+    "title": {"type": "string", "description": "Title of the book"},
+    "author": {"type": "string", "description": "Author of the book"},
+    "isbn": {"type": "string", "description": "ISBN of the book"},
+    "publishedDate": {"type": "string", "description": "Published date of the book in ISO 8601 UTC format (must end with 'Z', e.g., '2024-04-11T00:00:00Z')"}
+}
 
 # Define tool schemas to expose through MCP
 TOOLS = [
     ToolDefinition(
         name="list_books",
-        description="Retrieve all books from the database",
+        description="Retrieve books from the database. Use limit/offset to page through large catalogs and fields to return only the fields you need.",
         input_schema={
             "type": "object",
-            "properties": {},
+            "properties": {
+                "limit": {"type": "integer", "description": "Maximum number of books to return. When limit or offset is given the result is a page object with books, total, offset, limit and next_offset"},
+                "offset": {"type": "integer", "description": "Number of books to skip (default 0)"},
+                "fields": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": ["id", "title", "author", "isbn", "publishedDate", "createdAt"]},
+                    "description": "Book fields to include in the result (id is always included)"
+                }
+            },
             "required": []
         }
     ),
@@ -29,7 +48,8 @@ TOOLS = [
                         "publishedDate": {"type": "string", "description": "Published date of the book in ISO 8601 UTC format (must end with 'Z', e.g., '2024-04-11T00:00:00Z')"}
                     },
                     "required": ["title", "author"]
-                }
+                },
+                "idempotency_key": {"type": "string", "description": "Optional unique key for this create (e.g., a UUID). Repeating the call with the same key returns the book created the first time instead of creating a duplicate."}
             },
             "required": ["book_data"]
         }
@@ -76,27 +96,189 @@ TOOLS = [
             },
             "required": ["book_id"]
         }
+    ),
+    ToolDefinition(
+        name="create_books",
+        description="Create many books in one call. Items are validated locally and sent to the database concurrently; each item gets its own result or error.",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "books": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": BOOK_DATA_PROPERTIES,
+                        "required": ["title", "author"]
+                    },
+                    "description": "Books to create"
+                }
+            },
+            "required": ["books"]
+        }
+    ),
+    ToolDefinition(
+        name="get_books",
+        description="Retrieve many books by ID in one call",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "book_ids": {"type": "array", "items": {"type": "integer"}, "description": "IDs of the books to retrieve"}
+            },
+            "required": ["book_ids"]
+        }
+    ),
+    ToolDefinition(
+        name="update_books",
+        description="Update many books in one call. Updates to the same book within one call are not ordered.",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "updates": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "book_id": {"type": "integer", "description": "ID of the book to update"},
+                            "book_data": {"type": "object", "properties": BOOK_DATA_PROPERTIES}
+                        },
+                        "required": ["book_id", "book_data"]
+                    },
+                    "description": "Updates to apply"
+                }
+            },
+            "required": ["updates"]
+        }
+    ),
+    ToolDefinition(
+        name="delete_books",
+        description="Delete many books by ID in one call",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "book_ids": {"type": "array", "items": {"type": "integer"}, "description": "IDs of the books to delete"}
+            },
+            "required": ["book_ids"]
+        }
+    ),
+    ToolDefinition(
+        name="search_books",
+        description="Search books by title words, author, ISBN and publication date range. Prefer this over list_books when looking for specific books.",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "query": {"type": "string", "description": "Words that must all appear in the title"},
+                "author": {"type": "string", "description": "Author name (case insensitive)"},
+                "isbn": {"type": "string", "description": "ISBN, with or without hyphens"},
+                "published_after": {"type": "string", "description": "Earliest publication date, inclusive (ISO 8601, e.g., '1950-01-01')"},
+                "published_before": {"type": "string", "description": "Latest publication date, inclusive (ISO 8601, e.g., '1999-12-31')"},
+                "limit": {"type": "integer", "description": "Maximum number of books to return (default 50)"}
+            },
+            "required": []
+        }
+    ),
+    ToolDefinition(
+        name="find_books_by_author",
+        description="Find all books by an author",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "author": {"type": "string", "description": "Author name (case insensitive)"},
+                "limit": {"type": "integer", "description": "Maximum number of books to return (default 50)"}
+            },
+            "required": ["author"]
+        }
+    ),
+    ToolDefinition(
+        name="flush_writes",
+        description="When the server acknowledges writes before sending them to the database (write-behind mode), wait until every queued create, update and delete has been sent and report pending and failed writes. Call this before relying on writes being durable.",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "wait": {"type": "boolean", "description": "Wait for queued writes to be sent before reporting (default true)"}
+            },
+            "required": []
+        }
     )
 ]
 
-# Map tool names to their implementation methods
+# Map tool names to their (async) implementation methods
 TOOL_IMPLEMENTATIONS = {
+    "list_books": AsyncBookService.list_books,
+    "create_book": AsyncBookService.create_book,
+    "get_book": AsyncBookService.get_book,
+    "update_book": AsyncBookService.update_book,
+    "delete_book": AsyncBookService.delete_book,
+    "create_books": AsyncBookService.create_books,
+    "get_books": AsyncBookService.get_books,
+    "update_books": AsyncBookService.update_books,
+    "delete_books": AsyncBookService.delete_books,
+    "search_books": AsyncBookService.search_books,
+    "find_books_by_author": AsyncBookService.find_books_by_author,
+    "flush_writes": AsyncBookService.flush_writes
+}
+
+# Blocking implementations for scripts and callers outside an event loop
+SYNC_TOOL_IMPLEMENTATIONS = {
     "list_books": BookService.list_books,
     "create_book": BookService.create_book,
     "get_book": BookService.get_book,
     "update_book": BookService.update_book,
-    "delete_book": BookService.delete_book
+    "delete_book": BookService.delete_book,
+    "create_books": BookService.create_books,
+    "get_books": BookService.get_books,
+    "update_books": BookService.update_books,
+    "delete_books": BookService.delete_books,
+    "search_books": BookService.search_books,
+    "find_books_by_author": BookService.find_books_by_author,
+    "flush_writes": BookService.flush_writes
+}
+
+# Async implementations that may return a BookStream in streaming responses
+STREAMING_TOOL_IMPLEMENTATIONS = {
+    "list_books": AsyncBookService.stream_books
+}
+
+# Tools that validate each array item themselves and report per-item errors
+BULK_TOOLS = {"create_books", "get_books", "update_books", "delete_books"}
+
+# Parameter validators compiled once from each tool's input_schema
+TOOL_VALIDATORS = {
+    tool.name: compile_schema(tool.input_schema, validate_items=tool.name not in BULK_TOOLS)
+    for tool in TOOLS
 }
 
+# The tool set is fixed for the life of the process, so the GET /tools body is
+# encoded once, with a strong ETag for conditional requests
+TOOLS_LIST_JSON = ToolsListResponse(tools=TOOLS).model_dump_json().encode()
+TOOLS_LIST_ETAG = '"' + hashlib.sha256(TOOLS_LIST_JSON).hexdigest()[:32] + '"'
+
 def get_tool_implementations() -> Dict[str, Callable]:
     """
     Get the mapping of tool names to their implementation methods
     
     Returns:
-        A dictionary mapping tool names to their implementation methods
+        A dictionary mapping tool names to their async implementation methods
     """
     return TOOL_IMPLEMENTATIONS
 
+def get_sync_tool_implementations() -> Dict[str, Callable]:
+    """
+    Get the mapping of tool names to their blocking implementation methods
+    
+    Returns:
+        A dictionary mapping tool names to their sync implementation methods
+    """
+    return SYNC_TOOL_IMPLEMENTATIONS
+
+def get_streaming_tool_implementations() -> Dict[str, Callable]:
+    """
+    Get the tools whose results can be streamed from the Books API
+    
+    Returns:
+        A dictionary mapping tool names to their streaming implementation methods
+    """
+    return STREAMING_TOOL_IMPLEMENTATIONS
+
 def get_tools_list() -> List[ToolDefinition]:
     """
     Get the list of available tools
@@ -104,4 +286,22 @@ def get_tools_list() -> List[ToolDefinition]:
     Returns:
         A list of tool definitions
     """
-    return TOOLS
\ No newline at end of file
+    return TOOLS
+
+def get_tool_validators() -> Dict[str, Callable[[Dict[str, Any]], Optional[str]]]:
+    """
+    Get the compiled parameter validators for each tool
+    
+    Returns:
+        A dictionary mapping tool names to functions returning an error message for invalid parameters
+    """
+    return TOOL_VALIDATORS
+
+def get_tools_list_json() -> Tuple[bytes, str]:
+    """
+    Get the encoded GET /tools response body
+    
+    Returns:
+        The ToolsListResponse JSON and its ETag
+    """
+    return TOOLS_LIST_JSON, TOOLS_LIST_ETAG
@@ -0,0 +1,108 @@
+from typing import Any, Callable, Dict, List, Optional
+
+# A compiled check: returns an error message for value at path, or None if it is valid
+Check = Callable[[Any, str], Optional[str]]
+
+def _is_integer(value: Any) -> bool:
+    # Integral floats such as 1.0 are rejected too, since ids are formatted into Books API paths
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+# JSON Schema type name -> (check, description used in error messages)
+TYPE_CHECKS = {
+    "object": (lambda value: isinstance(value, dict), "an object"),
+    "array": (lambda value: isinstance(value, list), "an array"),
+    "string": (lambda value: isinstance(value, str), "a string"),
+    "integer": (_is_integer, "an integer"),
+    "number": (_is_number, "a number"),
+    "boolean": (lambda value: isinstance(value, bool), "a boolean"),
+    "null": (lambda value: value is None, "null"),
+}
+
+def _join(path: str, name: str) -> str:
+    return f"{path}.{name}" if path else name
+
+def _compile(schema: Dict[str, Any], validate_items: bool, closed: bool) -> Check:
+    """Compile one schema node into a list of checks run in order"""
+    checks: List[Check] = []
+
+    type_name = schema.get("type")
+    if type_name is not None:
+        is_type, description = TYPE_CHECKS[type_name]
+        checks.append(lambda value, path: None if is_type(value) else f"{path or 'parameters'} must be {description}")
+
+    if "enum" in schema:
+        allowed = tuple(schema["enum"])
+        message = ", ".join(repr(option) for option in allowed)
+        checks.append(lambda value, path: None if value in allowed else f"{path} must be one of {message}")
+
+    if type_name == "object":
+        properties = {
+            name: _compile(property_schema, validate_items, closed=False)
+            for name, property_schema in schema.get("properties", {}).items()
+        }
+        required = tuple(schema.get("required", ()))
+
+        def check_object(value: Dict[str, Any], path: str) -> Optional[str]:
+            for name in required:
+                if name not in value:
+                    return f"{_join(path, name)} is required"
+            for name, item in value.items():
+                check = properties.get(name)
+                if check is None:
+                    if closed:
+                        return f"unexpected parameter {_join(path, name)!r}"
+                    continue
+                error = check(item, _join(path, name))
+                if error is not None:
+                    return error
+            return None
+        checks.append(check_object)
+
+    if type_name == "array" and validate_items and "items" in schema:
+        check_item = _compile(schema["items"], validate_items, closed=False)
+
+        def check_array(value: List[Any], path: str) -> Optional[str]:
+            for index, item in enumerate(value):
+                error = check_item(item, f"{path}[{index}]")
+                if error is not None:
+                    return error
+            return None
+        checks.append(check_array)
+
+    if len(checks) == 1:
+        return checks[0]
+
+    def check_all(value: Any, path: str) -> Optional[str]:
+        # Later checks assume the type check passed
+        for check in checks:
+            error = check(value, path)
+            if error is not None:
+                return error
+        return None
+    return check_all
+
+def compile_schema(schema: Dict[str, Any], validate_items: bool = True) -> Callable[[Dict[str, Any]], Optional[str]]:
+    """
+    Compile a tool's input_schema into a function that validates call parameters
+
+    Supports the subset of JSON Schema used by the tool definitions: type,
+    properties, required, items and enum. Parameters not declared at the top
+    level are rejected, since they are passed to the tool as keyword
+    arguments; nested objects may carry extra fields.
+
+    Args:
+        schema: The tool's input_schema
+        validate_items: Check array items against their schema. Bulk tools
+            validate items themselves so they can report per-item errors.
+
+    Returns:
+        A function taking the parameters dict and returning an error message, or None if they are valid
+    """
+    check = _compile(schema, validate_items, closed=True)
+
+    def validate(parameters: Dict[str, Any]) -> Optional[str]:
+        return check(parameters, "")
+    return validate
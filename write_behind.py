@@ -0,0 +1,310 @@
+import asyncio
+import contextvars
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from config import (
+    get_write_behind_enabled,
+    get_write_behind_flush_interval,
+    get_write_behind_batch_size,
+    get_write_behind_concurrency,
+    get_write_behind_max_pending,
+)
+from metrics import write_behind_operation, write_behind_pending
+
+class PendingWrite:
+    """
+    The coalesced writes queued for one book id
+
+    Flushed as an optional DELETE followed by either a POST of create or a
+    PUT of update, which together have the same effect as the writes that
+    were queued, in order.
+    """
+
+    __slots__ = ("deleted", "create", "update")
+
+    def __init__(self):
+        self.deleted = False
+        self.create: Optional[Dict[str, Any]] = None
+        self.update: Optional[Dict[str, Any]] = None
+
+    def apply_to(self, book: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """The book as it will be once this write is flushed, given the book before it (None if absent)"""
+        if self.deleted:
+            book = None
+        if self.create is not None:
+            return dict(self.create)
+        if self.update is not None and book is not None:
+            return {**book, **self.update}
+        return book
+
+    @property
+    def replaces(self) -> bool:
+        """Whether the book after this write does not depend on the book before it"""
+        return self.deleted or self.create is not None
+
+# Sends one coalesced write to the Books API; returns an error message or None
+ApplyWrite = Callable[[int, PendingWrite], Awaitable[Optional[str]]]
+
+class WriteBehindQueue:
+    """
+    Write-behind queue for create_book (with an explicit id), update_book and delete_book
+
+    Writes are acknowledged once they pass local validation and are queued
+    per book id, where they coalesce: updates to the same book merge into one
+    PUT, an update after a create is folded into the POST, a delete drops
+    earlier updates, and a delete of a book created in the queue cancels both.
+    A flusher task started on the event loop sends the queue to the Books API
+    every flush_interval, at most batch_size books per round and concurrency
+    requests at a time. Each round finishes before the next starts, so writes
+    to one book reach the Books API in order.
+
+    Reads of single books and of the catalog overlay the queued and in-flight
+    writes (read-your-writes). Failed writes are not retried beyond the Books
+    API retry policy; they are counted and the most recent are kept for
+    flush_writes to report.
+
+    Durability: the queue lives in this process's memory only. Acknowledged
+    writes are lost if the process dies, or is killed when the graceful
+    shutdown timeout runs out, before they are sent. Other processes do not
+    see them either, so the production launcher refuses write-behind when
+    it runs more than one worker.
+    """
+
+    # Failed writes remembered for status reports
+    MAX_FAILURES = 100
+
+    def __init__(self, enabled: bool, flush_interval: float, batch_size: int, concurrency: int, max_pending: int):
+        self.enabled = enabled
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.pending: "OrderedDict[int, PendingWrite]" = OrderedDict()
+        self.in_flight: Dict[int, PendingWrite] = {}
+        self.failures: Deque[Dict[str, Any]] = deque(maxlen=self.MAX_FAILURES)
+        self.queued = 0
+        self.coalesced = 0
+        self.cancelled = 0
+        self.flushed = 0
+        self.failed = 0
+        self._apply: Optional[ApplyWrite] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind(self, apply: ApplyWrite):
+        """Set the function that sends a coalesced write to the Books API"""
+        self._apply = apply
+
+    def _entry(self, book_id: int) -> PendingWrite:
+        entry = self.pending.get(book_id)
+        if entry is None:
+            entry = self.pending[book_id] = PendingWrite()
+            self.queued += 1
+            write_behind_operation("queued")
+        else:
+            self.coalesced += 1
+            write_behind_operation("coalesced")
+        return entry
+
+    def exists(self, book_id: int) -> Optional[bool]:
+        """Whether the queued writes leave the book existing (True) or deleted (False); None if they do not say"""
+        existing: Optional[bool] = None
+        for entry in (self.in_flight.get(book_id), self.pending.get(book_id)):
+            if entry is None:
+                continue
+            if entry.deleted:
+                existing = False
+            if entry.create is not None:
+                existing = True
+        return existing
+
+    async def create(self, book_id: int, book_data: Dict[str, Any]) -> Optional[str]:
+        """Queue a create of a book with a client-chosen id; returns an error message if it is refused"""
+        existing = self.exists(book_id)
+        if existing or (existing is None and self.has_writes(book_id)):
+            return f"Book with ID {book_id} already exists"
+        await self._make_room()
+        self._entry(book_id).create = {**book_data, "id": book_id}
+        self._schedule()
+        return None
+
+    async def update(self, book_id: int, book_data: Dict[str, Any]) -> Optional[str]:
+        """Queue an update; returns an error message if the queue knows the book does not exist"""
+        if self.exists(book_id) is False:
+            return f"Book with ID {book_id} not found"
+        await self._make_room()
+        entry = self._entry(book_id)
+        if entry.create is not None:
+            entry.create = {**entry.create, **book_data, "id": book_id}
+        else:
+            entry.update = {**(entry.update or {}), **book_data, "id": book_id}
+        self._schedule()
+        return None
+
+    async def delete(self, book_id: int) -> Optional[str]:
+        """Queue a delete; returns an error message if the queue knows the book does not exist"""
+        if self.exists(book_id) is False:
+            return f"Book with ID {book_id} not found"
+        await self._make_room()
+        entry = self._entry(book_id)
+        if entry.create is not None and not entry.deleted and book_id not in self.in_flight:
+            # The book only ever existed in the queue
+            del self.pending[book_id]
+            self.cancelled += 1
+            write_behind_operation("cancelled")
+        else:
+            entry.deleted, entry.create, entry.update = True, None, None
+        write_behind_pending(len(self.pending))
+        self._schedule()
+        return None
+
+    def overlay_book(self, book_id: int, book: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Apply the queued writes for book_id to the book read from the cache or Books API"""
+        for entry in (self.in_flight.get(book_id), self.pending.get(book_id)):
+            if entry is not None:
+                book = entry.apply_to(book)
+        return book
+
+    def replaces(self, book_id: int) -> bool:
+        """Whether the queued writes determine the book without reading it"""
+        return any(entry is not None and entry.replaces
+                   for entry in (self.in_flight.get(book_id), self.pending.get(book_id)))
+
+    def has_writes(self, book_id: Optional[int] = None) -> bool:
+        if book_id is None:
+            return bool(self.pending or self.in_flight)
+        return book_id in self.pending or book_id in self.in_flight
+
+    def overlay_books(self, books: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Apply all queued writes to the catalog; returns books itself if nothing is queued"""
+        if not self.pending and not self.in_flight:
+            return books
+        changed = set(self.in_flight) | set(self.pending)
+        result = []
+        seen = set()
+        for book in books:
+            book_id = book.get("id")
+            if book_id in changed:
+                seen.add(book_id)
+                book = self.overlay_book(book_id, book)
+                if book is None:
+                    continue
+            result.append(book)
+        for book_id in changed - seen:
+            book = self.overlay_book(book_id, None)
+            if book is not None:
+                result.append(book)
+        return result
+
+    async def _make_room(self):
+        """Apply backpressure: wait for a flush while the queue is full"""
+        while len(self.pending) >= self.max_pending:
+            await self.flush()
+
+    def _schedule(self) -> asyncio.Task:
+        """Start the flusher on the running loop if it is not already running"""
+        write_behind_pending(len(self.pending))
+        loop = asyncio.get_running_loop()
+        if self._flusher is None or self._flusher.done() or self._loop is not loop:
+            self._loop = loop
+            self._wake = asyncio.Event()
+            # Start it in an empty context: a task copies the context it was created
+            # in, and the request that queued this write has bound its admission
+            # client there, so every flush would otherwise use that client's slots
+            self._flusher = contextvars.Context().run(loop.create_task, self._run(self._wake))
+        return self._flusher
+
+    async def _run(self, wake: asyncio.Event):
+        while self.pending:
+            try:
+                await asyncio.wait_for(wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            wake.clear()
+            await self._flush_round()
+
+    async def _flush_round(self):
+        """Send up to batch_size queued books to the Books API"""
+        if self._apply is None:
+            raise RuntimeError("write-behind queue is not bound to a Books API sender")
+        batch = []
+        while self.pending and len(batch) < self.batch_size:
+            batch.append(self.pending.popitem(last=False))
+        self.in_flight = dict(batch)
+        write_behind_pending(len(self.pending))
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def send(book_id: int, entry: PendingWrite):
+            async with semaphore:
+                try:
+                    error = await self._apply(book_id, entry)
+                except Exception as e:
+                    error = str(e) or type(e).__name__
+            if error is None:
+                self.flushed += 1
+                write_behind_operation("flushed")
+            else:
+                self.failed += 1
+                write_behind_operation("failed")
+                self.failures.append({"book_id": book_id, "error": error})
+            self.in_flight.pop(book_id, None)
+
+        try:
+            await asyncio.gather(*(send(book_id, entry) for book_id, entry in batch))
+        finally:
+            self.in_flight = {}
+
+    async def flush(self):
+        """Wait until every write queued before this call has been sent to the Books API"""
+        while self.pending or self.in_flight:
+            # Rounds only run in the flusher, so writes to one book are never sent concurrently
+            flusher = self._schedule()
+            self._wake.set()
+            await asyncio.shield(flusher)
+
+    def flush_blocking(self, timeout: Optional[float] = None):
+        """flush() for callers outside the event loop, e.g. the blocking tool implementations"""
+        loop = self._loop
+        if not self.has_writes() or loop is None or not loop.is_running():
+            return
+        if _running_loop() is loop:
+            raise RuntimeError("flush_blocking() called from the event loop")
+        asyncio.run_coroutine_threadsafe(self.flush(), loop).result(timeout)
+
+    def reset(self):
+        """Drop all queued writes and clear the counters"""
+        self.pending.clear()
+        self.in_flight = {}
+        self.failures.clear()
+        self.queued = self.coalesced = self.cancelled = self.flushed = self.failed = 0
+        write_behind_pending(0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "pending": len(self.pending),
+            "in_flight": len(self.in_flight),
+            "queued": self.queued,
+            "coalesced": self.coalesced,
+            "cancelled": self.cancelled,
+            "flushed": self.flushed,
+            "failed": self.failed,
+            "recent_failures": list(self.failures)
+        }
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+# Process-wide write-behind queue used by AsyncBookService (off unless MCP_WRITE_BEHIND_ENABLED is set)
+write_behind = WriteBehindQueue(
+    enabled=get_write_behind_enabled(),
+    flush_interval=get_write_behind_flush_interval(),
+    batch_size=get_write_behind_batch_size(),
+    concurrency=get_write_behind_concurrency(),
+    max_pending=get_write_behind_max_pending()
+)